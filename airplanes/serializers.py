@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from airplanes.models import Airplane, AirplaneType
+from skygate_airport_api.fieldsets import FieldsetMixin
+from skygate_airport_api.refcache import ReferencePrimaryKeyField
 
 
-class AirplaneTypeSerializer(serializers.ModelSerializer):
+class AirplaneTypeSerializer(FieldsetMixin, serializers.ModelSerializer):
     total_seats = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -10,10 +12,10 @@ class AirplaneTypeSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "rows", "seats_in_row", "total_seats"]
 
 
-class AirplaneSerializer(serializers.ModelSerializer):
+class AirplaneSerializer(FieldsetMixin, serializers.ModelSerializer):
     airplane_type = AirplaneTypeSerializer(read_only=True)
-    airplane_type_id = serializers.PrimaryKeyRelatedField(
-        queryset=AirplaneType.objects.all(),
+    airplane_type_id = ReferencePrimaryKeyField(
+        model=AirplaneType,
         source="airplane_type",
         write_only=True,
     )
@@ -21,3 +23,11 @@ class AirplaneSerializer(serializers.ModelSerializer):
     class Meta:
         model = Airplane
         fields = ["id", "name", "airplane_type", "airplane_type_id"]
+
+
+class AirplaneReferenceSerializer(serializers.ModelSerializer):
+    """An airplane referring to its type by id."""
+
+    class Meta:
+        model = Airplane
+        fields = ["id", "name", "airplane_type"]
@@ -3,6 +3,7 @@ from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from .models import Airplane, AirplaneType
 from .serializers import AirplaneSerializer, AirplaneTypeSerializer
+from skygate_airport_api.testing import QueryBudgetMixin
 
 
 class AirplaneTypeModelTests(TestCase):
@@ -148,7 +149,7 @@ class AirplaneTypeAPITests(APITestCase):
         self.assertEqual(AirplaneType.objects.count(), 0)
 
 
-class AirplaneAPITests(APITestCase):
+class AirplaneAPITests(QueryBudgetMixin, APITestCase):
     """Tests for the Airplane API endpoints"""
 
     def setUp(self):
@@ -170,8 +171,22 @@ class AirplaneAPITests(APITestCase):
         """Test retrieving the list of airplanes"""
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], "SkyGate-004")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], "SkyGate-004")
+
+    def test_list_query_budget(self):
+        """Test that listing airplanes does not query per airplane type"""
+        for number in range(99):
+            airplane_type = AirplaneType.objects.create(
+                name=f"Type {number}", rows=20, seats_in_row=4
+            )
+            Airplane.objects.create(
+                name=f"SkyGate-1{number:02}", airplane_type=airplane_type
+            )
+
+        with self.assertQueryBudget(1):
+            response = self.client.get(self.url, {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 100)
 
     def test_get_airplane_detail(self):
         """Test retrieving a specific airplane"""
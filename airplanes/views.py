@@ -1,13 +1,14 @@
 from rest_framework import viewsets
 from airplanes.models import Airplane, AirplaneType
 from airplanes.serializers import AirplaneSerializer, AirplaneTypeSerializer
+from skygate_airport_api.profiling import ProfiledViewMixin
 
 
-class AirplaneTypeViewSet(viewsets.ModelViewSet):
+class AirplaneTypeViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = AirplaneType.objects.all()
     serializer_class = AirplaneTypeSerializer
 
 
-class AirplaneViewSet(viewsets.ModelViewSet):
-    queryset = Airplane.objects.all()
+class AirplaneViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
+    queryset = Airplane.objects.select_related("airplane_type")
     serializer_class = AirplaneSerializer
@@ -1,21 +1,23 @@
 from rest_framework import serializers
 from airports.models import Airport, Route
+from skygate_airport_api.fieldsets import FieldsetMixin
+from skygate_airport_api.refcache import ReferencePrimaryKeyField
 
 
-class AirportSerializer(serializers.ModelSerializer):
+class AirportSerializer(FieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Airport
         fields = "__all__"
 
 
-class RouteSerializer(serializers.ModelSerializer):
+class RouteSerializer(FieldsetMixin, serializers.ModelSerializer):
     source = AirportSerializer(read_only=True)
     destination = AirportSerializer(read_only=True)
-    source_id = serializers.PrimaryKeyRelatedField(
-        queryset=Airport.objects.all(), source="source", write_only=True
+    source_id = ReferencePrimaryKeyField(
+        model=Airport, source="source", write_only=True
     )
-    destination_id = serializers.PrimaryKeyRelatedField(
-        queryset=Airport.objects.all(), source="destination", write_only=True
+    destination_id = ReferencePrimaryKeyField(
+        model=Airport, source="destination", write_only=True
     )
 
     class Meta:
@@ -28,3 +30,11 @@ class RouteSerializer(serializers.ModelSerializer):
             "source_id",
             "destination_id",
         ]
+
+
+class RouteReferenceSerializer(serializers.ModelSerializer):
+    """A route referring to its airports by id."""
+
+    class Meta:
+        model = Route
+        fields = ["id", "source", "destination", "distance"]
@@ -1,8 +1,14 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 from airports.models import Airport, Route
 from airports.serializers import AirportSerializer, RouteSerializer
+from airports.views import RouteViewSet
+from skygate_airport_api import refcache
+from skygate_airport_api.testing import QueryBudgetMixin
 
 
 class AirportModelTests(TestCase):
@@ -206,3 +212,128 @@ class RouteAPITests(TestCase):
         """Test deleting a route via ORM"""
         self.route.delete()
         self.assertEqual(Route.objects.count(), 0)
+
+
+class RouteQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Tests for the number of queries run by the Route API"""
+
+    def test_list_query_budget(self):
+        """Test that listing routes does not query per airport"""
+        airports = Airport.objects.bulk_create(
+            Airport(name=f"Airport {number}", closest_big_city="City")
+            for number in range(200)
+        )
+        Route.objects.bulk_create(
+            Route(source=source, destination=destination, distance=500)
+            for source, destination in zip(airports[::2], airports[1::2])
+        )
+
+        # The routes list is shadowed by the airport detail URL, so the
+        # viewset is called directly.
+        view = RouteViewSet.as_view({"get": "list"})
+        request = APIRequestFactory().get(
+            "/api/airports/routes/", {"page_size": 100}
+        )
+        with self.assertQueryBudget(1):
+            response = view(request)
+            response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 100)
+
+
+class ReferenceCacheTests(TransactionTestCase):
+    """Tests for the process-local reference data cache"""
+
+    def setUp(self):
+        # Drop the caches, statistics included, left by earlier tests.
+        refcache.reference_data.caches.clear()
+        self.airport = Airport.objects.create(
+            name="Heathrow", closest_big_city="London"
+        )
+
+    def test_lookups_after_the_first_hit_the_cache(self):
+        """Test that a cached airport is served without a query"""
+        refcache.get(Airport, self.airport.pk)
+        with CaptureQueriesContext(connection) as context:
+            airport = refcache.get(Airport, str(self.airport.pk))
+        self.assertEqual(len(context), 0)
+        self.assertEqual(airport, self.airport)
+        self.assertEqual(airport.name, "Heathrow")
+        self.assertIsNone(refcache.get(Airport, self.airport.pk + 100))
+
+        stats = refcache.stats()["airports.Airport"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_least_recently_used_rows_are_evicted(self):
+        """Test that the cache never holds more than its maximum size"""
+        cache = refcache.LRUCache(maxsize=2)
+        cache.set(1, "a")
+        cache.set(2, "b")
+        cache.get(1)
+        cache.set(3, "c")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), "a")
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    @override_settings(REFERENCE_CACHE_POLL_INTERVAL=0)
+    def test_saving_invalidates_every_process(self):
+        """Test that a save reaches the caches of other processes"""
+        other_process = refcache.ReferenceData()
+        refcache.get(Airport, self.airport.pk)
+        other_process.get(Airport, self.airport.pk)
+
+        self.airport.name = "London Heathrow"
+        self.airport.save()
+
+        self.assertEqual(
+            refcache.get(Airport, self.airport.pk).name, "London Heathrow"
+        )
+        self.assertEqual(
+            other_process.get(Airport, self.airport.pk).name,
+            "London Heathrow",
+        )
+
+    def test_route_serializer_resolves_airports_from_the_cache(self):
+        """Test that route writes look airports up in the cache"""
+        destination = Airport.objects.create(
+            name="Gatwick", closest_big_city="London"
+        )
+        refcache.get_many(Airport, [self.airport.pk, destination.pk])
+        serializer = RouteSerializer(
+            data={
+                "source_id": self.airport.pk,
+                "destination_id": destination.pk,
+                "distance": 50,
+            }
+        )
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(len(context), 0)
+        self.assertEqual(serializer.validated_data["destination"], destination)
+
+        serializer = RouteSerializer(
+            data={"source_id": 999, "destination_id": "x", "distance": 50}
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            set(serializer.errors), {"source_id", "destination_id"}
+        )
+
+    def test_stats_endpoint_is_staff_only(self):
+        """Test that only staff can read the cache counters"""
+        client = APIClient()
+        user = get_user_model().objects.create_user(
+            username="staff", password="password"
+        )
+        client.force_authenticate(user=user)
+        response = client.get("/api/reference-cache/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        refcache.get(Airport, self.airport.pk)
+        response = client.get("/api/reference-cache/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["airports.Airport"]["size"], 1)
@@ -1,13 +1,14 @@
 from rest_framework import viewsets
 from airports.models import Airport, Route
 from airports.serializers import AirportSerializer, RouteSerializer
+from skygate_airport_api.profiling import ProfiledViewMixin
 
 
-class AirportViewSet(viewsets.ModelViewSet):
+class AirportViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = Airport.objects.all()
     serializer_class = AirportSerializer
 
 
-class RouteViewSet(viewsets.ModelViewSet):
-    queryset = Route.objects.all()
+class RouteViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
+    queryset = Route.objects.select_related("source", "destination")
     serializer_class = RouteSerializer
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from skygate_airport_api.fieldsets import FieldsetMixin
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -33,7 +34,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(FieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name') 
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from authentication.serializers import RegisterSerializer, UserSerializer
 from django.contrib.auth.models import User
+from skygate_airport_api.profiling import ProfiledViewMixin
 from authentication.schemas import (
     register_view_schema,
     user_detail_view_schema,
@@ -11,7 +12,7 @@ from authentication.schemas import (
 )
 
 
-class RegisterView(generics.CreateAPIView):
+class RegisterView(ProfiledViewMixin, generics.CreateAPIView):
     """
     Register a new user account.
 
@@ -27,7 +28,7 @@ class RegisterView(generics.CreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(ProfiledViewMixin, generics.RetrieveAPIView):
     """
     Retrieve authenticated user details.
 
@@ -0,0 +1,161 @@
+"""
+Stress benchmark for concurrent seat booking.
+
+Fires many parallel bookings at a single flight through ``TicketSerializer``
+and reports throughput, how many attempts won or lost a seat, and how many
+seats ended up double-booked (which must always be zero).
+
+    python -m benchmarks.bench_booking --workers 16 --attempts 2000
+"""
+
+import argparse
+import random
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+def create_flight(rows, seats_in_row):
+    from django.utils import timezone
+
+    from airplanes.models import Airplane, AirplaneType
+    from airports.models import Airport, Route
+    from flights.models import Flight
+
+    source = Airport.objects.create(name="BEN Airport", closest_big_city="A")
+    destination = Airport.objects.create(
+        name="MRK Airport", closest_big_city="B"
+    )
+    route = Route.objects.create(
+        source=source, destination=destination, distance=1000
+    )
+    airplane_type = AirplaneType.objects.create(
+        name="Bench", rows=rows, seats_in_row=seats_in_row
+    )
+    airplane = Airplane.objects.create(
+        name="BENCH-1", airplane_type=airplane_type
+    )
+    departure = timezone.now() + timedelta(days=1)
+    return Flight.objects.create(
+        flight_number="BN100",
+        departure_time=departure,
+        arrival_time=departure + timedelta(hours=2),
+        route=route,
+        airplane=airplane,
+    )
+
+
+def book(flight_id, seats, attempts, outcomes, lock):
+    from django.db import OperationalError, connection
+    from rest_framework.exceptions import ValidationError
+
+    from tickets.exceptions import SeatUnavailable
+    from tickets.serializers import TicketSerializer
+
+    local = Counter()
+    try:
+        for number in range(attempts):
+            row, seat = random.choice(seats)
+            serializer = TicketSerializer(
+                data={
+                    "flight": flight_id,
+                    "passenger_name": f"Passenger {number}",
+                    "row": row,
+                    "seat": seat,
+                }
+            )
+            try:
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                local["booked"] += 1
+            except SeatUnavailable:
+                local["conflict (409)"] += 1
+            except ValidationError:
+                local["rejected (400)"] += 1
+            except OperationalError:
+                local["database errors"] += 1
+    finally:
+        connection.close()
+        with lock:
+            outcomes.update(local)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--seats-in-row", type=int, default=8)
+    parser.add_argument(
+        "--hot-seats",
+        type=int,
+        default=0,
+        help="Only contend for this many seats (0 means the whole cabin).",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db.models import Count
+
+    from tickets.inventory import SEAT_LETTERS
+    from tickets.models import ACTIVE_TICKET_STATUSES, Ticket
+
+    with benchmark_database(file_backed=True):
+        flight = create_flight(args.rows, args.seats_in_row)
+        seats = [
+            (row, seat)
+            for row in range(1, args.rows + 1)
+            for seat in SEAT_LETTERS[: args.seats_in_row]
+        ]
+        if args.hot_seats:
+            seats = seats[: args.hot_seats]
+
+        outcomes = Counter()
+        lock = threading.Lock()
+        per_worker = args.attempts // args.workers
+        threads = [
+            threading.Thread(
+                target=book,
+                args=(flight.id, seats, per_worker, outcomes, lock),
+            )
+            for _ in range(args.workers)
+        ]
+        with timer() as elapsed:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        double_booked = (
+            Ticket.objects.filter(
+                flight=flight, status__in=ACTIVE_TICKET_STATUSES
+            )
+            .values("row", "seat")
+            .annotate(tickets=Count("id"))
+            .filter(tickets__gt=1)
+            .count()
+        )
+
+        attempts = per_worker * args.workers
+        report(
+            f"Concurrent booking ({args.workers} workers, {len(seats)} seats)",
+            [
+                ("attempts", attempts),
+                ("seconds", elapsed["seconds"]),
+                ("attempts/s", attempts / elapsed["seconds"]),
+                *sorted(outcomes.items()),
+                ("double-booked seats", double_booked),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Staff order list with nested flights against side-loaded ones.
+
+Books ``--orders`` orders of one to ``--max-group`` passengers onto
+``--flights`` crewed flights, then fetches pages of ``--page-size``
+orders as a staff user, once with every ticket's flight and crew embedded
+(``?expand=tickets_details.flight_details.crew``) and once as a compound
+document with the flights, crew, routes, airports, airplanes and airplane
+types side-loaded (``?expand=tickets_details&include=...``). Reports the
+response size, plain and gzipped, and the median total, database and
+serializer time from the profiling middleware's ``Server-Timing`` header.
+
+    python -m benchmarks.bench_compound --orders 2500 --page-size 200
+"""
+
+import argparse
+import gzip
+import random
+import re
+import statistics
+from datetime import timedelta
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+)
+
+
+MODES = {
+    "nested": {"expand": "tickets_details.flight_details.crew"},
+    "compound": {
+        "expand": "tickets_details",
+        "include": "flights,crew,routes,airports,airplanes,airplane_types",
+    },
+}
+
+
+def create_flights(count):
+    from django.utils import timezone
+
+    from airplanes.models import Airplane, AirplaneType
+    from airports.models import Airport, Route
+    from flights.models import Crew, Flight
+
+    airports = [
+        Airport.objects.create(name=f"AP{number}", closest_big_city="City")
+        for number in range(8)
+    ]
+    airplane_type = AirplaneType.objects.create(
+        name="Narrow-body", rows=30, seats_in_row=6
+    )
+    departure = timezone.now() + timedelta(days=1)
+    flights = []
+    for number in range(count):
+        source, destination = random.sample(airports, 2)
+        leaves = departure + timedelta(hours=number)
+        flight = Flight.objects.create(
+            flight_number=f"SG{100 + number}",
+            departure_time=leaves,
+            arrival_time=leaves + timedelta(hours=2),
+            route=Route.objects.get_or_create(
+                source=source, destination=destination, distance=800
+            )[0],
+            airplane=Airplane.objects.create(
+                name=f"SG-{number}", airplane_type=airplane_type
+            ),
+        )
+        flight.crew.set(
+            Crew.objects.create(
+                first_name=f"Crew {number}-{member}",
+                last_name="Member",
+                role="Pilot" if member < 2 else "Attendant",
+            )
+            for member in range(6)
+        )
+        flights.append(flight)
+    return flights
+
+
+def book_orders(flights, orders, max_group, user):
+    from decimal import Decimal
+
+    from orders.models import Order
+    from tickets import counters
+    from tickets.inventory import SeatMap
+    from tickets.models import Ticket
+
+    free = {
+        flight.id: list(SeatMap.for_flight(flight).iter_free())
+        for flight in flights
+    }
+    tickets = []
+    groups = []
+    for _ in range(orders):
+        flight = random.choice(flights)
+        seats = free[flight.id][: random.randint(1, max_group)]
+        if not seats:
+            continue
+        del free[flight.id][: len(seats)]
+        groups.append(len(seats))
+        tickets += [
+            Ticket(
+                flight=flight,
+                passenger_name=f"Passenger {len(tickets) + number}",
+                row=row,
+                seat=seat,
+            )
+            for number, (row, seat) in enumerate(seats)
+        ]
+    tickets = Ticket.objects.bulk_create(tickets)
+    counters.recount([flight.id for flight in flights])
+
+    created = Order.objects.bulk_create(
+        Order(user=user, total_price=Decimal("99.00")) for _ in groups
+    )
+    links = []
+    position = 0
+    for order, size in zip(created, groups):
+        links += [
+            Order.tickets.through(order_id=order.id, ticket_id=ticket.id)
+            for ticket in tickets[position : position + size]
+        ]
+        position += size
+    Order.tickets.through.objects.bulk_create(links)
+    return len(created), len(tickets)
+
+
+def server_timing(response):
+    """``{name: milliseconds}`` from a ``Server-Timing`` header."""
+    return {
+        name: float(duration)
+        for name, duration in re.findall(
+            r"(\w+);dur=([\d.]+)", response["Server-Timing"]
+        )
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--flights", type=int, default=40)
+    parser.add_argument("--orders", type=int, default=2500)
+    parser.add_argument("--max-group", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    random.seed(1)
+
+    from django.contrib.auth.models import User
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    with benchmark_database(), override_settings(PROFILING_SAMPLE_RATE=1):
+        staff = User.objects.create_user(
+            username="bench", password="bench", is_staff=True
+        )
+        flights = create_flights(args.flights)
+        orders, tickets = book_orders(
+            flights, args.orders, args.max_group, staff
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user=staff)
+
+        rows = []
+        for mode, params in MODES.items():
+            params = dict(params, page_size=args.page_size)
+            timings = []
+            for _ in range(args.repeat + 1):
+                response = client.get("/api/orders/", params)
+                assert response.status_code == 200, response.status_code
+                timings.append(server_timing(response))
+            # The first request warms the reference cache.
+            timings = timings[1:]
+            content = response.content
+            rows += [
+                (f"{mode}: bytes", len(content)),
+                (f"{mode}: gzipped bytes", len(gzip.compress(content))),
+            ] + [
+                (
+                    f"{mode}: {name} ms",
+                    statistics.median(timing[name] for timing in timings),
+                )
+                for name in ("total", "db", "serializer")
+            ]
+
+    report(
+        f"Staff order list, {args.page_size} of {orders:,} orders "
+        f"({tickets:,} tickets on {args.flights} flights)",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
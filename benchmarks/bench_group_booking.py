@@ -0,0 +1,91 @@
+"""
+Group booking throughput: the bulk endpoint against one POST per ticket.
+
+Books the same group of passengers onto two identical flights, once through
+``/api/tickets/`` per passenger and once through ``/api/tickets/bulk/``,
+and reports wall time and query counts for each.
+
+    python -m benchmarks.bench_group_booking --passengers 200
+"""
+
+import argparse
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+from benchmarks.bench_booking import create_flight
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--passengers", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    from tickets.inventory import SEAT_LETTERS
+
+    with benchmark_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        seats_in_row = 8
+        rows = -(-args.passengers // seats_in_row)
+        passengers = [
+            {
+                "passenger_name": f"Passenger {number}",
+                "row": number // seats_in_row + 1,
+                "seat": SEAT_LETTERS[number % seats_in_row],
+            }
+            for number in range(args.passengers)
+        ]
+
+        single_flight = create_flight(rows, seats_in_row)
+        with CaptureQueriesContext(connection) as single_queries:
+            with timer() as single:
+                for passenger in passengers:
+                    response = client.post(
+                        "/api/tickets/",
+                        {"flight": single_flight.id, **passenger},
+                        format="json",
+                    )
+                    assert response.status_code == 201, response.data
+
+        bulk_flight = create_flight(rows, seats_in_row)
+        with CaptureQueriesContext(connection) as bulk_queries:
+            with timer() as bulk:
+                response = client.post(
+                    "/api/tickets/bulk/",
+                    {"flight": bulk_flight.id, "passengers": passengers},
+                    format="json",
+                )
+                assert response.status_code == 201, response.data
+
+        report(
+            f"Group booking, {args.passengers} passengers",
+            [
+                ("per-ticket seconds", single["seconds"]),
+                ("per-ticket queries", len(single_queries)),
+                (
+                    "per-ticket passengers/s",
+                    args.passengers / single["seconds"],
+                ),
+                ("bulk seconds", bulk["seconds"]),
+                ("bulk queries", len(bulk_queries)),
+                ("bulk passengers/s", args.passengers / bulk["seconds"]),
+                ("speed-up", single["seconds"] / bulk["seconds"]),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Hold sweeper cost against a large ticket table.
+
+Fills the database with ``--tickets`` tickets spread over full flights, a
+small share of them seat holds that have already expired and as many that
+are still live. Then it releases expired holds one ticket at a time for a
+sample, and in batches with ``release_expired_holds`` for the rest, and
+reports the throughput of both together with the cost of an idle sweep.
+
+    python -m benchmarks.bench_hold_sweeper --tickets 1000000
+"""
+
+import argparse
+from datetime import timedelta
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+ROWS = 30
+SEATS_IN_ROW = 6
+INSERT_BATCH_SIZE = 10000
+
+
+def fill_tickets(total, expired, live):
+    """
+    Insert ``total`` tickets; every n-th one is an expired hold and the
+    ticket after it a live hold.
+    """
+    from django.utils import timezone
+
+    from airplanes.models import Airplane, AirplaneType
+    from airports.models import Airport, Route
+    from flights.models import Flight
+    from tickets import counters
+    from tickets.inventory import SEAT_LETTERS
+    from tickets.models import Ticket
+
+    source = Airport.objects.create(name="BEN Airport", closest_big_city="A")
+    destination = Airport.objects.create(
+        name="MRK Airport", closest_big_city="B"
+    )
+    route = Route.objects.create(
+        source=source, destination=destination, distance=1000
+    )
+    airplane_type = AirplaneType.objects.create(
+        name="Bench", rows=ROWS, seats_in_row=SEATS_IN_ROW
+    )
+    airplane = Airplane.objects.create(
+        name="BENCH-1", airplane_type=airplane_type
+    )
+
+    seats = ROWS * SEATS_IN_ROW
+    departure = timezone.now() + timedelta(days=1)
+    flights = Flight.objects.bulk_create(
+        [
+            Flight(
+                flight_number=f"BN{number}",
+                departure_time=departure,
+                arrival_time=departure + timedelta(hours=2),
+                route=route,
+                airplane=airplane,
+                capacity=seats,
+            )
+            for number in range(-(-total // seats))
+        ],
+        batch_size=INSERT_BATCH_SIZE,
+    )
+
+    now = timezone.now()
+    step = max(total // max(expired, 1), 2)
+
+    def ticket(number):
+        position = number % seats
+        kwargs = {}
+        if number % step == 0 and number // step < expired:
+            kwargs = {
+                "status": "held",
+                "hold_expires_at": now - timedelta(minutes=1),
+            }
+        elif number % step == 1 and number // step < live:
+            kwargs = {
+                "status": "held",
+                "hold_expires_at": now + timedelta(minutes=10),
+            }
+        return Ticket(
+            flight=flights[number // seats],
+            passenger_name=f"Passenger {number}",
+            row=position // SEATS_IN_ROW + 1,
+            seat=SEAT_LETTERS[position % SEATS_IN_ROW],
+            **kwargs,
+        )
+
+    for start in range(0, total, INSERT_BATCH_SIZE):
+        Ticket.objects.bulk_create(
+            [
+                ticket(number)
+                for number in range(
+                    start, min(start + INSERT_BATCH_SIZE, total)
+                )
+            ]
+        )
+
+    counters.recount([flight.pk for flight in flights])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--expired", type=int, default=10_000)
+    parser.add_argument("--naive-sample", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+
+    from tickets.holds import release_expired_holds
+    from tickets.models import Ticket
+
+    with benchmark_database():
+        with timer() as fill:
+            fill_tickets(args.tickets, args.expired, args.expired)
+
+        now = timezone.now()
+        expired = Ticket.objects.filter(
+            status="held", hold_expires_at__lte=now
+        )
+        plan = (
+            expired.order_by("hold_expires_at")
+            .values_list("pk")[: args.batch_size]
+            .explain()
+        )
+
+        sample = list(expired.order_by("hold_expires_at")[: args.naive_sample])
+        with timer() as naive:
+            for ticket in sample:
+                ticket.status = "expired"
+                ticket.hold_expires_at = None
+                ticket.save()
+
+        remaining = args.expired - len(sample)
+        reset_queries()
+        with CaptureQueriesContext(connection) as batch_queries:
+            with timer() as batched:
+                released = release_expired_holds(
+                    now=now, batch_size=args.batch_size
+                )
+        assert released == remaining, released
+        batched["queries"] = len(batch_queries)
+
+        reset_queries()
+        with CaptureQueriesContext(connection) as idle_queries:
+            with timer() as idle:
+                release_expired_holds(batch_size=args.batch_size)
+
+        print(f"\nBatch query plan:\n{plan}")
+        report(
+            f"Hold sweeper, {args.tickets:,} tickets, "
+            f"{args.expired:,} expired holds",
+            [
+                ("fill seconds", fill["seconds"]),
+                ("row-by-row holds", len(sample)),
+                ("row-by-row holds/s", len(sample) / naive["seconds"]),
+                ("batched holds", released),
+                ("batched seconds", batched["seconds"]),
+                ("batched queries", batched["queries"]),
+                ("batched holds/s", released / batched["seconds"]),
+                ("idle sweep seconds", idle["seconds"]),
+                ("idle sweep queries", len(idle_queries)),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Schedule import throughput.
+
+Writes a CSV schedule of ``--flights`` flights spread over ``--airplanes``
+airplanes with two crew members each, then imports it with the
+``import_schedule`` command and reports its throughput and queries per
+chunk.
+
+    python -m benchmarks.bench_import_schedule --flights 50000
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+def write_schedule(path, flights, airplanes):
+    from django.utils import timezone
+
+    from airplanes.models import Airplane, AirplaneType
+    from airports.models import Airport, Route
+    from flights.models import Crew
+
+    source = Airport.objects.create(name="BEN Airport", closest_big_city="A")
+    destination = Airport.objects.create(
+        name="MRK Airport", closest_big_city="B"
+    )
+    Route.objects.create(source=source, destination=destination, distance=900)
+    airplane_type = AirplaneType.objects.create(
+        name="Bench", rows=30, seats_in_row=6
+    )
+    Airplane.objects.bulk_create(
+        [
+            Airplane(name=f"BENCH-{number}", airplane_type=airplane_type)
+            for number in range(airplanes)
+        ]
+    )
+    Crew.objects.bulk_create(
+        [
+            Crew(first_name="Crew", last_name=str(number), role="Pilot")
+            for number in range(airplanes * 2)
+        ]
+    )
+
+    start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            [
+                "flight_number",
+                "departure_time",
+                "arrival_time",
+                "source",
+                "destination",
+                "airplane",
+                "crew",
+            ]
+        )
+        for number in range(flights):
+            # Each airplane flies every three hours, sorted by departure.
+            slot, airplane = divmod(number, airplanes)
+            departure = start + timedelta(hours=3 * slot)
+            writer.writerow(
+                [
+                    f"BN{number}",
+                    departure.isoformat(),
+                    (departure + timedelta(hours=2)).isoformat(),
+                    "BEN Airport",
+                    "MRK Airport",
+                    f"BENCH-{airplane}",
+                    f"Crew {airplane * 2};Crew {airplane * 2 + 1}",
+                ]
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--flights", type=int, default=50_000)
+    parser.add_argument("--airplanes", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    from flights.models import Flight
+
+    with benchmark_database(), tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "schedule.csv")
+        write_schedule(path, args.flights, args.airplanes)
+
+        out = StringIO()
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            with timer() as imported:
+                call_command(
+                    "import_schedule",
+                    path,
+                    "--chunk-size",
+                    str(args.chunk_size),
+                    stdout=out,
+                )
+            query_count = len(queries)
+        assert Flight.objects.count() == args.flights, out.getvalue()
+
+        chunks = -(-args.flights // args.chunk_size)
+        print(out.getvalue().strip())
+        report(
+            f"Schedule import, {args.flights:,} flights",
+            [
+                ("seconds", imported["seconds"]),
+                ("rows/s", args.flights / imported["seconds"]),
+                ("queries", query_count),
+                ("queries per chunk", query_count / chunks),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Itinerary search latency over a large schedule.
+
+Creates ``--airports`` airports, each with routes to ``--routes-per-airport``
+others, and spreads ``--flights`` flights over the next ``--days`` days.
+Then it times the graph build and ``--searches`` one-day searches between
+random airports with up to two connections.
+
+    python -m benchmarks.bench_itineraries --flights 30000
+"""
+
+import argparse
+import random
+import statistics
+from datetime import timedelta
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+def fill_schedule(airports, routes_per_airport, flights, days):
+    from django.utils import timezone
+
+    from airplanes.models import Airplane, AirplaneType
+    from airports.models import Airport, Route
+    from flights.models import Flight
+
+    airplane_type = AirplaneType.objects.create(
+        name="Bench", rows=30, seats_in_row=6
+    )
+    airplane = Airplane.objects.create(
+        name="BENCH-1", airplane_type=airplane_type
+    )
+    airport_list = Airport.objects.bulk_create(
+        [
+            Airport(name=f"A{number:03}", closest_big_city=f"City {number}")
+            for number in range(airports)
+        ]
+    )
+    route_list = Route.objects.bulk_create(
+        [
+            Route(source=source, destination=destination, distance=800)
+            for source in airport_list
+            for destination in random.sample(
+                [other for other in airport_list if other != source],
+                routes_per_airport,
+            )
+        ]
+    )
+
+    start = timezone.now() + timedelta(hours=1)
+    span = days * 24 * 60
+    schedule = []
+    for number in range(flights):
+        departure = start + timedelta(minutes=random.randrange(span))
+        schedule.append(
+            Flight(
+                flight_number=f"BN{number}",
+                departure_time=departure,
+                arrival_time=departure
+                + timedelta(minutes=random.randrange(60, 300)),
+                route=random.choice(route_list),
+                airplane=airplane,
+                capacity=180,
+            )
+        )
+    Flight.objects.bulk_create(schedule, batch_size=5000)
+    return airport_list, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--airports", type=int, default=60)
+    parser.add_argument("--routes-per-airport", type=int, default=12)
+    parser.add_argument("--flights", type=int, default=30_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--searches", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    random.seed(2024)
+
+    from flights import itineraries
+
+    with benchmark_database():
+        airports, start = fill_schedule(
+            args.airports, args.routes_per_airport, args.flights, args.days
+        )
+
+        itineraries.reset()
+        with timer() as build:
+            itineraries.get_graph()
+
+        latencies = []
+        found = 0
+        for _ in range(args.searches):
+            origin, destination = random.sample(airports, 2)
+            day = (start + timedelta(days=random.randrange(args.days))).date()
+            with timer() as search:
+                results = itineraries.search_itineraries(
+                    origin.id, destination.id, day, day
+                )
+            latencies.append(search["seconds"] * 1000)
+            found += bool(results)
+
+        latencies.sort()
+        report(
+            f"Itinerary search, {args.flights:,} flights, "
+            f"{args.airports} airports",
+            [
+                ("graph build seconds", build["seconds"]),
+                ("searches", args.searches),
+                ("searches with results", found),
+                ("p50 ms", statistics.median(latencies)),
+                ("p95 ms", latencies[int(len(latencies) * 0.95) - 1]),
+                ("max ms", latencies[-1]),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cost of recording metrics.
+
+Times ``--requests`` GETs of the airport list through the full middleware
+stack with metrics on and off, interleaved in rounds so both see the same
+conditions, and reports the added time per request. It also times
+``MetricsStore.observe_request`` on its own, one flush, and one scrape
+of ``/metrics``.
+
+    python -m benchmarks.bench_metrics --requests 2000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+ROUNDS = 10
+
+
+def time_requests(client, count, enabled):
+    from django.test import override_settings
+
+    with override_settings(METRICS_ENABLED=enabled):
+        start = time.perf_counter()
+        for _ in range(count):
+            client.get("/api/airports/")
+        return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client, override_settings
+
+    from airports.models import Airport
+    from skygate_airport_api import metrics
+
+    directory = tempfile.mkdtemp(prefix="skygate-metrics-")
+    with benchmark_database(), override_settings(
+        METRICS_DIR=directory, PROFILING_SAMPLE_RATE=0
+    ):
+        Airport.objects.bulk_create(
+            Airport(name=f"Airport {number}", closest_big_city="City")
+            for number in range(20)
+        )
+        client = Client()
+        per_round = max(args.requests // ROUNDS, 1)
+        time_requests(client, per_round, True)  # Warm up.
+
+        enabled, disabled = [], []
+        for _ in range(ROUNDS):
+            enabled.append(time_requests(client, per_round, True))
+            disabled.append(time_requests(client, per_round, False))
+        with_metrics = statistics.median(enabled)
+        without_metrics = statistics.median(disabled)
+
+        calls = 100000
+        with timer() as observe:
+            for _ in range(calls):
+                metrics.store.observe_request(
+                    "airport-list", "GET", 200, 0.004, (1, 0.0002)
+                )
+        with timer() as flush:
+            metrics.store.flush()
+        with timer() as scrape:
+            body = client.get("/metrics").content
+
+    report(
+        f"Metrics recording over {per_round * ROUNDS} requests per mode",
+        [
+            ("request with metrics (us)", with_metrics * 1e6),
+            ("request without metrics (us)", without_metrics * 1e6),
+            (
+                "overhead per request (us)",
+                (with_metrics - without_metrics) * 1e6,
+            ),
+            ("observe_request alone (us)", observe["seconds"] / calls * 1e6),
+            ("flush (ms)", flush["seconds"] * 1000),
+            ("scrape /metrics (ms)", scrape["seconds"] * 1000),
+            ("scrape size (bytes)", len(body)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
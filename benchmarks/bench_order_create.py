@@ -0,0 +1,100 @@
+"""
+Order creation latency for large orders.
+
+Books ``--tickets`` tickets on a flight, then creates an order holding all
+of them through ``POST /api/orders/``, ``--orders`` times with fresh
+tickets each time. Reports the median latency and the queries run per
+order.
+
+    python -m benchmarks.bench_order_create --tickets 50 --orders 30
+"""
+
+import argparse
+import statistics
+
+from benchmarks.bench_booking import create_flight
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+SEATS_IN_ROW = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tickets", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    from tickets.inventory import SEAT_LETTERS
+    from tickets.models import Ticket
+
+    with benchmark_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        rows_per_order = -(-args.tickets // SEATS_IN_ROW)
+        flight = create_flight(
+            rows_per_order * (args.orders + 1), SEATS_IN_ROW
+        )
+
+        def book_tickets(first_row):
+            return Ticket.objects.bulk_create(
+                Ticket(
+                    flight=flight,
+                    passenger_name=f"Passenger {number}",
+                    row=first_row + number // SEATS_IN_ROW,
+                    seat=SEAT_LETTERS[number % SEATS_IN_ROW],
+                    status="booked",
+                )
+                for number in range(args.tickets)
+            )
+
+        latencies = []
+        queries = []
+        for order_number in range(args.orders + 1):
+            tickets = book_tickets(order_number * rows_per_order + 1)
+            payload = {
+                "tickets": [ticket.pk for ticket in tickets],
+                # Only used where the server does not price orders itself.
+                "total_price": "100.00",
+            }
+            reset_queries()
+            with CaptureQueriesContext(connection) as context:
+                with timer() as elapsed:
+                    response = client.post(
+                        "/api/orders/", payload, format="json"
+                    )
+                executed = len(context)
+            assert response.status_code == 201, response.content
+            if order_number:  # The first order warms caches up.
+                latencies.append(elapsed["seconds"])
+                queries.append(executed)
+
+    report(
+        f"Creating {args.orders} orders of {args.tickets} tickets",
+        [
+            ("median latency (ms)", statistics.median(latencies) * 1000),
+            (
+                "p90 latency (ms)",
+                statistics.quantiles(latencies, n=10)[-1] * 1000,
+            ),
+            ("queries per order", statistics.median(queries)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
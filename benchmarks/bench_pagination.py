@@ -0,0 +1,138 @@
+"""
+Order list page latency deep into a large table.
+
+Fills the database with ``--orders`` orders and fetches a page of the staff
+order list at increasing depths through the API with a keyset cursor. It
+also times the keyset query on its own against the OFFSET and COUNT(*)
+queries that page-number pagination would run instead.
+
+    python -m benchmarks.bench_pagination --orders 2000000
+"""
+
+import argparse
+import statistics
+from datetime import timedelta
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+INSERT_BATCH_SIZE = 20000
+
+
+def fill_orders(total):
+    from decimal import Decimal
+
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from orders.models import Order
+
+    user = User.objects.create_user(
+        username="bench", password="bench", is_staff=True
+    )
+    start = timezone.now() - timedelta(days=365)
+    created_at = Order._meta.get_field("created_at")
+    # Keep the spread-out timestamps instead of stamping every row "now".
+    created_at.auto_now_add = False
+    try:
+        for first in range(0, total, INSERT_BATCH_SIZE):
+            Order.objects.bulk_create(
+                Order(
+                    user=user,
+                    total_price=Decimal("99.00"),
+                    # Five orders per second, so timestamps repeat.
+                    created_at=start + timedelta(seconds=number // 5),
+                )
+                for number in range(
+                    first, min(first + INSERT_BATCH_SIZE, total)
+                )
+            )
+    finally:
+        created_at.auto_now_add = True
+    return user
+
+
+def median_ms(fetch, repeat):
+    samples = []
+    for _ in range(repeat):
+        with timer() as elapsed:
+            fetch()
+        samples.append(elapsed["seconds"] * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=2_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.test import APIClient
+
+    from orders.models import Order
+    from skygate_airport_api.pagination import KeysetPagination
+
+    with benchmark_database():
+        with timer() as fill:
+            user = fill_orders(args.orders)
+
+        client = APIClient()
+        client.force_authenticate(user=user)
+        ordered = Order.objects.order_by("-created_at", "-pk")
+        paginator = KeysetPagination()
+        paginator.ordering = ("-created_at", "-pk")
+        paginator.base_url = "http://testserver/api/orders/"
+
+        rows = [("fill seconds", fill["seconds"])]
+        depths = [0, 10_000, 100_000, args.orders // 2, args.orders - 100]
+        for depth in depths:
+            params = {"page_size": args.page_size}
+            page = ordered
+            if depth:
+                # Building the cursor is setup, not part of the timing.
+                position = paginator.get_position(ordered[depth - 1])
+                page = ordered.filter(
+                    paginator.after_position(position, reverse=False)
+                )
+                paginator.last_position = position
+                paginator.has_next = True
+                link = urlsplit(paginator.get_next_link())
+                params["cursor"] = parse_qs(link.query)["cursor"][0]
+
+            def api():
+                response = client.get("/api/orders/", params)
+                assert response.status_code == 200, response.status_code
+
+            def keyset():
+                list(page[: args.page_size + 1])
+
+            def offset():
+                Order.objects.count()
+                list(ordered[depth : depth + args.page_size])
+
+            rows += [
+                (f"{depth:,}: API page ms", median_ms(api, args.repeat)),
+                (
+                    f"{depth:,}: keyset query ms",
+                    median_ms(keyset, args.repeat),
+                ),
+                (
+                    f"{depth:,}: OFFSET + COUNT ms",
+                    median_ms(offset, args.repeat),
+                ),
+            ]
+
+        report(f"Order list pages, {args.orders:,} orders", rows)
+
+
+if __name__ == "__main__":
+    main()
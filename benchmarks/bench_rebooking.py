@@ -0,0 +1,152 @@
+"""
+Rebooking a full wide-body flight.
+
+Fills a ``--rows`` x ``--seats-in-row`` flight with orders of one to
+``--max-group`` passengers, then cancels it with ``rebook_flight``. The
+passengers go to ``--alternatives`` later flights on the same route, each
+already ``--load`` full, or connect through a hub. Reports the time and
+queries of a dry run and of the actual rebooking.
+
+    python -m benchmarks.bench_rebooking --rows 45 --seats-in-row 9
+"""
+
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.harness import (
+    benchmark_database,
+    report,
+    setup_django,
+    timer,
+)
+
+
+def create_flights(args):
+    from django.utils import timezone
+
+    from airplanes.models import Airplane, AirplaneType
+    from airports.models import Airport, Route
+    from flights.models import Flight
+
+    origin, destination, hub = (
+        Airport.objects.create(name=f"{code} Airport", closest_big_city=code)
+        for code in ("ORG", "DST", "HUB")
+    )
+    routes = {
+        pair: Route.objects.create(
+            source=pair[0], destination=pair[1], distance=5000
+        )
+        for pair in [(origin, destination), (origin, hub), (hub, destination)]
+    }
+    airplane_type = AirplaneType.objects.create(
+        name="Wide-body", rows=args.rows, seats_in_row=args.seats_in_row
+    )
+    departure = timezone.now() + timedelta(days=1)
+
+    def flight(number, source, to, hours):
+        leaves = departure + timedelta(hours=hours)
+        return Flight.objects.create(
+            flight_number=number,
+            departure_time=leaves,
+            arrival_time=leaves + timedelta(hours=9),
+            route=routes[source, to],
+            airplane=Airplane.objects.create(
+                name=number, airplane_type=airplane_type
+            ),
+        )
+
+    canceled = flight("WB100", origin, destination, 0)
+    alternatives = [
+        flight(f"WB{101 + number}", origin, destination, 3 * (number + 1))
+        for number in range(args.alternatives)
+    ]
+    alternatives += [
+        flight("WB200", origin, hub, 1),
+        flight("WB201", hub, destination, 11),
+    ]
+    return canceled, alternatives
+
+
+def fill(flight, load, max_group, user):
+    from orders.models import Order
+    from tickets import counters
+    from tickets.inventory import SeatMap
+    from tickets.models import Ticket
+
+    seat_map = SeatMap.for_flight(flight)
+    seats = list(seat_map.iter_free())
+    seats = seats[: int(len(seats) * load)]
+    tickets = Ticket.objects.bulk_create(
+        Ticket(
+            flight=flight,
+            passenger_name=f"Passenger {number}",
+            row=row,
+            seat=seat,
+        )
+        for number, (row, seat) in enumerate(seats)
+    )
+    counters.recount([flight.id])
+
+    links = []
+    position = 0
+    while position < len(tickets):
+        size = random.randint(1, max_group)
+        order = Order.objects.create(user=user, total_price=0)
+        links += [
+            Order.tickets.through(order_id=order.id, ticket_id=ticket.id)
+            for ticket in tickets[position : position + size]
+        ]
+        position += size
+    Order.tickets.through.objects.bulk_create(links)
+    return len(tickets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=45)
+    parser.add_argument("--seats-in-row", type=int, default=9)
+    parser.add_argument("--alternatives", type=int, default=3)
+    parser.add_argument("--load", type=float, default=0.7)
+    parser.add_argument("--max-group", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    random.seed(1)
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from orders.rebooking import rebook_flight
+
+    with benchmark_database():
+        user = User.objects.create_user(username="bench", password="bench")
+        canceled, alternatives = create_flights(args)
+        passengers = fill(canceled, 1, args.max_group, user)
+        for flight in alternatives:
+            fill(flight, args.load, args.max_group, user)
+
+        with CaptureQueriesContext(connection) as dry_queries:
+            with timer() as dry_run:
+                plan = rebook_flight(canceled, dry_run=True)
+        with CaptureQueriesContext(connection) as queries:
+            with timer() as elapsed:
+                plan = rebook_flight(canceled)
+
+    report(
+        f"Rebooking {passengers} passengers of a canceled flight",
+        [
+            ("dry run (ms)", dry_run["seconds"] * 1000),
+            ("dry run queries", len(dry_queries)),
+            ("rebooking (ms)", elapsed["seconds"] * 1000),
+            ("rebooking queries", len(queries)),
+            ("rebooked", len(plan.moves)),
+            ("unplaced", len(plan.unplaced)),
+            ("split orders", len(plan.split_orders)),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
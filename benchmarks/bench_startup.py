@@ -0,0 +1,81 @@
+"""
+Worker startup cost.
+
+Starts ``--runs`` fresh interpreters, each doing what a gunicorn worker
+does: import the WSGI application, then serve its first requests. Every run
+reports how long the import took, the first request to the API root (which
+loads the URLconf and every view module), the first and second requests
+for the OpenAPI schema, and whether drf_yasg's schema generator was
+imported along the way.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks.harness import BASE_DIR, report
+
+
+WORKER = """
+import json, os, sys, time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "skygate_airport_api.settings")
+timings = {}
+
+start = time.perf_counter()
+from skygate_airport_api.wsgi import application
+timings["import"] = time.perf_counter() - start
+
+from django.test import Client
+
+client = Client(SERVER_NAME="localhost", HTTP_ACCEPT_ENCODING="gzip")
+for label, path in (
+    ("first API request", "/api/"),
+    ("first schema request", "/swagger.json/"),
+    ("second schema request", "/swagger.json/"),
+):
+    start = time.perf_counter()
+    response = client.get(path)
+    timings[label] = time.perf_counter() - start
+    assert response.status_code == 200, (path, response.status_code)
+    if label == "first API request":
+        timings["generator imported"] = "drf_yasg.generators" in sys.modules
+
+timings["schema bytes sent"] = len(response.content)
+print(json.dumps(timings))
+"""
+
+
+def run_worker():
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        cwd=BASE_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_worker() for _ in range(args.runs)]
+    rows = []
+    for label, value in runs[0].items():
+        if isinstance(value, float):
+            seconds = statistics.median(run[label] for run in runs)
+            rows.append((f"{label} (median ms)", seconds * 1000))
+        else:
+            rows.append((label, value))
+    report(f"Worker startup over {args.runs} runs", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway test database created from the configured
+``default`` connection, so they never touch real data. Run them from the
+project root, e.g. ``python -m benchmarks.bench_booking``.
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE", "skygate_airport_api.settings"
+    )
+
+    import django
+
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database(file_backed=False):
+    """
+    Create a test database and test environment for the duration of the
+    block.
+
+    SQLite test databases live in memory by default; pass ``file_backed=True``
+    when the benchmark opens connections from several threads.
+    """
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    if file_backed and connection.vendor == "sqlite":
+        directory = tempfile.mkdtemp(prefix="skygate-bench-")
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            directory, "bench.sqlite3"
+        )
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=False, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextlib.contextmanager
+def timer():
+    """Yield a dict whose ``seconds`` key is filled in when the block exits."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def report(title, rows):
+    """Print ``(label, value)`` pairs as an aligned two-column table."""
+    print(f"\n{title}")
+    print("-" * len(title))
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        if isinstance(value, float):
+            value = f"{value:,.3f}"
+        print(f"{label:<{width}}  {value}")
@@ -16,5 +16,15 @@ echo "Collecting static files..."
 python manage.py collectstatic --noinput --clear
 
 
+echo "Generating OpenAPI schema..."
+python manage.py generate_schema
+
+
+echo "Clearing worker metrics..."
+rm -rf "${METRICS_DIR:-/tmp/skygate-metrics}"
+
+
 echo "Starting server..."
-gunicorn --bind 0.0.0.0:8000 skygate_airport_api.wsgi:application 
+# gunicorn.conf.py runs threaded workers: board streams stay open for
+# minutes and would otherwise block a whole sync worker each.
+gunicorn --config gunicorn.conf.py skygate_airport_api.wsgi:application
@@ -11,6 +11,10 @@ class FlightAdmin(admin.ModelAdmin):
         "route",
         "departure_time",
         "arrival_time",
+        "capacity",
+        "booked_seats",
+        "checked_in_seats",
+        "held_seats",
     )
     list_filter = ("departure_time",)
     search_fields = (
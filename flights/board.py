@@ -0,0 +1,200 @@
+"""
+Departures and arrivals boards per airport.
+
+A board is the next flights leaving from (or landing at) an airport, read
+with the ``(route, departure_time)`` and ``(route, arrival_time)`` indexes
+and cached per airport for ``FLIGHT_BOARD_CACHE_TIMEOUT`` seconds.
+
+Cache keys carry two counters kept in the cache: a version per airport,
+bumped when one of its flights is saved or deleted, and a global generation,
+bumped when routes or airports change or flights are written in bulk. A
+bump makes every process miss and reload, and lets board streams notice
+the change with a single cache read. Both only work across workers with a
+shared cache backend (``REDIS_URL``), and streams need threaded workers
+(see ``gunicorn.conf.py``) since each one holds its request open.
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from airports.models import Route
+from flights.models import Flight
+from skygate_airport_api import metrics
+
+
+GENERATION_KEY = "flight-board:generation"
+VERSION_KEY = "flight-board:version:{airport_id}"
+ROWS_KEY = "flight-board:{generation}:{version}:{airport_id}:{direction}"
+
+# (airport lookup, time field, lookup prefix of the airport at the other end)
+DIRECTIONS = {
+    "departures": ("route__source_id", "departure_time", "route__destination"),
+    "arrivals": ("route__destination_id", "arrival_time", "route__source"),
+}
+
+# Browsers reconnect this long after a stream ends.
+STREAM_RETRY_MS = 3000
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def bump(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def board_state(airport_id):
+    """The ``(generation, version)`` pair the airport's boards are cached at."""
+    version_key = VERSION_KEY.format(airport_id=airport_id)
+    values = cache.get_many([GENERATION_KEY, version_key])
+    return values.get(GENERATION_KEY, 0), values.get(version_key, 0)
+
+
+def airports_changed(airport_ids):
+    """Drop the cached boards of the given airports."""
+    for airport_id in set(airport_ids):
+        bump(VERSION_KEY.format(airport_id=airport_id))
+
+
+def routes_changed(route_ids):
+    """Drop the cached boards of both ends of the given routes."""
+    airport_ids = set()
+    for source_id, destination_id in Route.objects.filter(
+        pk__in=route_ids
+    ).values_list("source_id", "destination_id"):
+        airport_ids.update((source_id, destination_id))
+    airports_changed(airport_ids)
+
+
+def invalidate():
+    """Drop every cached board."""
+    bump(GENERATION_KEY)
+
+
+def load_rows(airport_id, direction, now):
+    airport_field, time_field, other = DIRECTIONS[direction]
+    flights = (
+        Flight.objects.filter(
+            **{airport_field: airport_id, f"{time_field}__gte": now}
+        )
+        .order_by(time_field, "pk")
+        .values_list(
+            "pk",
+            "flight_number",
+            "departure_time",
+            "arrival_time",
+            "status",
+            f"{other}_id",
+            f"{other}__name",
+            f"{other}__closest_big_city",
+        )[: settings.FLIGHT_BOARD_MAX_ROWS]
+    )
+    return [
+        {
+            "flight_id": pk,
+            "flight_number": number,
+            "departure_time": departure,
+            "arrival_time": arrival,
+            "status": flight_status,
+            "airport": {
+                "id": other_id,
+                "name": name,
+                "closest_big_city": city,
+            },
+        }
+        for (
+            pk,
+            number,
+            departure,
+            arrival,
+            flight_status,
+            other_id,
+            name,
+            city,
+        ) in flights
+    ]
+
+
+def get_board(airport_id, direction="departures", limit=None, now=None):
+    """
+    The next ``limit`` flights departing from or arriving at the airport,
+    as dicts ready for ``BoardFlightSerializer``.
+    """
+    limit = limit or settings.FLIGHT_BOARD_MAX_ROWS
+    now = now or timezone.now()
+    _, time_field, _ = DIRECTIONS[direction]
+    generation, version = board_state(airport_id)
+    key = ROWS_KEY.format(
+        generation=generation,
+        version=version,
+        airport_id=airport_id,
+        direction=direction,
+    )
+
+    rows = cache.get(key)
+    upcoming = [] if rows is None else _upcoming(rows, time_field, now)
+    if rows is None or (
+        # Flights have left the cached board and more may be waiting.
+        len(upcoming) < limit
+        and len(rows) == settings.FLIGHT_BOARD_MAX_ROWS
+    ):
+        metrics.count_cache("flight_board", hits=0, misses=1)
+        rows = load_rows(airport_id, direction, now)
+        cache.set(key, rows, settings.FLIGHT_BOARD_CACHE_TIMEOUT)
+        upcoming = rows
+    else:
+        metrics.count_cache("flight_board", hits=1, misses=0)
+    return upcoming[:limit]
+
+
+def _upcoming(rows, time_field, now):
+    return [row for row in rows if row[time_field] >= now]
+
+
+def board_events(airport_id, direction, limit, render):
+    """
+    Yield a Server-Sent Events stream of the board.
+
+    The board is sent on connect and again whenever it changes: when one of
+    the airport's flights changes or a listed flight departs or lands.
+    Between changes each tick is one cache read. The stream ends after
+    ``FLIGHT_BOARD_STREAM_MAX_SECONDS`` so that long-lived connections are
+    spread over workers; browsers reconnect on their own.
+    """
+    _, time_field, _ = DIRECTIONS[direction]
+    deadline = time.monotonic() + settings.FLIGHT_BOARD_STREAM_MAX_SECONDS
+    last_sent = time.monotonic()
+    state = next_change = payload = None
+
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    while True:
+        now = timezone.now()
+        current_state = board_state(airport_id)
+        if current_state != state or (next_change and now >= next_change):
+            state = current_state
+            rows = get_board(airport_id, direction, limit, now)
+            next_change = rows[0][time_field] if rows else None
+            data = json.dumps(render(rows), cls=DjangoJSONEncoder)
+            if data != payload:
+                payload = data
+                last_sent = time.monotonic()
+                yield f"event: board\ndata: {data}\n\n"
+
+        if time.monotonic() - last_sent >= STREAM_KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
+        if time.monotonic() >= deadline:
+            return
+        if not connection.in_atomic_block:
+            # Hand the database connection back while asleep, so hundreds
+            # of open streams do not hold hundreds of connections.
+            connection.close()
+        time.sleep(settings.FLIGHT_BOARD_STREAM_INTERVAL)
@@ -0,0 +1,23 @@
+import django_filters
+from django.db.models import F
+
+from flights.models import Flight
+
+
+class FlightFilter(django_filters.FilterSet):
+    min_available_seats = django_filters.NumberFilter(
+        method="filter_min_available_seats",
+        label="Minimum number of free seats",
+    )
+
+    class Meta:
+        model = Flight
+        fields = ["route", "airplane"]
+
+    def filter_min_available_seats(self, queryset, name, value):
+        return queryset.alias(
+            free_seats=F("capacity")
+            - F("booked_seats")
+            - F("checked_in_seats")
+            - F("held_seats")
+        ).filter(free_seats__gte=value)
@@ -0,0 +1,347 @@
+"""
+Connecting-itinerary search over an in-memory time-expanded flight graph.
+
+The graph holds every upcoming scheduled flight as a leg between two
+airports, grouped by route and sorted by departure time, so finding the
+flights that leave an airport within a time window is a binary search
+instead of a database query. Waiting at an airport is implied by the
+ordering of those lists. Canceled flights are left out.
+
+Each process keeps its own graph. Saving or deleting a flight patches the
+graph of the process that made the change and bumps a generation counter in
+the cache; other processes notice the new generation and rebuild on their
+next search. That takes a cache shared by every process, such as the Redis
+one ``REDIS_URL`` selects; gunicorn will not start several workers
+without it. Graphs are also rebuilt after ``ITINERARY_GRAPH_MAX_AGE``
+seconds, which drops flights that have since departed.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from flights.models import Flight
+
+
+GENERATION_KEY = "itinerary-graph:generation"
+
+EMPTY = frozenset()
+
+LEG_FIELDS = (
+    "id",
+    "flight_number",
+    "route__source_id",
+    "route__destination_id",
+    "departure_time",
+    "arrival_time",
+)
+
+
+class Leg(NamedTuple):
+    departure: float
+    arrival: float
+    flight_id: int
+    flight_number: str
+    source_id: int
+    destination_id: int
+
+    @classmethod
+    def from_values(cls, values):
+        """Build a leg from a ``values_list(*LEG_FIELDS)`` row."""
+        flight_id, number, source, destination, departure, arrival = values
+        return cls(
+            departure.timestamp(),
+            arrival.timestamp(),
+            flight_id,
+            number,
+            source,
+            destination,
+        )
+
+
+class ItineraryGraph:
+    """
+    Upcoming flights indexed by route and departure time.
+
+    ``legs[(source_id, destination_id)]`` is sorted by departure, with the
+    departure timestamps mirrored in ``departures`` for ``bisect``.
+    ``successors`` and ``predecessors`` hold the airports reachable from and
+    leading to each airport, which prunes the search to routes that can
+    actually reach the destination.
+    """
+
+    def __init__(self, generation=None):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.legs = defaultdict(list)
+        self.departures = defaultdict(list)
+        self.successors = defaultdict(set)
+        self.predecessors = defaultdict(set)
+        self.by_flight = {}
+
+    @classmethod
+    def build(cls, generation=None):
+        """Load all upcoming flights with a single query."""
+        graph = cls(generation)
+        flights = (
+            Flight.objects.filter(
+                departure_time__gte=timezone.now(), status="scheduled"
+            )
+            .order_by("departure_time")
+            .values_list(*LEG_FIELDS)
+        )
+        for values in flights.iterator(chunk_size=5000):
+            leg = Leg.from_values(values)
+            route = (leg.source_id, leg.destination_id)
+            # Rows arrive in departure order, so appending keeps lists sorted.
+            graph.legs[route].append(leg)
+            graph.departures[route].append(leg.departure)
+            graph.successors[leg.source_id].add(leg.destination_id)
+            graph.predecessors[leg.destination_id].add(leg.source_id)
+            graph.by_flight[leg.flight_id] = leg
+        return graph
+
+    def is_expired(self):
+        return (
+            time.monotonic() - self.built_at > settings.ITINERARY_GRAPH_MAX_AGE
+        )
+
+    def add(self, leg):
+        route = (leg.source_id, leg.destination_id)
+        position = bisect.bisect_right(self.departures[route], leg.departure)
+        self.legs[route].insert(position, leg)
+        self.departures[route].insert(position, leg.departure)
+        self.successors[leg.source_id].add(leg.destination_id)
+        self.predecessors[leg.destination_id].add(leg.source_id)
+        self.by_flight[leg.flight_id] = leg
+
+    def remove(self, flight_id):
+        leg = self.by_flight.pop(flight_id, None)
+        if leg is None:
+            return
+        route = (leg.source_id, leg.destination_id)
+        position = self.legs[route].index(leg)
+        del self.legs[route][position]
+        del self.departures[route][position]
+        # Successor sets may keep a route without flights; the search just
+        # finds no legs on it.
+
+    def update_flight(self, flight_id):
+        """Reload one flight from the database into the graph."""
+        self.remove(flight_id)
+        values = (
+            Flight.objects.filter(
+                pk=flight_id,
+                departure_time__gte=timezone.now(),
+                status="scheduled",
+            )
+            .values_list(*LEG_FIELDS)
+            .first()
+        )
+        if values is not None:
+            self.add(Leg.from_values(values))
+
+    def legs_between(self, source_id, destination_id, earliest, latest):
+        """Legs on a route departing within ``[earliest, latest]``."""
+        route = (source_id, destination_id)
+        departures = self.departures.get(route)
+        if not departures:
+            return []
+        start = bisect.bisect_left(departures, earliest)
+        end = bisect.bisect_right(departures, latest)
+        return self.legs[route][start:end]
+
+    def next_leg(
+        self, previous, destination_id, min_connection, max_connection
+    ):
+        """
+        The leg to ``destination_id`` that can be caught after ``previous``
+        and arrives first, or ``None``.
+        """
+        candidates = self.legs_between(
+            previous.destination_id,
+            destination_id,
+            previous.arrival + min_connection,
+            previous.arrival + max_connection,
+        )
+        return min(candidates, key=lambda leg: leg.arrival, default=None)
+
+    def search(
+        self,
+        origin_id,
+        destination_id,
+        earliest,
+        latest,
+        max_connections=2,
+        limit=None,
+    ):
+        """
+        Itineraries from ``origin_id`` to ``destination_id`` whose first leg
+        departs between the ``earliest`` and ``latest`` timestamps.
+
+        Returns tuples of legs, earliest arrival first. On every connection
+        only the first-arriving onward flight is considered.
+        """
+        min_connection = settings.ITINERARY_MIN_CONNECTION_MINUTES * 60
+        max_connection = settings.ITINERARY_MAX_CONNECTION_HOURS * 3600
+        limit = limit or settings.ITINERARY_MAX_RESULTS
+
+        def onward(previous, to):
+            return self.next_leg(previous, to, min_connection, max_connection)
+
+        itineraries = [
+            (leg,)
+            for leg in self.legs_between(
+                origin_id, destination_id, earliest, latest
+            )
+        ]
+
+        if max_connections >= 1:
+            vias = self.successors.get(origin_id, EMPTY) - {destination_id}
+            for via in vias:
+                first_legs = self.legs_between(
+                    origin_id, via, earliest, latest
+                )
+                if not first_legs:
+                    continue
+
+                if destination_id in self.successors.get(via, EMPTY):
+                    for first in first_legs:
+                        second = onward(first, destination_id)
+                        if second is not None:
+                            itineraries.append((first, second))
+
+                if max_connections < 2:
+                    continue
+                for second_via in (
+                    self.successors.get(via, EMPTY)
+                    & self.predecessors.get(destination_id, EMPTY)
+                ) - {origin_id, destination_id}:
+                    for first in first_legs:
+                        second = onward(first, second_via)
+                        if second is None:
+                            continue
+                        third = onward(second, destination_id)
+                        if third is not None:
+                            itineraries.append((first, second, third))
+
+        itineraries.sort(
+            key=lambda legs: (legs[-1].arrival, len(legs), -legs[0].departure)
+        )
+        return itineraries[:limit]
+
+
+_graph = None
+_lock = threading.Lock()
+
+
+def current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        return cache.incr(GENERATION_KEY)
+
+
+def get_graph():
+    """Return this process's graph, rebuilding it when it is out of date."""
+    global _graph
+    generation = current_generation()
+    with _lock:
+        if (
+            _graph is None
+            or _graph.generation != generation
+            or _graph.is_expired()
+        ):
+            _graph = ItineraryGraph.build(generation)
+        return _graph
+
+
+def flight_changed(flight_id):
+    """
+    Apply a saved or deleted flight to the graph and tell other processes.
+
+    Call after the change has been committed.
+    """
+    generation = bump_generation()
+    with _lock:
+        if _graph is not None and _graph.generation == generation - 1:
+            _graph.update_flight(flight_id)
+            _graph.generation = generation
+
+
+def invalidate():
+    """Make every process rebuild its graph on the next search."""
+    bump_generation()
+
+
+def reset():
+    """Drop this process's graph."""
+    global _graph
+    with _lock:
+        _graph = None
+
+
+def search_itineraries(
+    origin, destination, date_from, date_to, max_connections=2
+):
+    """
+    Search itineraries between the airports with ids ``origin`` and
+    ``destination`` whose first flight departs on ``date_from`` through
+    ``date_to`` (dates in the current time zone).
+
+    Returns a list of dicts ready for ``ItinerarySerializer``.
+    """
+    zone = timezone.get_current_timezone()
+    earliest = datetime.combine(date_from, datetime.min.time(), zone)
+    latest = datetime.combine(
+        date_to + timedelta(days=1), datetime.min.time(), zone
+    )
+    earliest = max(earliest, timezone.now())
+
+    itineraries = get_graph().search(
+        origin,
+        destination,
+        earliest.timestamp(),
+        latest.timestamp() - 1e-6,
+        max_connections=max_connections,
+    )
+    return [as_dict(legs) for legs in itineraries]
+
+
+def as_dict(legs):
+    def moment(timestamp):
+        return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+    return {
+        "departure_time": moment(legs[0].departure),
+        "arrival_time": moment(legs[-1].arrival),
+        "duration_minutes": round((legs[-1].arrival - legs[0].departure) / 60),
+        "connections": len(legs) - 1,
+        "legs": [
+            {
+                "flight_id": leg.flight_id,
+                "flight_number": leg.flight_number,
+                "source": leg.source_id,
+                "destination": leg.destination_id,
+                "departure_time": moment(leg.departure),
+                "arrival_time": moment(leg.arrival),
+            }
+            for leg in legs
+        ],
+    }
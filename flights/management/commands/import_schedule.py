@@ -0,0 +1,336 @@
+import csv
+import json
+import sys
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from airplanes.models import Airplane
+from airports.models import Route
+from flights import board, itineraries
+from flights.models import Crew, Flight
+from flights.schedule import ScheduledFlight, conflict_errors, find_conflicts
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+
+class DryRunRollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a flight schedule from a CSV or NDJSON file, streaming it in "
+        "chunks. Each row needs flight_number, departure_time, arrival_time, "
+        "airplane (name or id), either route (id) or source and destination "
+        "(airport names), and optionally crew (ids or 'First Last' names "
+        "separated by ';'). Rows that fail validation or clash with the "
+        "schedule are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Input format. Guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows validated and written together.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate everything but roll back instead of saving.",
+        )
+        parser.add_argument(
+            "--errors",
+            help="Write rejected rows to this file instead of stderr.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        input_format = options["format"] or (
+            "ndjson"
+            if options["path"].endswith((".ndjson", ".jsonl"))
+            else "csv"
+        )
+        try:
+            source = (
+                sys.stdin
+                if options["path"] == "-"
+                else open(options["path"], newline="", encoding="utf-8")
+            )
+            errors = (
+                open(options["errors"], "w", encoding="utf-8")
+                if options["errors"]
+                else self.stderr
+            )
+        except OSError as error:
+            raise CommandError(error)
+
+        self.load_lookups()
+        self.totals = defaultdict(int)
+        started = time.perf_counter()
+        try:
+            rows = self.read_rows(source, input_format)
+            if options["dry_run"]:
+                try:
+                    with transaction.atomic():
+                        self.import_rows(rows, options["chunk_size"], errors)
+                        raise DryRunRollback
+                except DryRunRollback:
+                    pass
+            else:
+                self.import_rows(rows, options["chunk_size"], errors)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if options["errors"]:
+                errors.close()
+
+        if self.totals["imported"] and not options["dry_run"]:
+            itineraries.invalidate()
+            board.invalidate()
+        self.report(time.perf_counter() - started, options["dry_run"])
+
+    def load_lookups(self):
+        """Load every route, airplane and crew member into dictionaries."""
+        self.routes = {}
+        self.route_ids = set()
+        for pk, source, destination in Route.objects.values_list(
+            "pk", "source__name", "destination__name"
+        ):
+            self.route_ids.add(pk)
+            self.routes.setdefault((source, destination), []).append(pk)
+
+        self.airplanes = {}
+        self.airplane_seats = {}
+        for pk, name, rows, seats_in_row in Airplane.objects.values_list(
+            "pk",
+            "name",
+            "airplane_type__rows",
+            "airplane_type__seats_in_row",
+        ):
+            self.airplanes.setdefault(name, []).append(pk)
+            self.airplane_seats[pk] = rows * seats_in_row
+
+        self.crew = {}
+        self.crew_ids = set()
+        for pk, first_name, last_name in Crew.objects.values_list(
+            "pk", "first_name", "last_name"
+        ):
+            self.crew_ids.add(pk)
+            self.crew.setdefault(f"{first_name} {last_name}", []).append(pk)
+
+    def read_rows(self, source, input_format):
+        """Yield ``(line_number, row)`` pairs without reading ahead."""
+        if input_format == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                row = {"__error__": f"Invalid JSON: {error}"}
+            yield line_number, row
+
+    def import_rows(self, rows, chunk_size, errors):
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            with transaction.atomic():
+                self.import_chunk(chunk, errors)
+
+    def import_chunk(self, chunk, errors):
+        self.totals["read"] += len(chunk)
+        proposals = []
+        rejected = {}
+        for line_number, row in chunk:
+            proposal, row_errors = self.parse_row(line_number, row)
+            if row_errors:
+                rejected[line_number] = row_errors
+            else:
+                proposals.append(proposal)
+
+        taken_numbers = set(
+            Flight.objects.filter(
+                route_id__in={proposal.route_id for proposal, _ in proposals},
+                flight_number__in={
+                    proposal.flight_number for proposal, _ in proposals
+                },
+            ).values_list("route_id", "flight_number")
+        )
+        conflicts = find_conflicts([flight for _, flight in proposals])
+
+        accepted = []
+        for proposal, flight in proposals:
+            row_errors = conflict_errors(conflicts.get(flight.key, []))
+            number = (proposal.route_id, proposal.flight_number)
+            if number in taken_numbers:
+                row_errors["flight_number"] = [
+                    f"Flight number {proposal.flight_number} already exists "
+                    "on this route."
+                ]
+            if row_errors:
+                rejected[flight.key] = row_errors
+            else:
+                taken_numbers.add(number)
+                accepted.append((proposal, flight))
+
+        created = Flight.objects.bulk_create(
+            [proposal for proposal, _ in accepted]
+        )
+        Flight.crew.through.objects.bulk_create(
+            [
+                Flight.crew.through(
+                    flight_id=created_flight.pk, crew_id=crew_id
+                )
+                for created_flight, (_, flight) in zip(created, accepted)
+                for crew_id in flight.crew_ids
+            ]
+        )
+
+        self.totals["imported"] += len(created)
+        self.totals["rejected"] += len(rejected)
+        for line_number in sorted(rejected):
+            for field, messages in rejected[line_number].items():
+                for message in messages:
+                    errors.write(f"line {line_number}: {field}: {message}\n")
+
+    def parse_row(self, line_number, row):
+        """
+        Turn a row into an unsaved Flight and its ScheduledFlight, or
+        return the row's errors.
+        """
+        if "__error__" in row:
+            return None, {"row": [row["__error__"]]}
+
+        errors = defaultdict(list)
+
+        def text(field):
+            value = row.get(field)
+            return "" if value is None else str(value).strip()
+
+        flight_number = text("flight_number")
+        if not flight_number:
+            errors["flight_number"].append("This field is required.")
+        elif len(flight_number) > 10:
+            errors["flight_number"].append("At most 10 characters.")
+
+        times = {}
+        for field in ("departure_time", "arrival_time"):
+            try:
+                value = parse_datetime(text(field))
+            except ValueError:
+                value = None
+            if value is None:
+                errors[field].append("Expected an ISO 8601 date and time.")
+            elif timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            times[field] = value
+        if (
+            not errors.keys() & times.keys()
+            and times["arrival_time"] <= times["departure_time"]
+        ):
+            errors["arrival_time"].append(
+                "Arrival time must be after departure time."
+            )
+
+        if text("route"):
+            route_id = self.resolve_id(text("route"), self.route_ids)
+            route_ids = [route_id] if route_id else []
+        else:
+            route_ids = self.routes.get(
+                (text("source"), text("destination")), []
+            )
+        self.check_reference(errors, "route", route_ids)
+
+        airplane = text("airplane")
+        airplane_id = self.resolve_id(airplane, self.airplane_seats)
+        airplane_ids = (
+            [airplane_id] if airplane_id else self.airplanes.get(airplane, [])
+        )
+        self.check_reference(errors, "airplane", airplane_ids)
+
+        crew = row.get("crew") or []
+        if isinstance(crew, str):
+            crew = crew.split(";")
+        crew_ids = []
+        for member in crew:
+            member = str(member).strip()
+            if not member:
+                continue
+            crew_id = self.resolve_id(member, self.crew_ids)
+            matches = [crew_id] if crew_id else self.crew.get(member, [])
+            if self.check_reference(errors, "crew", matches, member):
+                crew_ids.append(matches[0])
+
+        if errors:
+            return None, dict(errors)
+
+        proposal = Flight(
+            flight_number=flight_number,
+            departure_time=times["departure_time"],
+            arrival_time=times["arrival_time"],
+            route_id=route_ids[0],
+            airplane_id=airplane_ids[0],
+            capacity=self.airplane_seats[airplane_ids[0]],
+        )
+        flight = ScheduledFlight.from_flight(
+            proposal, crew_ids=dict.fromkeys(crew_ids), key=line_number
+        )
+        return (proposal, flight), None
+
+    @staticmethod
+    def resolve_id(value, known_ids):
+        if value.isdigit() and int(value) in known_ids:
+            return int(value)
+        return None
+
+    @staticmethod
+    def check_reference(errors, field, matches, label=None):
+        label = f"'{label}'" if label else "Reference"
+        if not matches:
+            errors[field].append(f"{label} not found.")
+        elif len(matches) > 1:
+            errors[field].append(f"{label} is ambiguous, use the id instead.")
+        else:
+            return True
+        return False
+
+    def report(self, seconds, dry_run):
+        totals = self.totals
+        verb = "would be imported" if dry_run else "imported"
+        rate = totals["read"] / seconds if seconds else 0
+        summary = (
+            f"Read {totals['read']} rows: {totals['imported']} {verb}, "
+            f"{totals['rejected']} rejected in {seconds:.2f}s "
+            f"({rate:,.0f} rows/s"
+        )
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if sys.platform == "darwin":
+                peak //= 1024
+            summary += f", peak memory {peak / 1024:,.1f} MB"
+        summary += ")."
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from flights.models import Flight
+from tickets.counters import COUNTER_FIELDS, actual_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the seat counters stored on flights from their tickets "
+        "and report every flight whose counters had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, do not write the corrected counters.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of flights checked per query.",
+        )
+
+    def handle(self, *args, **options):
+        fields = ["capacity", *COUNTER_FIELDS.values()]
+        flights = actual_counters(Flight.objects.order_by("pk"))
+        checked = 0
+        drifted = []
+
+        for flight in flights.iterator(chunk_size=options["batch_size"]):
+            checked += 1
+            changes = {
+                field: (
+                    getattr(flight, field),
+                    getattr(flight, f"actual_{field}"),
+                )
+                for field in fields
+                if getattr(flight, field) != getattr(flight, f"actual_{field}")
+            }
+            if not changes:
+                continue
+
+            drifted.append(flight)
+            self.stdout.write(
+                f"Flight {flight.pk} ({flight.flight_number}): "
+                + ", ".join(
+                    f"{field} {stored} -> {actual}"
+                    for field, (stored, actual) in changes.items()
+                )
+            )
+            for field, (_, actual) in changes.items():
+                setattr(flight, field, actual)
+
+        if drifted and not options["dry_run"]:
+            Flight.objects.bulk_update(
+                drifted, fields, batch_size=options["batch_size"]
+            )
+            Flight.objects.filter(
+                pk__in=[flight.pk for flight in drifted]
+            ).update(version=F("version") + 1)
+
+        verb = "would be fixed" if options["dry_run"] else "fixed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} flights, {len(drifted)} drifted "
+                f"({verb})."
+            )
+        )
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:11
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def populate_seat_counters(apps, schema_editor):
+    Flight = apps.get_model("flights", "Flight")
+    flights = list(
+        Flight.objects.annotate(
+            actual_capacity=F("airplane__airplane_type__rows")
+            * F("airplane__airplane_type__seats_in_row"),
+            actual_booked_seats=Count(
+                "tickets", filter=Q(tickets__status="booked")
+            ),
+            actual_checked_in_seats=Count(
+                "tickets", filter=Q(tickets__status="checked_in")
+            ),
+        )
+    )
+    for flight in flights:
+        flight.capacity = flight.actual_capacity
+        flight.booked_seats = flight.actual_booked_seats
+        flight.checked_in_seats = flight.actual_checked_in_seats
+    Flight.objects.bulk_update(
+        flights,
+        ["capacity", "booked_seats", "checked_in_seats"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0001_initial"),
+        ("tickets", "0005_active_seat_unique_constraint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="booked_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="capacity",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="checked_in_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_seat_counters, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0002_flight_seat_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
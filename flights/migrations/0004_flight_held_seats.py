@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0003_flight_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="held_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
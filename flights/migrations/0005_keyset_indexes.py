@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0004_flight_held_seats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["departure_time", "id"],
+                name="flight_departure_keyset_idx",
+            ),
+        ),
+    ]
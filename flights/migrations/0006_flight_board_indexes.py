@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airplanes", "0001_initial"),
+        ("airports", "0001_initial"),
+        ("flights", "0005_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["route", "arrival_time"],
+                name="flight_route_arrival_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0006_flight_board_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="status",
+            field=models.CharField(
+                choices=[("scheduled", "Scheduled"), ("canceled", "Canceled")],
+                default="scheduled",
+                editable=False,
+                max_length=20,
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from airplanes.models import Airplane
 from airports.models import Route
 from django.core.exceptions import ValidationError
@@ -14,6 +15,11 @@ class Crew(models.Model):
 
 
 class Flight(models.Model):
+    STATUS_CHOICES = [
+        ("scheduled", "Scheduled"),
+        ("canceled", "Canceled"),
+    ]
+
     flight_number = models.CharField(max_length=10)
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
@@ -24,37 +30,111 @@ class Flight(models.Model):
         Airplane, on_delete=models.CASCADE, related_name="flights"
     )
     crew = models.ManyToManyField(Crew, related_name="flights")
+    capacity = models.PositiveIntegerField(default=0, editable=False)
+    booked_seats = models.PositiveIntegerField(default=0, editable=False)
+    checked_in_seats = models.PositiveIntegerField(default=0, editable=False)
+    held_seats = models.PositiveIntegerField(default=0, editable=False)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    # Only changed by orders.rebooking.rebook_flight.
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default="scheduled",
+        editable=False,
+    )
+
+    # Maintained with F() updates as tickets change, never written by save().
+    MAINTAINED_FIELDS = (
+        "booked_seats",
+        "checked_in_seats",
+        "held_seats",
+        "version",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["departure_time", "id"],
+                name="flight_departure_keyset_idx",
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx",
+            ),
+            models.Index(
+                fields=["route", "arrival_time"],
+                name="flight_route_arrival_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the board signal refresh the old route's airports too.
+        instance._loaded_route_id = instance.__dict__.get("route_id")
+        return instance
 
     def __str__(self):
         return f"Flight {self.flight_number} ({self.route})"
 
+    @property
+    def available_seats(self):
+        return (
+            self.capacity
+            - self.booked_seats
+            - self.checked_in_seats
+            - self.held_seats
+        )
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.MAINTAINED_FIELDS
+            ]
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "capacity" in update_fields:
+            self.capacity = self.airplane.airplane_type.total_seats
+        super().save(*args, **kwargs)
+
+        if not adding:
+            self.bump_version()
+
+    def bump_version(self):
+        """Mark the flight as changed for conditional GETs and caches."""
+        Flight.objects.filter(pk=self.pk).update(version=F("version") + 1)
+
     def clean(self):
 
         if self.arrival_time <= self.departure_time:
             raise ValidationError("Arrival time must be after departure time")
 
-        overlapping_flights = Flight.objects.filter(
-            airplane=self.airplane,
-            departure_time__lt=self.arrival_time,
-            arrival_time__gt=self.departure_time,
-        ).exclude(pk=self.pk)
+        from flights.schedule import (
+            ScheduledFlight,
+            conflict_errors,
+            find_conflicts,
+        )
 
-        if overlapping_flights.exists():
-            raise ValidationError(
-                "This airplane is already scheduled for another flight during this time"
+        errors = {}
+        if (
+            Flight.objects.filter(
+                flight_number=self.flight_number, route=self.route
             )
-
-        if Flight.objects.filter(
-            flight_number=self.flight_number, route=self.route
-        ).exists():
-            raise ValidationError(
+            .exclude(pk=self.pk)
+            .exists()
+        ):
+            errors["flight_number"] = (
                 f"Flight number {self.flight_number} already exists on this route"
             )
 
-        if self.airplane.capacity < self.route.minimum_capacity:
-            raise ValidationError(
-                (
-                    f"Airplane capacity {self.airplane.capacity} is less than "
-                    f"the minimum capacity required for this route"
-                )
-            )
+        # Crew of an unsaved flight is only known once it has been saved;
+        # FlightSerializer checks the crew being assigned.
+        flight = ScheduledFlight.from_flight(self)
+        conflicts = find_conflicts([flight]).get(flight.key, [])
+        errors.update(conflict_errors(conflicts))
+        if errors:
+            raise ValidationError(errors)
@@ -0,0 +1,264 @@
+"""
+Schedule conflict detection for airplanes and crew.
+
+Flights are kept in one interval index per airplane and per crew member.
+Each index is a list of intervals sorted by departure, with a running
+maximum of arrival times, so finding the flights that overlap a time span
+is a binary search followed by a short backwards scan.
+
+``find_conflicts`` checks one flight or a whole batch of proposed flights
+against the stored schedule and against each other, loading the stored
+schedule with two queries, and reports every conflict it finds.
+"""
+
+import bisect
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+
+from flights.models import Crew, Flight
+
+
+class ScheduledFlight(NamedTuple):
+    """
+    A flight as seen by the conflict check.
+
+    ``key`` identifies the flight in the results: the primary key for stored
+    flights, anything the caller likes for proposed ones. ``pk`` is set when
+    a proposal replaces a stored flight.
+    """
+
+    key: object
+    pk: object
+    flight_number: str
+    airplane_id: int
+    crew_ids: tuple
+    departure: object
+    arrival: object
+
+    @classmethod
+    def from_flight(cls, flight, crew_ids=None, key=None):
+        if crew_ids is None:
+            crew_ids = (
+                [member.pk for member in flight.crew.all()]
+                if flight.pk
+                else []
+            )
+        return cls(
+            key=flight.pk if key is None else key,
+            pk=flight.pk,
+            flight_number=flight.flight_number,
+            airplane_id=flight.airplane_id,
+            crew_ids=tuple(crew_ids),
+            departure=flight.departure_time,
+            arrival=flight.arrival_time,
+        )
+
+
+class Conflict(NamedTuple):
+    kind: str
+    flight: ScheduledFlight
+    other: ScheduledFlight
+    crew_name: str = ""
+
+    @property
+    def message(self):
+        departure = timezone.localtime(self.other.departure)
+        arrival = timezone.localtime(self.other.arrival)
+        when = (
+            f"flight {self.other.flight_number} from "
+            f"{departure:%Y-%m-%d %H:%M} to {arrival:%Y-%m-%d %H:%M}"
+        )
+        if self.kind == "airplane":
+            return f"The airplane is already scheduled for {when}."
+        return f"Crew member {self.crew_name} is already assigned to {when}."
+
+
+class IntervalIndex:
+    """Flights sorted by departure with a running maximum of arrivals."""
+
+    def __init__(self, flights=()):
+        self.flights = sorted(flights, key=lambda flight: flight.departure)
+        self.departures = [flight.departure for flight in self.flights]
+        self.max_arrivals = []
+        latest = None
+        for flight in self.flights:
+            if latest is None or flight.arrival > latest:
+                latest = flight.arrival
+            self.max_arrivals.append(latest)
+
+    def overlapping(self, departure, arrival):
+        """Flights in the air at some point between the two times."""
+        found = []
+        position = bisect.bisect_left(self.departures, arrival)
+        for index in range(position - 1, -1, -1):
+            if self.max_arrivals[index] <= departure:
+                # Nothing at or before this index lands after ``departure``.
+                break
+            if self.flights[index].arrival > departure:
+                found.append(self.flights[index])
+        found.reverse()
+        return found
+
+
+class ScheduleIndex:
+    """Interval indexes of a set of flights, per airplane and crew member."""
+
+    def __init__(self, flights, crew_names=None):
+        by_airplane = defaultdict(list)
+        by_crew = defaultdict(list)
+        for flight in flights:
+            if flight.airplane_id is not None:
+                by_airplane[flight.airplane_id].append(flight)
+            for crew_id in flight.crew_ids:
+                by_crew[crew_id].append(flight)
+
+        self.airplanes = {
+            airplane_id: IntervalIndex(items)
+            for airplane_id, items in by_airplane.items()
+        }
+        self.crew = {
+            crew_id: IntervalIndex(items) for crew_id, items in by_crew.items()
+        }
+        self.crew_names = crew_names or {}
+
+    @classmethod
+    def load(cls, proposals):
+        """
+        Index ``proposals`` together with the stored flights that share an
+        airplane or crew member with them and fall within their time span.
+
+        Stored flights replaced by a proposal are left out, and so are
+        canceled ones, which no longer hold their airplane or crew. Runs two
+        queries whatever the number of proposals.
+        """
+        if not proposals:
+            return cls([])
+
+        earliest = min(proposal.departure for proposal in proposals)
+        latest = max(proposal.arrival for proposal in proposals)
+        replaced = [proposal.pk for proposal in proposals if proposal.pk]
+        airplane_ids = {proposal.airplane_id for proposal in proposals}
+        crew_ids = {
+            crew_id for proposal in proposals for crew_id in proposal.crew_ids
+        }
+
+        stored = {}
+        airplane_flights = (
+            Flight.objects.filter(
+                airplane_id__in=airplane_ids,
+                status="scheduled",
+                departure_time__lt=latest,
+                arrival_time__gt=earliest,
+            )
+            .exclude(pk__in=replaced)
+            .values_list(
+                "pk",
+                "flight_number",
+                "airplane_id",
+                "departure_time",
+                "arrival_time",
+            )
+        )
+        for pk, number, airplane_id, departure, arrival in airplane_flights:
+            stored[pk] = ScheduledFlight(
+                pk, pk, number, airplane_id, (), departure, arrival
+            )
+
+        crew_names = {}
+        if crew_ids:
+            # A left join, so crew members without stored flights in the
+            # window still come back with their names.
+            window = Q(
+                flights__status="scheduled",
+                flights__departure_time__lt=latest,
+                flights__arrival_time__gt=earliest,
+            )
+            if replaced:
+                window &= ~Q(flights__pk__in=replaced)
+            crew = (
+                Crew.objects.filter(pk__in=crew_ids)
+                .annotate(window=FilteredRelation("flights", condition=window))
+                .values_list(
+                    "pk",
+                    "first_name",
+                    "last_name",
+                    "window__pk",
+                    "window__flight_number",
+                    "window__departure_time",
+                    "window__arrival_time",
+                )
+            )
+            for crew_id, first, last, pk, number, departure, arrival in crew:
+                crew_names[crew_id] = f"{first} {last}"
+                if pk is None:
+                    continue
+                if pk not in stored:
+                    # Only tracked for its crew: keep it out of the airplane
+                    # index, which already holds every relevant flight.
+                    stored[pk] = ScheduledFlight(
+                        pk, pk, number, None, (), departure, arrival
+                    )
+                stored[pk] = stored[pk]._replace(
+                    crew_ids=stored[pk].crew_ids + (crew_id,)
+                )
+
+        return cls([*stored.values(), *proposals], crew_names)
+
+    def conflicts(self, flight):
+        """Every conflict of ``flight`` with another indexed flight."""
+        found = []
+        airplane_index = self.airplanes.get(flight.airplane_id)
+        if airplane_index is not None:
+            found.extend(
+                Conflict("airplane", flight, other)
+                for other in airplane_index.overlapping(
+                    flight.departure, flight.arrival
+                )
+                if other.key != flight.key
+            )
+        for crew_id in flight.crew_ids:
+            crew_index = self.crew.get(crew_id)
+            if crew_index is None:
+                continue
+            found.extend(
+                Conflict(
+                    "crew",
+                    flight,
+                    other,
+                    self.crew_names.get(crew_id, f"#{crew_id}"),
+                )
+                for other in crew_index.overlapping(
+                    flight.departure, flight.arrival
+                )
+                if other.key != flight.key
+            )
+        return found
+
+
+def find_conflicts(proposals):
+    """
+    Check proposed flights against the schedule and each other.
+
+    ``proposals`` is a list of ``ScheduledFlight`` with distinct keys.
+    Returns ``{key: [Conflict, ...]}`` for every proposal that conflicts
+    with anything; a conflict between two proposals is reported on both.
+    """
+    index = ScheduleIndex.load(proposals)
+    results = {}
+    for proposal in proposals:
+        conflicts = index.conflicts(proposal)
+        if conflicts:
+            results[proposal.key] = conflicts
+    return results
+
+
+def conflict_errors(conflicts, crew_field="crew"):
+    """Group conflict messages by the field they concern."""
+    errors = defaultdict(list)
+    for conflict in conflicts:
+        field = "airplane" if conflict.kind == "airplane" else crew_field
+        errors[field].append(conflict.message)
+    return dict(errors)
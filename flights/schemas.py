@@ -0,0 +1,128 @@
+from skygate_airport_api.openapi import lazy_auto_schema
+from .serializers import (
+    BoardQuerySerializer,
+    BoardSerializer,
+    FlightCancelSerializer,
+    ItineraryQuerySerializer,
+    ItinerarySerializer,
+)
+
+
+@lazy_auto_schema
+def itinerary_search_schema(openapi):
+    return dict(
+        operation_description=(
+            "Search itineraries between two airports with up to two "
+            "connections. `date_from` and `date_to` bound the departure date of "
+            "the first flight. Every connection leaves at least "
+            "`ITINERARY_MIN_CONNECTION_MINUTES` after the previous flight "
+            "arrives. Results are ordered by arrival time."
+        ),
+        query_serializer=ItineraryQuerySerializer,
+        responses={
+            200: ItinerarySerializer(many=True),
+            400: "Invalid search parameters",
+        },
+    )
+
+
+@lazy_auto_schema
+def board_schema(openapi):
+    return dict(
+        operation_description=(
+            "Next departures from or arrivals at an airport, earliest first. "
+            "Boards are cached for `FLIGHT_BOARD_CACHE_TIMEOUT` seconds and "
+            "refreshed as soon as one of the airport's flights changes."
+        ),
+        query_serializer=BoardQuerySerializer,
+        responses={
+            200: BoardSerializer,
+            400: "Invalid board parameters",
+            404: "Airport not found",
+        },
+    )
+
+
+@lazy_auto_schema
+def board_stream_schema(openapi):
+    return dict(
+        operation_description=(
+            "Server-Sent Events stream of an airport board. A `board` event "
+            "with the same body as the board endpoint is sent on connect and "
+            "whenever the board changes. The stream closes after "
+            "`FLIGHT_BOARD_STREAM_MAX_SECONDS`; `EventSource` clients reconnect "
+            "on their own."
+        ),
+        query_serializer=BoardQuerySerializer,
+        produces=["text/event-stream"],
+        responses={
+            200: "text/event-stream of `board` events",
+            400: "Invalid board parameters",
+            404: "Airport not found",
+        },
+    )
+
+
+@lazy_auto_schema
+def cancel_flight_schema(openapi):
+    return dict(
+        operation_description=(
+            "Cancel a flight and rebook its passengers on other flights of the "
+            "same route or on connecting itineraries departing within "
+            "`REBOOKING_WINDOW_HOURS` of it. Passengers of one order are kept "
+            "together where possible. Passengers that cannot be placed keep a "
+            "canceled ticket. With `dry_run` nothing changes and the plan is "
+            "returned. Admins only."
+        ),
+        request_body=FlightCancelSerializer,
+        responses={
+            200: openapi.Response(
+                description="Rebooking report",
+                examples={
+                    "application/json": {
+                        "flight_id": 12,
+                        "flight_number": "SG100",
+                        "dry_run": True,
+                        "passengers": 2,
+                        "rebooked": 1,
+                        "unplaced": 1,
+                        "split_orders": [],
+                        "flights": [
+                            {
+                                "flight_id": 14,
+                                "flight_number": "SG102",
+                                "passengers": 1,
+                            }
+                        ],
+                        "moves": [
+                            {
+                                "ticket_id": 301,
+                                "passenger_name": "Alex Smith",
+                                "order_id": 40,
+                                "legs": [
+                                    {
+                                        "flight_id": 14,
+                                        "flight_number": "SG102",
+                                        "seat_code": "3A",
+                                    }
+                                ],
+                                "new_ticket_ids": [],
+                            }
+                        ],
+                        "unplaced_tickets": [
+                            {
+                                "ticket_id": 302,
+                                "passenger_name": "Sam Lee",
+                                "order_id": None,
+                            }
+                        ],
+                    }
+                },
+            ),
+            400: "Invalid parameters",
+            401: "Authentication required",
+            403: "Permission denied",
+            404: "Flight not found",
+            409: "Seats kept changing during rebooking, retry",
+        },
+    )
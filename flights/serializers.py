@@ -1,18 +1,27 @@
+from django.conf import settings
 from rest_framework import serializers
 from flights.models import Crew, Flight
+from flights.schedule import ScheduledFlight, conflict_errors, find_conflicts
+from airplanes.models import Airplane
+from airports.models import Route
+from skygate_airport_api.fieldsets import FieldsetMixin
+from skygate_airport_api.refcache import ReferencePrimaryKeyField
 
 
-class CrewSerializer(serializers.ModelSerializer):
+class CrewSerializer(FieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Crew
         fields = "__all__"
 
 
-class FlightSerializer(serializers.ModelSerializer):
+class FlightSerializer(FieldsetMixin, serializers.ModelSerializer):
     crew = CrewSerializer(many=True, read_only=True)
-    crew_ids = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Crew.objects.all(), write_only=True, source="crew"
+    route = ReferencePrimaryKeyField(model=Route)
+    airplane = ReferencePrimaryKeyField(model=Airplane)
+    crew_ids = ReferencePrimaryKeyField(
+        model=Crew, many=True, write_only=True, source="crew"
     )
+    available_seats = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Flight
@@ -25,4 +34,145 @@ class FlightSerializer(serializers.ModelSerializer):
             "airplane",
             "crew",
             "crew_ids",
+            "capacity",
+            "booked_seats",
+            "checked_in_seats",
+            "held_seats",
+            "available_seats",
+            "status",
         ]
+        expandable_fields = ["crew"]
+
+    def validate(self, attrs):
+        """
+        Check arrival after departure and that neither the airplane nor any
+        crew member is already flying at the time.
+        """
+
+        def value(field):
+            return attrs.get(field, getattr(self.instance, field, None))
+
+        departure, arrival = value("departure_time"), value("arrival_time")
+        if arrival <= departure:
+            raise serializers.ValidationError(
+                {"arrival_time": "Arrival time must be after departure time."}
+            )
+
+        if "crew" in attrs:
+            crew = attrs["crew"]
+        else:
+            crew = self.instance.crew.all() if self.instance else []
+
+        flight = ScheduledFlight(
+            key="flight",
+            pk=getattr(self.instance, "pk", None),
+            flight_number=value("flight_number"),
+            airplane_id=value("airplane").pk,
+            crew_ids=tuple(member.pk for member in crew),
+            departure=departure,
+            arrival=arrival,
+        )
+        conflicts = find_conflicts([flight]).get(flight.key)
+        if conflicts:
+            raise serializers.ValidationError(
+                conflict_errors(conflicts, crew_field="crew_ids")
+            )
+        return attrs
+
+
+class FlightReferenceSerializer(FlightSerializer):
+    """A flight referring to its crew by id, for compound documents."""
+
+    crew = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta(FlightSerializer.Meta):
+        expandable_fields = []
+
+
+class ItineraryQuerySerializer(serializers.Serializer):
+    origin = serializers.IntegerField(min_value=1)
+    destination = serializers.IntegerField(min_value=1)
+    date_from = serializers.DateField()
+    date_to = serializers.DateField(required=False)
+    max_connections = serializers.IntegerField(
+        min_value=0, max_value=2, default=2
+    )
+
+    def validate(self, data):
+        if data["origin"] == data["destination"]:
+            raise serializers.ValidationError(
+                {"destination": "Destination must differ from origin."}
+            )
+
+        data.setdefault("date_to", data["date_from"])
+        window = (data["date_to"] - data["date_from"]).days + 1
+        if window < 1:
+            raise serializers.ValidationError(
+                {"date_to": "date_to must not be before date_from."}
+            )
+        if window > settings.ITINERARY_MAX_WINDOW_DAYS:
+            raise serializers.ValidationError(
+                {
+                    "date_to": "Search at most "
+                    f"{settings.ITINERARY_MAX_WINDOW_DAYS} days at a time."
+                }
+            )
+        return data
+
+
+class FlightCancelSerializer(serializers.Serializer):
+    dry_run = serializers.BooleanField(default=False)
+    max_connections = serializers.IntegerField(
+        min_value=0, max_value=2, default=1
+    )
+
+
+class BoardQuerySerializer(serializers.Serializer):
+    direction = serializers.ChoiceField(
+        choices=["departures", "arrivals"], default="departures"
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.FLIGHT_BOARD_MAX_ROWS,
+        default=20,
+    )
+
+
+class BoardAirportSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    closest_big_city = serializers.CharField()
+
+
+class BoardFlightSerializer(serializers.Serializer):
+    flight_id = serializers.IntegerField()
+    flight_number = serializers.CharField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    status = serializers.CharField()
+    airport = BoardAirportSerializer(
+        help_text="Destination on departure boards, origin on arrival boards."
+    )
+
+
+class BoardSerializer(serializers.Serializer):
+    airport = serializers.IntegerField()
+    direction = serializers.CharField()
+    flights = BoardFlightSerializer(many=True)
+
+
+class ItineraryLegSerializer(serializers.Serializer):
+    flight_id = serializers.IntegerField()
+    flight_number = serializers.CharField()
+    source = serializers.IntegerField()
+    destination = serializers.IntegerField()
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField()
+    arrival_time = serializers.DateTimeField()
+    duration_minutes = serializers.IntegerField()
+    connections = serializers.IntegerField()
+    legs = ItineraryLegSerializer(many=True)
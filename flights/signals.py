@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from airplanes.models import Airplane, AirplaneType
+from airports.models import Airport, Route
+from flights import board, itineraries
+from flights.models import Crew, Flight
+
+
+@receiver(post_save, sender=AirplaneType)
+def update_capacity_on_airplane_type_save(sender, instance, **kwargs):
+    Flight.objects.filter(airplane__airplane_type=instance).exclude(
+        capacity=instance.total_seats
+    ).update(capacity=instance.total_seats, version=F("version") + 1)
+
+
+@receiver(post_save, sender=Airplane)
+def update_capacity_on_airplane_save(sender, instance, **kwargs):
+    total_seats = instance.airplane_type.total_seats
+    Flight.objects.filter(airplane=instance).exclude(
+        capacity=total_seats
+    ).update(capacity=total_seats, version=F("version") + 1)
+
+
+@receiver(m2m_changed, sender=Flight.crew.through)
+def bump_version_on_crew_change(sender, instance, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, Flight):
+        instance.bump_version()
+    else:
+        Flight.objects.filter(pk__in=kwargs["pk_set"] or []).update(
+            version=F("version") + 1
+        )
+
+
+@receiver(post_save, sender=Crew)
+@receiver(pre_delete, sender=Crew)
+def bump_version_on_crew_member_change(sender, instance, **kwargs):
+    # Before a delete, while the crew memberships still exist.
+    Flight.objects.filter(crew=instance).update(version=F("version") + 1)
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def update_itinerary_graph(sender, instance, **kwargs):
+    flight_id = instance.pk
+    transaction.on_commit(lambda: itineraries.flight_changed(flight_id))
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def invalidate_itinerary_graph(sender, instance, **kwargs):
+    transaction.on_commit(itineraries.invalidate)
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def update_flight_boards(sender, instance, **kwargs):
+    route_ids = {
+        instance.route_id,
+        getattr(instance, "_loaded_route_id", None),
+    }
+    route_ids.discard(None)
+    instance._loaded_route_id = instance.route_id
+    transaction.on_commit(lambda: board.routes_changed(route_ids))
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+def invalidate_flight_boards(sender, instance, **kwargs):
+    transaction.on_commit(board.invalidate)
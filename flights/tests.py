@@ -1,13 +1,23 @@
-from django.test import TestCase
-from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+import json
+import os
+import tempfile
+from io import StringIO
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
+from flights import itineraries
 from flights.models import Flight, Crew
+from flights.schedule import ScheduledFlight, find_conflicts
 
 from airports.models import Airport, Route
 from airplanes.models import Airplane, AirplaneType
+from skygate_airport_api.testing import QueryBudgetMixin
+from tickets.models import Ticket
 
 
 class CrewModelTest(TestCase):
@@ -92,7 +102,7 @@ class FlightModelTest(TestCase):
         self.assertIn(self.co_pilot, self.flight.crew.all())
 
 
-class FlightAPITest(APITestCase):
+class FlightAPITest(QueryBudgetMixin, APITestCase):
     """Tests for the Flight API endpoints"""
 
     def setUp(self):
@@ -142,11 +152,651 @@ class FlightAPITest(APITestCase):
         """Test retrieving the list of flights"""
         response = self.client.get(self.flights_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["flight_number"], "SG789")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["flight_number"], "SG789")
+
+    def test_list_query_budget(self):
+        """Test that listing flights does not query crew per flight"""
+        for number in range(99):
+            flight = Flight.objects.create(
+                flight_number=f"SG9{number:02}",
+                departure_time=self.flight.departure_time
+                + timedelta(hours=4 * (number + 1)),
+                arrival_time=self.flight.arrival_time
+                + timedelta(hours=4 * (number + 1)),
+                route=self.route,
+                airplane=self.airplane,
+            )
+            flight.crew.add(self.crew1, self.crew2)
+
+        with self.assertQueryBudget(2):
+            response = self.client.get(
+                self.flights_url, {"page_size": 100, "expand": "crew"}
+            )
+        self.assertEqual(len(response.data["results"]), 100)
+        self.assertEqual(len(response.data["results"][-1]["crew"]), 2)
 
     def test_get_flight_detail(self):
         """Test retrieving a specific flight"""
         response = self.client.get(self.flight_detail_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["flight_number"], "SG789")
+
+    def test_flight_detail_conditional_get(self):
+        """Test that an unchanged flight is answered with 304"""
+        url = f"{self.flight_detail_url}?expand=crew"
+        response = self.client.get(url)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        self.flight.crew.remove(self.crew2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["crew"]), 1)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.flight.flight_number = "SG790"
+        self.flight.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data["flight_number"], "SG790")
+
+        # Another choice of fields is another representation.
+        response = self.client.get(
+            self.flight_detail_url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("crew", response.data)
+
+    def test_crew_member_change_updates_flight_etag(self):
+        """Test that editing or deleting a crew member changes the ETag"""
+        url = f"{self.flight_detail_url}?expand=crew"
+        etag = self.client.get(url)["ETag"]
+
+        self.crew1.first_name = "Renamed"
+        self.crew1.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [member["first_name"] for member in response.data["crew"]]
+        self.assertIn("Renamed", names)
+
+        etag = response["ETag"]
+        self.crew2.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["crew"]), 1)
+
+
+class FlightSeatCounterTest(APITestCase):
+    """Tests for the seat counters maintained on Flight"""
+
+    def setUp(self):
+        self.source_airport = Airport.objects.create(
+            name="AMS Airport", closest_big_city="Amsterdam"
+        )
+        self.destination_airport = Airport.objects.create(
+            name="CPH Airport", closest_big_city="Copenhagen"
+        )
+        self.route = Route.objects.create(
+            source=self.source_airport,
+            destination=self.destination_airport,
+            distance=620,
+        )
+        self.airplane_type = AirplaneType.objects.create(
+            name="Dash 8", rows=2, seats_in_row=4
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-8001", airplane_type=self.airplane_type
+        )
+
+        now = timezone.now()
+        self.flight = Flight.objects.create(
+            flight_number="SG801",
+            departure_time=now + timedelta(days=2),
+            arrival_time=now + timedelta(days=2, hours=1),
+            route=self.route,
+            airplane=self.airplane,
+        )
+
+    def book(self, row, seat, **kwargs):
+        return Ticket.objects.create(
+            flight=self.flight,
+            passenger_name=f"Passenger {row}{seat}",
+            row=row,
+            seat=seat,
+            **kwargs,
+        )
+
+    def test_counters_follow_ticket_changes(self):
+        """Test that bookings, check-ins and cancellations move counters"""
+        self.assertEqual(self.flight.capacity, 8)
+
+        ticket = self.book(1, "A")
+        self.book(1, "B")
+        ticket.status = "checked_in"
+        ticket.save()
+        self.book(2, "A", status="canceled")
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.booked_seats, 1)
+        self.assertEqual(self.flight.checked_in_seats, 1)
+        self.assertEqual(self.flight.available_seats, 6)
+
+        ticket.delete()
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.checked_in_seats, 0)
+
+    def test_save_keeps_counters_of_stale_instance(self):
+        """Test that saving a flight does not overwrite its counters"""
+        self.book(1, "A")
+        self.flight.flight_number = "SG802"
+        self.flight.save()
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.flight_number, "SG802")
+        self.assertEqual(self.flight.booked_seats, 1)
+        self.assertEqual(self.flight.version, 2)
+
+    def test_capacity_follows_airplane_type(self):
+        """Test that resizing the airplane type updates flight capacity"""
+        self.airplane_type.rows = 3
+        self.airplane_type.save()
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.capacity, 12)
+
+    def test_filter_by_available_seats(self):
+        """Test filtering flights by the number of free seats"""
+        for seat in "ABCDE":
+            self.book(1 if seat < "E" else 2, seat)
+
+        response = self.client.get("/api/flights/", {"min_available_seats": 3})
+        self.assertEqual(response.data["results"][0]["available_seats"], 3)
+
+        response = self.client.get("/api/flights/", {"min_available_seats": 4})
+        self.assertEqual(response.data["results"], [])
+
+    def test_recompute_command_reports_and_fixes_drift(self):
+        """Test the recompute_seat_counters management command"""
+        self.book(1, "A")
+        Flight.objects.filter(pk=self.flight.pk).update(booked_seats=5)
+
+        output = StringIO()
+        call_command("recompute_seat_counters", "--dry-run", stdout=output)
+        self.assertIn("booked_seats 5 -> 1", output.getvalue())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.booked_seats, 5)
+
+        call_command("recompute_seat_counters", stdout=StringIO())
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.booked_seats, 1)
+
+
+class ItinerarySearchTest(APITestCase):
+    """Tests for the connecting-itinerary search"""
+
+    def setUp(self):
+        cache.clear()
+        itineraries.reset()
+
+        self.oslo = Airport.objects.create(
+            name="OSL Airport", closest_big_city="Oslo"
+        )
+        self.copenhagen = Airport.objects.create(
+            name="CPH Airport", closest_big_city="Copenhagen"
+        )
+        self.amsterdam = Airport.objects.create(
+            name="AMS Airport", closest_big_city="Amsterdam"
+        )
+        self.lisbon = Airport.objects.create(
+            name="LIS Airport", closest_big_city="Lisbon"
+        )
+        airplane_type = AirplaneType.objects.create(
+            name="Airbus A220", rows=20, seats_in_row=5
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-3001", airplane_type=airplane_type
+        )
+        self.day = (timezone.now() + timedelta(days=2)).date()
+
+        self.oslo_copenhagen = self.flight(
+            "SG301", self.oslo, self.copenhagen, 8, 9
+        )
+        # Leaves only 30 minutes after SG301 lands, too short to connect.
+        self.flight("SG302", self.copenhagen, self.amsterdam, 9.5, 10.5)
+        self.copenhagen_amsterdam = self.flight(
+            "SG303", self.copenhagen, self.amsterdam, 10, 11
+        )
+        self.oslo_amsterdam = self.flight(
+            "SG304", self.oslo, self.amsterdam, 12, 14
+        )
+        self.amsterdam_lisbon = self.flight(
+            "SG305", self.amsterdam, self.lisbon, 12, 14
+        )
+
+        self.url = "/api/flights/itineraries/"
+
+    def flight(self, number, source, destination, departs, arrives):
+        route, _ = Route.objects.get_or_create(
+            source=source, destination=destination, defaults={"distance": 900}
+        )
+        midnight = datetime.combine(self.day, time(), dt_timezone.utc)
+        return Flight.objects.create(
+            flight_number=number,
+            departure_time=midnight + timedelta(hours=departs),
+            arrival_time=midnight + timedelta(hours=arrives),
+            route=route,
+            airplane=self.airplane,
+        )
+
+    def search(self, origin, destination, **params):
+        response = self.client.get(
+            self.url,
+            {
+                "origin": origin.id,
+                "destination": destination.id,
+                "date_from": self.day.isoformat(),
+                **params,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            [leg["flight_number"] for leg in itinerary["legs"]]
+            for itinerary in response.data
+        ]
+
+    def test_connections_respect_minimum_connection_time(self):
+        """Test itineraries ordered by arrival with valid connections"""
+        self.assertEqual(
+            self.search(self.oslo, self.amsterdam),
+            [["SG301", "SG303"], ["SG304"]],
+        )
+        self.assertEqual(
+            self.search(self.oslo, self.lisbon),
+            [["SG301", "SG303", "SG305"]],
+        )
+        self.assertEqual(
+            self.search(self.oslo, self.lisbon, max_connections=1), []
+        )
+
+    def test_search_runs_on_the_in_memory_graph(self):
+        """Test that searches after the first one do not query flights"""
+        self.search(self.oslo, self.amsterdam)
+        with self.assertNumQueries(0):
+            self.search(self.oslo, self.lisbon)
+
+    def test_graph_follows_flight_changes(self):
+        """Test that new, moved and deleted flights reach the graph"""
+        self.search(self.oslo, self.amsterdam)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight("SG306", self.oslo, self.amsterdam, 7, 9)
+            self.copenhagen_amsterdam.delete()
+            self.oslo_amsterdam.departure_time -= timedelta(hours=4)
+            self.oslo_amsterdam.arrival_time -= timedelta(hours=4)
+            self.oslo_amsterdam.save()
+
+        self.assertEqual(
+            self.search(self.oslo, self.amsterdam),
+            [["SG306"], ["SG304"]],
+        )
+
+    def test_invalid_search(self):
+        """Test validation of the search parameters"""
+        response = self.client.get(
+            self.url,
+            {
+                "origin": self.oslo.id,
+                "destination": self.oslo.id,
+                "date_from": self.day.isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ScheduleConflictTest(APITestCase):
+    """Tests for airplane and crew schedule conflict detection"""
+
+    def setUp(self):
+        self.source_airport = Airport.objects.create(
+            name="DUB Airport", closest_big_city="Dublin"
+        )
+        self.destination_airport = Airport.objects.create(
+            name="EDI Airport", closest_big_city="Edinburgh"
+        )
+        self.route = Route.objects.create(
+            source=self.source_airport,
+            destination=self.destination_airport,
+            distance=350,
+        )
+        airplane_type = AirplaneType.objects.create(
+            name="ATR 42", rows=12, seats_in_row=4
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-6001", airplane_type=airplane_type
+        )
+        self.spare_airplane = Airplane.objects.create(
+            name="SG-6002", airplane_type=airplane_type
+        )
+        self.captain = Crew.objects.create(
+            first_name="Aoife", last_name="Byrne", role="Captain"
+        )
+
+        self.start = timezone.now() + timedelta(days=3)
+        self.morning = self.flight("SG601", 0, 2, crew=[self.captain])
+        self.noon = self.flight("SG602", 3, 5)
+
+    def flight(self, number, departs, arrives, airplane=None, crew=()):
+        flight = Flight.objects.create(
+            flight_number=number,
+            departure_time=self.start + timedelta(hours=departs),
+            arrival_time=self.start + timedelta(hours=arrives),
+            route=self.route,
+            airplane=airplane or self.airplane,
+        )
+        flight.crew.set(crew)
+        return flight
+
+    def proposal(self, key, departs, arrives, airplane=None, crew=()):
+        return ScheduledFlight(
+            key=key,
+            pk=None,
+            flight_number=f"SG{key}",
+            airplane_id=(airplane or self.airplane).pk,
+            crew_ids=tuple(member.pk for member in crew),
+            departure=self.start + timedelta(hours=departs),
+            arrival=self.start + timedelta(hours=arrives),
+        )
+
+    def test_model_clean_reports_airplane_conflicts(self):
+        """Test Flight.clean against flights of the same airplane"""
+        flight = Flight(
+            flight_number="SG603",
+            departure_time=self.start + timedelta(hours=1),
+            arrival_time=self.start + timedelta(hours=4),
+            route=self.route,
+            airplane=self.airplane,
+        )
+        with self.assertRaises(ValidationError) as context:
+            flight.full_clean()
+        self.assertEqual(len(context.exception.message_dict["airplane"]), 2)
+
+        self.noon.full_clean()
+
+    def test_api_reports_every_conflict(self):
+        """Test that the API lists airplane and crew conflicts together"""
+        response = self.client.post(
+            "/api/flights/",
+            {
+                "flight_number": "SG604",
+                "departure_time": self.start + timedelta(hours=1),
+                "arrival_time": self.start + timedelta(hours=4),
+                "route": self.route.id,
+                "airplane": self.airplane.id,
+                "crew_ids": [self.captain.id],
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data["airplane"]), 2)
+        self.assertIn("Aoife Byrne", response.data["crew_ids"][0])
+
+        response = self.client.patch(
+            f"/api/flights/{self.noon.id}/",
+            {"departure_time": self.start + timedelta(hours=2)},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_batch_is_checked_in_one_pass(self):
+        """Test a batch against the schedule and against itself"""
+        proposals = [
+            self.proposal(1, 6, 8, crew=[self.captain]),
+            self.proposal(2, 7, 9, airplane=self.spare_airplane),
+            self.proposal(3, 1, 9, crew=[self.captain]),
+            self.proposal(4, 10, 11),
+        ]
+        with self.assertNumQueries(2):
+            conflicts = find_conflicts(proposals)
+
+        self.assertEqual(set(conflicts), {1, 3})
+        self.assertEqual(
+            [(c.kind, c.other.key) for c in conflicts[1]],
+            [("airplane", 3), ("crew", 3)],
+        )
+        self.assertEqual(
+            sorted((c.kind, c.other.key) for c in conflicts[3]),
+            [
+                ("airplane", 1),
+                ("airplane", self.morning.pk),
+                ("airplane", self.noon.pk),
+                ("crew", 1),
+                ("crew", self.morning.pk),
+            ],
+        )
+
+
+class ScheduleImportTest(TestCase):
+    """Tests for the import_schedule management command"""
+
+    def setUp(self):
+        source = Airport.objects.create(
+            name="OSL Airport", closest_big_city="Oslo"
+        )
+        destination = Airport.objects.create(
+            name="BGO Airport", closest_big_city="Bergen"
+        )
+        self.route = Route.objects.create(
+            source=source, destination=destination, distance=300
+        )
+        airplane_type = AirplaneType.objects.create(
+            name="Dash 8", rows=20, seats_in_row=4
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-7001", airplane_type=airplane_type
+        )
+        self.captain = Crew.objects.create(
+            first_name="Ingrid", last_name="Berg", role="Captain"
+        )
+        self.purser = Crew.objects.create(
+            first_name="Lars", last_name="Dahl", role="Purser"
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=5)
+        Flight.objects.create(
+            flight_number="SG700",
+            departure_time=self.start,
+            arrival_time=self.start + timedelta(hours=1),
+            route=self.route,
+            airplane=self.airplane,
+        )
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def at(self, hours):
+        return (self.start + timedelta(hours=hours)).isoformat()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_schedule", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_reports_rejected_rows(self):
+        """Test valid rows are saved and bad rows reported by line"""
+        path = self.write(
+            "schedule.csv",
+            "flight_number,departure_time,arrival_time,source,destination,"
+            "airplane,crew\n"
+            f"SG701,{self.at(2)},{self.at(3)},OSL Airport,BGO Airport,"
+            "SG-7001,Ingrid Berg;Lars Dahl\n"
+            f"SG702,{self.at(4)},{self.at(5)},OSL Airport,BGO Airport,"
+            "SG-9999,\n"
+            f"SG703,{self.at(0)},{self.at(2)},OSL Airport,BGO Airport,"
+            f"{self.airplane.id},\n"
+            f"SG704,{self.at(2)},{self.at(4)},OSL Airport,BGO Airport,"
+            f"SG-7001,{self.captain.id}\n",
+        )
+        out, err = self.run_import(path, "--chunk-size", "2")
+
+        self.assertIn("Read 4 rows: 1 imported, 3 rejected", out)
+        self.assertIn("rows/s", out)
+        self.assertIn("line 3: airplane: Reference not found.", err)
+        self.assertIn("line 4: airplane: The airplane is already", err)
+        # SG704 clashes with SG701, which was saved with the first chunk.
+        self.assertIn("line 5: crew: Crew member Ingrid Berg", err)
+
+        flight = Flight.objects.get(flight_number="SG701")
+        self.assertEqual(flight.capacity, 80)
+        self.assertEqual(
+            set(flight.crew.values_list("pk", flat=True)),
+            {self.captain.pk, self.purser.pk},
+        )
+
+    def test_ndjson_dry_run_saves_nothing(self):
+        """Test a dry run validates across chunks without writing"""
+        path = self.write(
+            "schedule.ndjson",
+            json.dumps(
+                {
+                    "flight_number": "SG711",
+                    "departure_time": self.at(2),
+                    "arrival_time": self.at(3),
+                    "route": self.route.id,
+                    "airplane": "SG-7001",
+                    "crew": [self.captain.id],
+                }
+            )
+            + "\n\nnot json\n"
+            + json.dumps(
+                {
+                    "flight_number": "SG712",
+                    "departure_time": self.at(2),
+                    "arrival_time": self.at(4),
+                    "route": self.route.id,
+                    "airplane": "SG-7001",
+                }
+            )
+            + "\n",
+        )
+        out, err = self.run_import(path, "--dry-run", "--chunk-size", "1")
+
+        self.assertIn("Read 3 rows: 1 would be imported, 2 rejected", out)
+        self.assertIn("line 3: row: Invalid JSON", err)
+        self.assertIn("line 4: airplane: The airplane is already", err)
+        self.assertEqual(Flight.objects.count(), 1)
+
+
+class FlightBoardTest(APITestCase):
+    """Tests for the airport departures and arrivals board"""
+
+    def setUp(self):
+        cache.clear()
+        self.oslo = Airport.objects.create(
+            name="OSL Airport", closest_big_city="Oslo"
+        )
+        self.bergen = Airport.objects.create(
+            name="BGO Airport", closest_big_city="Bergen"
+        )
+        self.tromso = Airport.objects.create(
+            name="TOS Airport", closest_big_city="Tromso"
+        )
+        self.to_bergen = Route.objects.create(
+            source=self.oslo, destination=self.bergen, distance=300
+        )
+        self.from_tromso = Route.objects.create(
+            source=self.tromso, destination=self.oslo, distance=1100
+        )
+        airplane_type = AirplaneType.objects.create(
+            name="Dash 8", rows=20, seats_in_row=4
+        )
+        self.airplanes = [
+            Airplane.objects.create(
+                name=f"SG-80{number}", airplane_type=airplane_type
+            )
+            for number in range(5)
+        ]
+        self.now = timezone.now()
+        self.flight("SG800", self.to_bergen, -2)
+        self.later = self.flight("SG801", self.to_bergen, 3)
+        self.soon = self.flight("SG802", self.to_bergen, 1)
+        self.flight("SG803", self.from_tromso, 0)
+        self.url = f"/api/flights/board/{self.oslo.id}/"
+
+    def flight(self, number, route, departs):
+        departure = self.now + timedelta(hours=departs)
+        return Flight.objects.create(
+            flight_number=number,
+            departure_time=departure,
+            arrival_time=departure + timedelta(hours=1, minutes=30),
+            route=route,
+            airplane=self.airplanes[int(number[-1])],
+        )
+
+    def numbers(self, response):
+        return [row["flight_number"] for row in response.data["flights"]]
+
+    def test_departures_and_arrivals(self):
+        """Test both boards list upcoming flights earliest first"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.numbers(response), ["SG802", "SG801"])
+        self.assertEqual(
+            response.data["flights"][0]["airport"]["name"], "BGO Airport"
+        )
+
+        response = self.client.get(self.url, {"limit": 1})
+        self.assertEqual(self.numbers(response), ["SG802"])
+
+        response = self.client.get(self.url, {"direction": "arrivals"})
+        self.assertEqual(self.numbers(response), ["SG803"])
+        self.assertEqual(
+            response.data["flights"][0]["airport"]["closest_big_city"],
+            "Tromso",
+        )
+
+    def test_board_is_cached_until_a_flight_changes(self):
+        """Test cache hits and invalidation on flight saves"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flight("SG804", self.to_bergen, 0.5)
+        response = self.client.get(self.url)
+        self.assertEqual(self.numbers(response), ["SG804", "SG802", "SG801"])
+
+        # Moving a flight away from the airport clears the old route's board.
+        self.soon.route = self.from_tromso
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soon.save()
+        response = self.client.get(self.url)
+        self.assertEqual(self.numbers(response), ["SG804", "SG801"])
+
+    def test_invalid_requests(self):
+        """Test unknown airports and bad parameters"""
+        response = self.client.get("/api/flights/board/999999/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(self.url, {"direction": "sideways"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(FLIGHT_BOARD_STREAM_MAX_SECONDS=0)
+    def test_event_stream(self):
+        """Test the board is pushed as a Server-Sent Event"""
+        response = self.client.get(
+            f"{self.url}stream/", HTTP_ACCEPT="text/event-stream"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("retry: "))
+        self.assertIn("event: board\ndata: ", body)
+        self.assertIn('"flight_number": "SG802"', body)
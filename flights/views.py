@@ -1,13 +1,145 @@
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from airports.models import Airport
+from flights.board import board_events, get_board
+from flights.filters import FlightFilter
+from flights.itineraries import search_itineraries
 from flights.models import Crew, Flight
-from flights.serializers import CrewSerializer, FlightSerializer
+from flights.schemas import (
+    board_schema,
+    board_stream_schema,
+    cancel_flight_schema,
+    itinerary_search_schema,
+)
+from flights.serializers import (
+    BoardQuerySerializer,
+    BoardSerializer,
+    CrewSerializer,
+    FlightCancelSerializer,
+    FlightSerializer,
+    ItineraryQuerySerializer,
+    ItinerarySerializer,
+)
+from orders.rebooking import rebook_flight
+from skygate_airport_api.fieldsets import Fieldset, etag_parts
+from skygate_airport_api.profiling import ProfiledViewMixin, profiled
+from skygate_airport_api.conditional import (
+    conditional_response,
+    version_etag,
+)
+from skygate_airport_api.renderers import EventStreamRenderer
 
 
-class CrewViewSet(viewsets.ModelViewSet):
+class CrewViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
 
 
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     queryset = Flight.objects.all()
     serializer_class = FlightSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = FlightFilter
+    ordering = ["departure_time"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # A single flight loads its crew lazily, so a 304 answered from the
+        # ETag costs one query.
+        if self.action != "retrieve" and Fieldset.from_request(
+            self.request
+        ).expands("crew"):
+            return queryset.prefetch_related("crew")
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        flight = self.get_object()
+        etag = version_etag(
+            "flight",
+            flight.pk,
+            flight.version,
+            request.accepted_renderer.format,
+            *etag_parts(request),
+        )
+        return conditional_response(
+            request,
+            etag,
+            lambda: Response(self.get_serializer(flight).data),
+        )
+
+    @cancel_flight_schema
+    @action(detail=True, methods=["post"], permission_classes=[IsAdminUser])
+    def cancel(self, request, pk=None):
+        query = FlightCancelSerializer(data=request.data)
+        query.is_valid(raise_exception=True)
+        plan = rebook_flight(self.get_object(), **query.validated_data)
+        report = plan.report()
+        report["dry_run"] = query.validated_data["dry_run"]
+        return Response(report)
+
+    @itinerary_search_schema
+    @action(detail=False, methods=["get"])
+    def itineraries(self, request):
+        query = ItineraryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        itineraries = search_itineraries(**query.validated_data)
+        return Response(
+            profiled(ItinerarySerializer(itineraries, many=True)).data
+        )
+
+    def get_board_query(self, request, airport_id):
+        query = BoardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return int(airport_id), query.validated_data
+
+    def render_board(self, airport_id, direction, rows):
+        return BoardSerializer(
+            {"airport": airport_id, "direction": direction, "flights": rows}
+        ).data
+
+    @board_schema
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"board/(?P<airport_id>\d+)",
+    )
+    def board(self, request, airport_id):
+        airport_id, query = self.get_board_query(request, airport_id)
+        rows = get_board(airport_id, **query)
+        if not rows:
+            # Only an empty board needs to tell a quiet airport from none.
+            get_object_or_404(Airport, pk=airport_id)
+        return Response(
+            self.render_board(airport_id, query["direction"], rows)
+        )
+
+    @board_stream_schema
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"board/(?P<airport_id>\d+)/stream",
+        renderer_classes=[EventStreamRenderer],
+    )
+    def board_stream(self, request, airport_id):
+        airport_id, query = self.get_board_query(request, airport_id)
+        get_object_or_404(Airport, pk=airport_id)
+        events = board_events(
+            airport_id,
+            query["direction"],
+            query["limit"],
+            lambda rows: self.render_board(
+                airport_id, query["direction"], rows
+            ),
+        )
+        response = StreamingHttpResponse(
+            events, content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Stops nginx from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
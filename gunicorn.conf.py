@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for the API.
+
+Departure and arrival board streams hold their request open for up to
+``FLIGHT_BOARD_STREAM_MAX_SECONDS`` and sleep between ticks. Threaded
+workers give each stream a thread of its own, so open board screens
+neither block other requests nor trip the worker timeout, which a sync
+worker would after ``timeout`` seconds. Several workers need the shared
+cache set up by ``REDIS_URL`` to see each other's changes to flights,
+boards and reference data, so they refuse to start without it.
+
+Each value can be overridden from the environment.
+"""
+
+import os
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+# One thread per open board stream or in-flight request.
+threads = int(os.environ.get("GUNICORN_THREADS", 100))
+# Threaded workers keep reporting to the arbiter while their threads are
+# busy, so this bounds a stuck worker, not a long stream.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+if workers > 1 and not os.environ.get("REDIS_URL"):
+    raise RuntimeError(
+        "Set REDIS_URL to run more than one worker: each process would "
+        "otherwise keep its own cache and miss the others' flight changes."
+    )
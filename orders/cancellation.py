@@ -0,0 +1,67 @@
+"""
+Order cancellation: release many orders and their tickets at once.
+
+Orders and tickets are canceled with one UPDATE each, however many there
+are, and the seat counters and cached seat maps are adjusted once per
+affected flight, as the hold sweeper does for expired holds.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+from tickets import counters, inventory
+from tickets.models import Ticket
+
+
+# Tickets that no longer take a seat and are left as they are.
+RELEASED_TICKET_STATUSES = ["canceled", "expired"]
+
+
+def cancel_orders(orders):
+    """
+    Cancel the pending orders among ``orders`` and all of their tickets.
+
+    ``orders`` is an ``Order`` queryset; orders that are not pending are
+    left alone. Returns the ids of the canceled orders and the number of
+    tickets released.
+    """
+    with transaction.atomic():
+        order_ids = list(
+            Order.objects.filter(pk__in=orders.values("pk"), status="pending")
+            .select_for_update()
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if not order_ids:
+            return [], 0
+
+        tickets = list(
+            Ticket.objects.filter(
+                pk__in=Order.tickets.through.objects.filter(
+                    order_id__in=order_ids
+                ).values("ticket_id")
+            )
+            .exclude(status__in=RELEASED_TICKET_STATUSES)
+            .select_for_update()
+            .order_by("pk")
+            .values_list("pk", "flight_id", "row", "seat", "status")
+        )
+
+        Order.objects.filter(pk__in=order_ids).update(
+            status="canceled", updated_at=timezone.now()
+        )
+        Ticket.objects.filter(pk__in=[ticket[0] for ticket in tickets]).update(
+            status="canceled", hold_expires_at=None
+        )
+        changes = [
+            (
+                (flight_id, row, seat, ticket_status),
+                (flight_id, row, seat, "canceled"),
+            )
+            for _, flight_id, row, seat, ticket_status in tickets
+        ]
+        counters.apply_counter_changes(changes)
+        transaction.on_commit(lambda: inventory.apply_ticket_changes(changes))
+
+    return order_ids, len(tickets)
@@ -0,0 +1,169 @@
+"""
+Order placement: check, price and attach an order's tickets as one unit.
+
+Every step works on the whole set of tickets at once. One query reads the
+tickets with their route distance and whether another active order already
+holds them, one inserts the order and one inserts all its ticket links.
+Placing an order locks its tickets first, so two orders racing for the
+same ticket cannot both get it. Tickets on a seat hold can be ordered by
+the user who holds them while the hold lasts; the order confirms them as
+bookings, so the hold sweeper no longer frees their seats.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from orders.models import Order
+from tickets import counters, inventory
+from tickets.models import ACTIVE_TICKET_STATUSES, Ticket
+from tickets.pricing import fare_for_distance
+
+
+# Orders that hold on to their tickets.
+ACTIVE_ORDER_STATUSES = ["pending", "paid"]
+
+
+class TicketsUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some tickets were ordered by someone else meanwhile."
+    default_code = "tickets_unavailable"
+
+
+class TicketRow(NamedTuple):
+    status: str
+    distance: int
+    # Whether another active order already has the ticket.
+    claimed: bool
+    hold_expires_at: Optional[datetime]
+    flight_id: int
+    row: int
+    seat: str
+    held_by_id: Optional[int]
+
+
+def ticket_rows(ticket_ids, order=None, lock=False):
+    """
+    ``{ticket id: TicketRow}`` for the tickets that exist, read with one
+    query.
+    """
+    claims = Order.tickets.through.objects.filter(
+        ticket_id=OuterRef("pk"), order__status__in=ACTIVE_ORDER_STATUSES
+    )
+    if order is not None:
+        claims = claims.exclude(order_id=order.pk)
+
+    tickets = Ticket.objects.filter(pk__in=ticket_ids)
+    if lock:
+        tickets = tickets.select_for_update(of=("self",)).order_by("pk")
+    return {
+        pk: TicketRow(*values)
+        for pk, *values in tickets.annotate(
+            claimed=Exists(claims)
+        ).values_list(
+            "pk",
+            "status",
+            "flight__route__distance",
+            "claimed",
+            "hold_expires_at",
+            "flight_id",
+            "row",
+            "seat",
+            "held_by_id",
+        )
+    }
+
+
+def ticket_errors(ticket_ids, rows, user, now=None):
+    """Why ``user`` cannot order each unusable ticket, in request order."""
+    now = now or timezone.now()
+    errors = []
+    for pk in ticket_ids:
+        if pk not in rows:
+            errors.append(f"Ticket {pk} does not exist.")
+            continue
+        ticket = rows[pk]
+        if ticket.status not in ACTIVE_TICKET_STATUSES:
+            errors.append(f"Ticket {pk} is {ticket.status}.")
+        elif ticket.status == "held" and ticket.hold_expires_at <= now:
+            errors.append(f"The hold on ticket {pk} has expired.")
+        elif ticket.held_by_id not in (None, user.pk):
+            errors.append(f"Ticket {pk} is held by someone else.")
+        elif ticket.claimed:
+            errors.append(f"Ticket {pk} is already part of an active order.")
+    return errors
+
+
+def book_held_tickets(ticket_ids, rows):
+    """
+    Turn the held tickets among ``ticket_ids`` into bookings with one
+    UPDATE, moving them from the held to the booked seat counters.
+    """
+    held = [pk for pk in ticket_ids if rows[pk].status == "held"]
+    if not held:
+        return
+    Ticket.objects.filter(pk__in=held).update(
+        status="booked", hold_expires_at=None
+    )
+    changes = [
+        (
+            (rows[pk].flight_id, rows[pk].row, rows[pk].seat, "held"),
+            (rows[pk].flight_id, rows[pk].row, rows[pk].seat, "booked"),
+        )
+        for pk in held
+    ]
+    counters.apply_counter_changes(changes)
+    transaction.on_commit(lambda: inventory.apply_ticket_changes(changes))
+
+
+def claim_tickets(ticket_ids, user, order=None):
+    """
+    Lock the tickets, check them again, book the held ones and return
+    their total fare.
+
+    Must run inside a transaction. Raises ``TicketsUnavailable`` when a
+    ticket stopped being available after the order was validated.
+    """
+    rows = ticket_rows(ticket_ids, order=order, lock=True)
+    errors = ticket_errors(ticket_ids, rows, user)
+    if errors:
+        raise TicketsUnavailable({"tickets": errors})
+    book_held_tickets(ticket_ids, rows)
+    return sum(
+        (fare_for_distance(rows[pk].distance) for pk in ticket_ids),
+        Decimal("0.00"),
+    )
+
+
+def place_order(user, ticket_ids, **fields):
+    """Create an order of ``ticket_ids`` priced from their fares."""
+    with transaction.atomic():
+        total_price = claim_tickets(ticket_ids, user)
+        order = Order.objects.create(
+            user=user, total_price=total_price, **fields
+        )
+        Order.tickets.through.objects.bulk_create(
+            Order.tickets.through(order_id=order.pk, ticket_id=pk)
+            for pk in ticket_ids
+        )
+    return order
+
+
+def update_order(order, ticket_ids=None, **fields):
+    """Change an order, repricing it when its tickets are replaced."""
+    with transaction.atomic():
+        if ticket_ids is not None:
+            fields["total_price"] = claim_tickets(
+                ticket_ids, order.user, order=order
+            )
+            order.tickets.set(ticket_ids)
+        for name, value in fields.items():
+            setattr(order, name, value)
+        order.save()
+    return order
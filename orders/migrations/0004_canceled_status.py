@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def rename_cancelled(apps, schema_editor):
+    # Orders, and the tickets of orders canceled through the API, were
+    # stored as "cancelled" while tickets use "canceled".
+    for model in ("orders.Order", "tickets.Ticket"):
+        apps.get_model(model).objects.filter(status="cancelled").update(
+            status="canceled"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_keyset_indexes"),
+        ("tickets", "0006_seat_holds"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("paid", "Paid"),
+                    ("canceled", "Canceled"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(rename_cancelled, migrations.RunPython.noop),
+    ]
@@ -7,7 +7,7 @@ class Order(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("paid", "Paid"),
-        ("cancelled", "Cancelled"),
+        ("canceled", "Canceled"),
     ]
 
     user = models.ForeignKey(
@@ -37,3 +37,9 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                name="order_created_keyset_idx",
+            ),
+        ]
@@ -0,0 +1,335 @@
+"""
+Rebooking the passengers of a canceled flight.
+
+``plan_rebooking`` finds a seat for every active ticket of a flight on
+another flight of the same route, or on a connecting itinerary from the
+itinerary graph. Passengers of the same order are seated together where a
+seat map allows, and split up only when no itinerary has room for the
+whole order.
+
+``rebook_flight`` cancels the flight and carries the plan out in one
+transaction: one INSERT for the new tickets, one UPDATE canceling the old
+ones, and one DELETE and one INSERT moving the order links over to the new
+tickets. Seat counters and seat maps are updated once per flight.
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from flights import itineraries
+from flights.models import Flight
+from orders.checkout import ACTIVE_ORDER_STATUSES
+from orders.models import Order
+from tickets import counters, inventory
+from tickets.booking import BULK_BOOKING_ATTEMPTS
+from tickets.inventory import SeatMap
+from tickets.models import ACTIVE_TICKET_STATUSES, Ticket
+
+
+class RebookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = (
+        "Seats on the alternative flights kept changing while passengers "
+        "were being rebooked. Please retry."
+    )
+    default_code = "rebooking_conflict"
+
+
+class Passenger(NamedTuple):
+    ticket_id: int
+    passenger_name: str
+    row: int
+    seat: str
+    status: str
+    hold_expires_at: object
+    order_id: Optional[int]
+
+
+class Move(NamedTuple):
+    passenger: Passenger
+    legs: tuple
+    # ``(row, seat)`` on each leg.
+    seats: tuple
+
+
+class RebookingPlan:
+    """Where each passenger of a canceled flight goes."""
+
+    def __init__(self, flight, passengers):
+        self.flight = flight
+        self.passengers = passengers
+        self.moves = []
+        self.unplaced = []
+        self.split_orders = set()
+        # Old ticket id -> ids of its new tickets, once carried out.
+        self.new_tickets = {}
+
+    def report(self):
+        flights = Counter()
+        numbers = {}
+        for move in self.moves:
+            for leg in move.legs:
+                flights[leg.flight_id] += 1
+                numbers[leg.flight_id] = leg.flight_number
+
+        return {
+            "flight_id": self.flight.id,
+            "flight_number": self.flight.flight_number,
+            "passengers": len(self.passengers),
+            "rebooked": len(self.moves),
+            "unplaced": len(self.unplaced),
+            "split_orders": sorted(self.split_orders),
+            "flights": [
+                {
+                    "flight_id": flight_id,
+                    "flight_number": numbers[flight_id],
+                    "passengers": count,
+                }
+                for flight_id, count in sorted(flights.items())
+            ],
+            "moves": [
+                {
+                    "ticket_id": move.passenger.ticket_id,
+                    "passenger_name": move.passenger.passenger_name,
+                    "order_id": move.passenger.order_id,
+                    "legs": [
+                        {
+                            "flight_id": leg.flight_id,
+                            "flight_number": leg.flight_number,
+                            "seat_code": f"{row}{seat}",
+                        }
+                        for leg, (row, seat) in zip(move.legs, move.seats)
+                    ],
+                    "new_ticket_ids": self.new_tickets.get(
+                        move.passenger.ticket_id, []
+                    ),
+                }
+                for move in self.moves
+            ],
+            "unplaced_tickets": [
+                {
+                    "ticket_id": passenger.ticket_id,
+                    "passenger_name": passenger.passenger_name,
+                    "order_id": passenger.order_id,
+                }
+                for passenger in self.unplaced
+            ],
+        }
+
+
+def load_passengers(flight, lock=False):
+    """Active tickets of ``flight`` with their active order, one query."""
+    order_id = Order.tickets.through.objects.filter(
+        ticket_id=OuterRef("pk"), order__status__in=ACTIVE_ORDER_STATUSES
+    ).values("order_id")[:1]
+    tickets = Ticket.objects.filter(
+        flight_id=flight.id, status__in=ACTIVE_TICKET_STATUSES
+    )
+    if lock:
+        tickets = tickets.select_for_update(of=("self",))
+    return [
+        Passenger(*values)
+        for values in tickets.annotate(order_id=Subquery(order_id))
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "passenger_name",
+            "row",
+            "seat",
+            "status",
+            "hold_expires_at",
+            "order_id",
+        )
+    ]
+
+
+def find_itineraries(flight, max_connections):
+    """
+    Itineraries of other flights between the flight's airports departing
+    within ``REBOOKING_WINDOW_HOURS`` of it: direct flights first, then
+    those arriving closest to the original arrival.
+    """
+    window = timedelta(hours=settings.REBOOKING_WINDOW_HOURS)
+    earliest = max(flight.departure_time - window, timezone.now())
+    latest = flight.departure_time + window
+    options = itineraries.get_graph().search(
+        flight.route.source_id,
+        flight.route.destination_id,
+        earliest.timestamp(),
+        latest.timestamp(),
+        max_connections=max_connections,
+        limit=settings.REBOOKING_MAX_ITINERARIES,
+    )
+    arrival = flight.arrival_time.timestamp()
+    return sorted(
+        (
+            legs
+            for legs in options
+            if all(leg.flight_id != flight.id for leg in legs)
+        ),
+        key=lambda legs: (len(legs), abs(legs[-1].arrival - arrival)),
+    )
+
+
+def seat_group(plan, group, options, seat_maps):
+    """Seat ``group`` together on the first itinerary with room for it."""
+    count = len(group)
+    for legs in options:
+        maps = [seat_maps[leg.flight_id] for leg in legs]
+        if any(seat_map.free_count < count for seat_map in maps):
+            continue
+        blocks = [seat_map.find_block(count) for seat_map in maps]
+        for seat_map, block in zip(maps, blocks):
+            for row, seat in block:
+                seat_map.take(row, seat)
+        for index, passenger in enumerate(group):
+            seats = tuple(block[index] for block in blocks)
+            plan.moves.append(Move(passenger, legs, seats))
+        return True
+    return False
+
+
+def plan_rebooking(flight, max_connections=1, lock=False):
+    """
+    Work out where the active passengers of ``flight`` go, without
+    changing anything. ``flight`` should come with ``route`` selected.
+
+    Orders are seated largest first so the big blocks of free seats go to
+    the groups that need them. Seat maps are built fresh from the tickets
+    rather than read from the cache, since the plan takes seats on them.
+    """
+    passengers = load_passengers(flight, lock=lock)
+    plan = RebookingPlan(flight, passengers)
+    if not passengers:
+        return plan
+
+    options = find_itineraries(flight, max_connections)
+    flights = Flight.objects.filter(
+        pk__in={leg.flight_id for legs in options for leg in legs},
+        status="scheduled",
+    ).select_related("airplane__airplane_type")
+    seat_maps = SeatMap.for_flights(flights)
+    # The graph of another process may still list a just canceled flight.
+    options = [
+        legs
+        for legs in options
+        if all(leg.flight_id in seat_maps for leg in legs)
+    ]
+
+    groups = defaultdict(list)
+    for passenger in passengers:
+        key = passenger.order_id or ("ticket", passenger.ticket_id)
+        groups[key].append(passenger)
+
+    for group in sorted(groups.values(), key=len, reverse=True):
+        if seat_group(plan, group, options, seat_maps):
+            continue
+        if len(group) > 1:
+            plan.split_orders.add(group[0].order_id)
+        for passenger in group:
+            if not seat_group(plan, [passenger], options, seat_maps):
+                plan.unplaced.append(passenger)
+    return plan
+
+
+def rebook_flight(flight, max_connections=1, dry_run=False):
+    """
+    Cancel ``flight`` and move its passengers as ``plan_rebooking`` says.
+
+    Checked-in passengers are booked on their new flights and held seats
+    stay held until the same time. Passengers who could not be placed have
+    their tickets canceled and stay in their orders. With ``dry_run`` only
+    the plan is made. Returns the plan.
+    """
+    if dry_run:
+        flight = Flight.objects.select_related("route").get(pk=flight.pk)
+        return plan_rebooking(flight, max_connections)
+
+    for _ in range(BULK_BOOKING_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _rebook_flight_once(flight, max_connections)
+        except IntegrityError:
+            # Someone took a planned seat meanwhile; plan again.
+            continue
+
+    raise RebookingConflict()
+
+
+def _rebook_flight_once(flight, max_connections):
+    flight = (
+        Flight.objects.select_for_update(of=("self",))
+        .select_related("route")
+        .get(pk=flight.pk)
+    )
+    plan = plan_rebooking(flight, max_connections, lock=True)
+    if flight.status != "canceled":
+        flight.status = "canceled"
+        flight.save(update_fields=["status"])
+    if not plan.passengers:
+        return plan
+
+    new_tickets = Ticket.objects.bulk_create(
+        Ticket(
+            flight_id=leg.flight_id,
+            passenger_name=move.passenger.passenger_name,
+            row=row,
+            seat=seat,
+            status="held" if move.passenger.status == "held" else "booked",
+            hold_expires_at=(
+                move.passenger.hold_expires_at
+                if move.passenger.status == "held"
+                else None
+            ),
+        )
+        for move in plan.moves
+        for leg, (row, seat) in zip(move.legs, move.seats)
+    )
+    tickets = iter(new_tickets)
+    for move in plan.moves:
+        plan.new_tickets[move.passenger.ticket_id] = [
+            next(tickets).pk for _ in move.legs
+        ]
+
+    Ticket.objects.filter(
+        pk__in=[passenger.ticket_id for passenger in plan.passengers]
+    ).update(status="canceled", hold_expires_at=None)
+
+    ordered = [move for move in plan.moves if move.passenger.order_id]
+    if ordered:
+        order_ids = {move.passenger.order_id for move in ordered}
+        Order.tickets.through.objects.filter(
+            order_id__in=order_ids,
+            ticket_id__in=[move.passenger.ticket_id for move in ordered],
+        ).delete()
+        Order.tickets.through.objects.bulk_create(
+            Order.tickets.through(
+                order_id=move.passenger.order_id, ticket_id=ticket_id
+            )
+            for move in ordered
+            for ticket_id in plan.new_tickets[move.passenger.ticket_id]
+        )
+        Order.objects.filter(pk__in=order_ids).update(
+            updated_at=timezone.now()
+        )
+
+    changes = [
+        (
+            (flight.id, passenger.row, seat, passenger.status),
+            (flight.id, passenger.row, seat, "canceled"),
+        )
+        for passenger in plan.passengers
+        for seat in [passenger.seat.upper()]
+    ]
+    changes += [(None, ticket.seat_state) for ticket in new_tickets]
+    counters.apply_counter_changes(changes)
+    transaction.on_commit(lambda: inventory.apply_ticket_changes(changes))
+    return plan
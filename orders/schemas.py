@@ -1,39 +1,72 @@
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from .serializers import OrderSerializer
-
-
-list_orders_schema = swagger_auto_schema(
-    operation_description="List orders. Users see their own; admins see all.",
-    responses={
-        200: OrderSerializer(many=True),
-        401: "Authentication required",
-    },
-)
-
-
-create_order_schema = swagger_auto_schema(
-    operation_description="Create a new order. Authenticated user is set as owner.",
-    responses={
-        201: OrderSerializer,
-        400: "Validation error",
-        401: "Authentication required",
-    },
-)
-
-
-cancel_order_schema = swagger_auto_schema(
-    operation_description="Cancel an order and its tickets. Only owner can cancel.",
-    responses={
-        200: openapi.Response(
-            description="Order canceled successfully",
-            examples={
-                "application/json": {"status": "Order canceled successfully"}
-            },
+from skygate_airport_api.openapi import lazy_auto_schema
+from .serializers import BulkCancelSerializer, OrderSerializer
+
+
+@lazy_auto_schema
+def list_orders_schema(openapi):
+    return dict(
+        operation_description="List orders. Users see their own; admins see all.",
+        responses={
+            # The paginated 200 response is generated from the paginator.
+            401: "Authentication required",
+        },
+    )
+
+
+@lazy_auto_schema
+def create_order_schema(openapi):
+    return dict(
+        operation_description="Create a new order. Authenticated user is set as owner.",
+        responses={
+            201: OrderSerializer,
+            400: "Validation error",
+            401: "Authentication required",
+        },
+    )
+
+
+@lazy_auto_schema
+def cancel_order_schema(openapi):
+    return dict(
+        operation_description="Cancel an order and its tickets. Only owner can cancel.",
+        responses={
+            200: openapi.Response(
+                description="Order canceled successfully",
+                examples={
+                    "application/json": {
+                        "status": "Order canceled successfully"
+                    }
+                },
+            ),
+            400: "Only pending orders can be canceled",
+            401: "Authentication required",
+            403: "Permission denied",
+            404: "Order not found",
+        },
+    )
+
+
+@lazy_auto_schema
+def bulk_cancel_orders_schema(openapi):
+    return dict(
+        operation_description=(
+            "Cancel many pending orders and their tickets at once, given their "
+            "ids or a flight whose orders should all be canceled. Orders that "
+            "are not pending are skipped. Admins only."
         ),
-        400: "Only pending orders can be canceled",
-        401: "Authentication required",
-        403: "Permission denied",
-        404: "Order not found",
-    },
-)
+        request_body=BulkCancelSerializer,
+        responses={
+            200: openapi.Response(
+                description="Orders canceled",
+                examples={
+                    "application/json": {
+                        "canceled_orders": [12, 15],
+                        "canceled_tickets": 7,
+                    }
+                },
+            ),
+            400: "Validation error",
+            401: "Authentication required",
+            403: "Permission denied",
+        },
+    )
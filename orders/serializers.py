@@ -1,18 +1,38 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from .checkout import (
+    TicketsUnavailable,
+    place_order,
+    ticket_errors,
+    ticket_rows,
+    update_order,
+)
 from .models import Order
+from flights.models import Flight
 from tickets.serializers import TicketSerializer
+from skygate_airport_api import metrics
+from skygate_airport_api.fieldsets import FieldsetMixin
 
 
-ACTIVE_ORDER_STATUSES = ["paid", "processing"]
+class TicketIdsField(serializers.ListField):
+    """
+    Ticket ids, looked up together in ``validate_tickets`` rather than one
+    query per id like ``PrimaryKeyRelatedField(many=True)`` does.
+    """
 
+    child = serializers.IntegerField(min_value=1)
 
-class OrderSerializer(serializers.ModelSerializer):
+    def to_representation(self, tickets):
+        return [ticket.pk for ticket in tickets.all()]
+
+
+class OrderSerializer(FieldsetMixin, serializers.ModelSerializer):
     tickets_details = TicketSerializer(
         source="tickets", many=True, read_only=True
     )
     user_email = serializers.EmailField(source="user.email", read_only=True)
     username = serializers.CharField(source="user.username", read_only=True)
+    tickets = TicketIdsField()
     user = serializers.PrimaryKeyRelatedField(
         queryset=get_user_model().objects.all(),
         default=serializers.CurrentUserDefault(),
@@ -33,7 +53,14 @@ class OrderSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "user", "created_at", "updated_at"]
+        expandable_fields = ["tickets_details"]
+        read_only_fields = [
+            "id",
+            "user",
+            "total_price",
+            "created_at",
+            "updated_at",
+        ]
 
     def get_fields(self):
         fields = super().get_fields()
@@ -43,59 +70,90 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def validate_tickets(self, tickets):
         """
-        Ensure that no selected ticket is already associated with an active order.
+        Ensure that every ticket exists, is booked, checked in or on a
+        hold of the ordering user that has not expired, and is not part of
+        another active order, checking all of them with one query. Placing
+        the order books the held ones.
         """
-        if tickets:
-            for ticket in tickets:
-                if Order.objects.filter(
-                    tickets=ticket, status__in=ACTIVE_ORDER_STATUSES
-                ).exists():
-                    raise serializers.ValidationError(
-                        f"Ticket {ticket.id} is already part of an active order."
-                    )
+        if len(set(tickets)) != len(tickets):
+            raise serializers.ValidationError(
+                "A ticket is listed more than once."
+            )
+        if self.instance is not None:
+            user = self.instance.user
+        else:
+            user = self.context["request"].user
+        errors = ticket_errors(
+            tickets, ticket_rows(tickets, self.instance), user
+        )
+        if errors:
+            metrics.count_booking("order", "conflict")
+            raise serializers.ValidationError(errors)
         return tickets
 
     def validate(self, data):
         """
-        General order validation:
-        - At least one ticket must be included when creating an order.
-        - Total price must be positive if explicitly provided.
+        At least one ticket must be included when creating an order.
         """
-        tickets = data.get("tickets") or getattr(
-            self.instance, "tickets", None
-        )
-        total_price = data.get("total_price")
-
-        if not tickets and not self.instance:
+        if not data.get("tickets") and not self.instance:
             raise serializers.ValidationError(
                 {"tickets": "At least one ticket is required for a new order."}
             )
-
-        if total_price is not None and total_price <= 0:
-            raise serializers.ValidationError(
-                {"total_price": "Total price must be greater than zero."}
-            )
-
         return data
 
     def create(self, validated_data):
         """
-        Optionally calculate total price automatically instead of trusting client input.
+        Lock the tickets, check them again and save the order with a total
+        computed from their fares, all in one transaction.
         """
-        tickets = validated_data.get("tickets", [])
-        if tickets and "total_price" not in validated_data:
-            validated_data["total_price"] = sum(
-                ticket.price for ticket in tickets
-            )
-        return super().create(validated_data)
+        tickets = validated_data.pop("tickets")
+        try:
+            order = place_order(ticket_ids=tickets, **validated_data)
+        except TicketsUnavailable:
+            metrics.count_booking("order", "conflict")
+            raise
+        metrics.count_booking("order", "success")
+        return order
 
     def update(self, instance, validated_data):
         """
-        Optionally recalculate total_price if tickets are updated.
+        Reprice the order from its fares when its tickets are replaced.
         """
-        tickets = validated_data.get("tickets")
+        tickets = validated_data.pop("tickets", None)
+        try:
+            order = update_order(
+                instance, ticket_ids=tickets, **validated_data
+            )
+        except TicketsUnavailable:
+            metrics.count_booking("order", "conflict")
+            raise
         if tickets is not None:
-            validated_data["total_price"] = sum(
-                ticket.price for ticket in tickets
+            metrics.count_booking("order", "success")
+        return order
+
+
+class BulkCancelSerializer(serializers.Serializer):
+    """Orders to cancel: listed by id, or every order on a flight."""
+
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+    )
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.all(), required=False
+    )
+
+    def validate(self, data):
+        if ("order_ids" in data) == ("flight" in data):
+            raise serializers.ValidationError(
+                "Provide either order_ids or flight."
+            )
+        return data
+
+    def get_orders(self):
+        if "flight" in self.validated_data:
+            return Order.objects.filter(
+                tickets__flight=self.validated_data["flight"]
             )
-        return super().update(instance, validated_data)
+        return Order.objects.filter(pk__in=self.validated_data["order_ids"])
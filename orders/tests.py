@@ -1,4 +1,7 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from decimal import Decimal
 from rest_framework import status
@@ -7,10 +10,14 @@ from django.utils import timezone
 from datetime import timedelta
 
 from .models import Order
+from tickets import counters
+from tickets.holds import release_expired_holds
 from tickets.models import Ticket
+from flights import itineraries
 from flights.models import Flight, Crew
 from airports.models import Airport, Route
 from airplanes.models import Airplane, AirplaneType
+from skygate_airport_api.testing import QueryBudgetMixin
 
 
 class OrderModelTest(TestCase):
@@ -83,7 +90,7 @@ class OrderModelTest(TestCase):
         self.assertIn(self.ticket2, self.order.tickets.all())
 
 
-class OrderAPITest(APITestCase):
+class OrderAPITest(QueryBudgetMixin, APITestCase):
     """Tests for the Order API endpoints"""
 
     def setUp(self):
@@ -155,8 +162,155 @@ class OrderAPITest(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(self.orders_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.order.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.order.id)
+
+    def test_list_query_budget(self):
+        """Test that listing orders does not query per ticket or flight"""
+        self.flight.crew.add(
+            Crew.objects.create(
+                first_name="Lena", last_name="Fischer", role="Captain"
+            )
+        )
+        for number in range(99):
+            order = Order.objects.create(
+                user=self.user, total_price=Decimal("99.99")
+            )
+            order.tickets.add(
+                Ticket.objects.create(
+                    flight=self.flight,
+                    passenger_name=f"Passenger {number}",
+                    row=number // 5 + 1,
+                    seat="ABDEF"[number % 5],
+                )
+            )
+
+        self.client.force_authenticate(user=self.user)
+        with self.assertQueryBudget(3):
+            response = self.client.get(
+                self.orders_url,
+                {
+                    "page_size": 100,
+                    "expand": "tickets_details.flight_details.crew",
+                },
+            )
+        self.assertEqual(len(response.data["results"]), 100)
+        ticket = response.data["results"][0]["tickets_details"][0]
+        self.assertEqual(
+            ticket["flight_details"]["crew"][0]["first_name"], "Lena"
+        )
+
+    def book_tickets(self, count, first_row=1):
+        return Ticket.objects.bulk_create(
+            Ticket(
+                flight=self.flight,
+                passenger_name=f"Passenger {number}",
+                row=first_row + number // 6,
+                seat="ABCDEF"[number % 6],
+            )
+            for number in range(count)
+        )
+
+    def test_create_order_prices_tickets_from_fares(self):
+        """Test that the total comes from the fares, not the client"""
+        tickets = self.book_tickets(2)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.orders_url,
+            {
+                "tickets": [ticket.id for ticket in tickets],
+                "total_price": "0.01",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # 25.00 plus 0.08 for each of the route's 1200 km, per ticket.
+        self.assertEqual(response.data["total_price"], "242.00")
+        self.assertEqual(
+            sorted(response.data["tickets"]),
+            sorted(ticket.id for ticket in tickets),
+        )
+        order = Order.objects.get(pk=response.data["id"])
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(order.tickets.count(), 2)
+
+    def test_create_order_rejects_unavailable_tickets(self):
+        """Test that every unusable ticket is reported at once"""
+        canceled = self.book_tickets(1, first_row=2)[0]
+        Ticket.objects.filter(pk=canceled.pk).update(status="canceled")
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.orders_url,
+            {"tickets": [self.ticket.id, canceled.id, 9999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["tickets"],
+            [
+                f"Ticket {self.ticket.id} is already part of an active "
+                "order.",
+                f"Ticket {canceled.id} is canceled.",
+                "Ticket 9999 does not exist.",
+            ],
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_create_order_books_held_tickets(self):
+        """Test that ordering held tickets confirms their holds"""
+        held, expired = Ticket.objects.bulk_create(
+            Ticket(
+                flight=self.flight,
+                passenger_name=f"Passenger {seat}",
+                row=3,
+                seat=seat,
+                status="held",
+                hold_expires_at=timezone.now() + expires_in,
+                held_by=self.user,
+            )
+            for seat, expires_in in (
+                ("A", timedelta(minutes=10)),
+                ("B", timedelta(minutes=-1)),
+            )
+        )
+        counters.recount([self.flight.id])
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            self.orders_url, {"tickets": [expired.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["tickets"],
+            [f"The hold on ticket {expired.id} has expired."],
+        )
+
+        response = self.client.post(
+            self.orders_url, {"tickets": [held.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        held.refresh_from_db()
+        self.assertEqual(held.status, "booked")
+        self.assertIsNone(held.hold_expires_at)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.held_seats, 1)
+
+        release_expired_holds(now=timezone.now() + timedelta(hours=1))
+        held.refresh_from_db()
+        self.assertEqual(held.status, "booked")
+
+    def test_create_order_query_budget(self):
+        """Test that order creation does not query per ticket"""
+        tickets = self.book_tickets(50)
+        self.client.force_authenticate(user=self.user)
+        with self.assertQueryBudget(12):
+            response = self.client.post(
+                f"{self.orders_url}?expand=tickets_details",
+                {"tickets": [ticket.id for ticket in tickets]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["tickets_details"]), 50)
 
     def test_user_cannot_view_others_orders(self):
         """Test that a user cannot view orders of other users"""
@@ -187,3 +341,380 @@ class OrderAPITest(APITestCase):
 
         self.ticket.refresh_from_db()
         self.assertEqual(self.ticket.status, "canceled")
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.booked_seats, 0)
+
+        response = self.client.post(self.cancel_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def place_orders(
+        self, count, tickets_per_order, order_status="pending", first_row=2
+    ):
+        tickets = self.book_tickets(
+            count * tickets_per_order, first_row=first_row
+        )
+        counters.recount([self.flight.id])
+        orders = Order.objects.bulk_create(
+            Order(
+                user=self.user,
+                total_price=Decimal("100.00"),
+                status=order_status,
+            )
+            for _ in range(count)
+        )
+        Order.tickets.through.objects.bulk_create(
+            Order.tickets.through(order_id=order.id, ticket_id=ticket.id)
+            for number, order in enumerate(orders)
+            for ticket in tickets[
+                number * tickets_per_order : (number + 1) * tickets_per_order
+            ]
+        )
+        return orders
+
+    def test_bulk_cancel_by_flight(self):
+        """Test that staff can cancel every pending order on a flight"""
+        orders = self.place_orders(20, 3, first_row=11)
+        paid = self.place_orders(1, 2, order_status="paid", first_row=21)[0]
+        self.client.force_authenticate(user=self.admin_user)
+        with self.assertQueryBudget(10):
+            response = self.client.post(
+                f"{self.orders_url}bulk-cancel/",
+                {"flight": self.flight.id},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(response.data["canceled_orders"]),
+            sorted([self.order.id] + [order.id for order in orders]),
+        )
+        self.assertEqual(response.data["canceled_tickets"], 61)
+
+        paid.refresh_from_db()
+        self.assertEqual(paid.status, "paid")
+        self.assertEqual(Ticket.objects.filter(status="canceled").count(), 61)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.booked_seats, 2)
+
+    def test_bulk_cancel_by_ids(self):
+        """Test that only the listed pending orders are canceled"""
+        first, second = self.place_orders(2, 1)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            f"{self.orders_url}bulk-cancel/",
+            {"order_ids": [first.id, self.order.id, 9999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "canceled_orders": sorted([first.id, self.order.id]),
+                "canceled_tickets": 2,
+            },
+        )
+        second.refresh_from_db()
+        self.assertEqual(second.status, "pending")
+
+    def test_bulk_cancel_validation(self):
+        """Test that bulk cancel is for staff and needs one selector"""
+        url = f"{self.orders_url}bulk-cancel/"
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            url, {"order_ids": [self.order.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        for payload in ({}, {"order_ids": [1], "flight": self.flight.id}):
+            response = self.client.post(url, payload, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "pending")
+
+
+class OrderPaginationTest(APITestCase):
+    """Tests for keyset pagination of the order list"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username="auditor", password="audit123", is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        for number in range(7):
+            Order.objects.create(
+                user=self.admin_user, total_price=Decimal(100 - number)
+            )
+        # Shared timestamps must not make pages skip or repeat orders.
+        shared = Order.objects.order_by("pk").values("pk")[:4]
+        Order.objects.filter(pk__in=shared).update(created_at=timezone.now())
+
+    def walk(self, url, params):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([order["id"] for order in response.data["results"]])
+            if not response.data["next"]:
+                return pages, response
+            response = self.client.get(response.data["next"])
+
+    def test_pages_follow_default_ordering(self):
+        """Test walking all pages forwards and back"""
+        pages, last = self.walk("/api/orders/", {"page_size": 3})
+        expected = list(
+            Order.objects.order_by("-created_at", "-pk").values_list(
+                "pk", flat=True
+            )
+        )
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        response = self.client.get(last.data["previous"])
+        self.assertEqual(
+            [order["id"] for order in response.data["results"]], pages[1]
+        )
+        self.assertNotIn("count", response.data)
+
+    def test_pages_follow_ordering_filter(self):
+        """Test that ?ordering= is used as the keyset"""
+        pages, _ = self.walk(
+            "/api/orders/", {"page_size": 2, "ordering": "total_price"}
+        )
+        expected = list(
+            Order.objects.order_by("total_price", "pk").values_list(
+                "pk", flat=True
+            )
+        )
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_no_offset_or_count_queries(self):
+        """Test that deep pages are cut by position alone"""
+        first = self.client.get("/api/orders/", {"page_size": 3})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data["next"])
+        sql = " ".join(query["sql"] for query in queries).upper()
+        self.assertNotIn("OFFSET", sql)
+        self.assertNotIn("COUNT(", sql)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is a 404"""
+        for cursor in ("garbage", "WzAsIFsieCIsICJ5Il1d"):
+            response = self.client.get("/api/orders/", {"cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FlightRebookingTest(QueryBudgetMixin, APITestCase):
+    """Tests for canceling a flight and rebooking its passengers"""
+
+    def setUp(self):
+        cache.clear()
+        itineraries.reset()
+
+        self.admin_user = User.objects.create_user(
+            username="ops", password="ops12345", is_staff=True
+        )
+        self.user = User.objects.create_user(
+            username="traveller", password="travel123"
+        )
+        origin = Airport.objects.create(
+            name="OSL Airport", closest_big_city="Oslo"
+        )
+        destination = Airport.objects.create(
+            name="LIS Airport", closest_big_city="Lisbon"
+        )
+        hub = Airport.objects.create(
+            name="AMS Airport", closest_big_city="Amsterdam"
+        )
+        small = AirplaneType.objects.create(
+            name="Dash 8", rows=2, seats_in_row=3
+        )
+        large = AirplaneType.objects.create(
+            name="Airbus A330", rows=3, seats_in_row=4
+        )
+        departure = timezone.now() + timedelta(days=2)
+
+        def flight(number, source, to, airplane_type, hours=0):
+            leaves = departure + timedelta(hours=hours)
+            return Flight.objects.create(
+                flight_number=number,
+                departure_time=leaves,
+                arrival_time=leaves + timedelta(hours=2),
+                route=Route.objects.get_or_create(
+                    source=source, destination=to, defaults={"distance": 900}
+                )[0],
+                airplane=Airplane.objects.create(
+                    name=f"SG-{number}", airplane_type=airplane_type
+                ),
+            )
+
+        self.flight = flight("SG100", origin, destination, large)
+        self.direct = flight("SG102", origin, destination, small, hours=3)
+        self.first_leg = flight("SG200", origin, hub, large)
+        self.second_leg = flight("SG202", hub, destination, large, hours=3)
+
+        self.ticket(self.direct, "Other A", 1, "A")
+        self.ticket(self.direct, "Other B", 1, "B")
+
+        self.family = self.order(
+            [
+                self.ticket(self.flight, f"Family {number}", 1, seat)
+                for number, seat in enumerate("ABC")
+            ]
+        )
+        self.couple = self.order(
+            [
+                self.ticket(self.flight, f"Couple {number}", 2, seat)
+                for number, seat in enumerate("AB")
+            ]
+        )
+        self.loner = self.ticket(self.flight, "Loner", 3, "D")
+        self.cancel_url = f"/api/flights/{self.flight.id}/cancel/"
+
+    def ticket(self, flight, name, row, seat):
+        return Ticket.objects.create(
+            flight=flight, passenger_name=name, row=row, seat=seat
+        )
+
+    def order(self, tickets):
+        order = Order.objects.create(
+            user=self.user, total_price=Decimal("300.00")
+        )
+        order.tickets.add(*tickets)
+        return order
+
+    def seats(self, order):
+        return sorted(
+            (ticket.flight.flight_number, f"{ticket.row}{ticket.seat}")
+            for ticket in order.tickets.select_related("flight")
+        )
+
+    def test_rebooks_orders_together(self):
+        """Test that orders stay together and links move to new tickets"""
+        self.client.force_authenticate(user=self.admin_user)
+        with self.assertQueryBudget(20):
+            response = self.client.post(self.cancel_url, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rebooked"], 6)
+        self.assertEqual(response.data["unplaced"], 0)
+        self.assertFalse(response.data["dry_run"])
+
+        # The largest order gets the free row on the direct flight, the
+        # next one connects through the hub, and the single passenger
+        # takes the seat left on the direct flight.
+        self.assertEqual(
+            self.seats(self.family),
+            [("SG102", "2A"), ("SG102", "2B"), ("SG102", "2C")],
+        )
+        self.assertEqual(
+            self.seats(self.couple),
+            [
+                ("SG200", "1A"),
+                ("SG200", "1B"),
+                ("SG202", "1A"),
+                ("SG202", "1B"),
+            ],
+        )
+        self.assertTrue(
+            Ticket.objects.filter(
+                flight=self.direct, passenger_name="Loner", seat="C"
+            ).exists()
+        )
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.status, "canceled")
+        self.assertEqual(self.flight.booked_seats, 0)
+        self.assertEqual(
+            set(self.flight.tickets.values_list("status", flat=True)),
+            {"canceled"},
+        )
+        for flight, booked in [
+            (self.direct, 6),
+            (self.first_leg, 2),
+            (self.second_leg, 2),
+        ]:
+            flight.refresh_from_db()
+            self.assertEqual(flight.booked_seats, booked)
+
+    def test_dry_run_changes_nothing(self):
+        """Test that a dry run reports the plan without applying it"""
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            self.cancel_url,
+            {"dry_run": True, "max_connections": 0},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["dry_run"])
+        # Without connections the couple has to be split up and one of
+        # them, like the single passenger, finds no seat.
+        self.assertEqual(response.data["rebooked"], 4)
+        self.assertEqual(response.data["unplaced"], 2)
+        self.assertEqual(response.data["split_orders"], [self.couple.id])
+        self.assertEqual(
+            response.data["flights"],
+            [
+                {
+                    "flight_id": self.direct.id,
+                    "flight_number": "SG102",
+                    "passengers": 4,
+                }
+            ],
+        )
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.status, "scheduled")
+        self.assertEqual(self.flight.booked_seats, 6)
+        self.assertEqual(
+            self.seats(self.family),
+            [("SG100", "1A"), ("SG100", "1B"), ("SG100", "1C")],
+        )
+
+    def test_canceled_flight_cannot_be_booked(self):
+        """Test that staff only can cancel and bookings are then refused"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.cancel_url, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.post(self.cancel_url, {}, format="json")
+        response = self.client.post(
+            "/api/tickets/",
+            {
+                "flight": self.flight.id,
+                "passenger_name": "Late Comer",
+                "row": 1,
+                "seat": "A",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["flight"], ["Flight SG100 is canceled."]
+        )
+
+    def test_replacement_flight_reuses_airplane_and_crew(self):
+        """Test that a canceled flight frees its airplane and crew"""
+        captain = Crew.objects.create(
+            first_name="Ingrid", last_name="Dahl", role="Pilot"
+        )
+        self.flight.crew.add(captain)
+        replacement = {
+            "flight_number": "SG101",
+            "departure_time": self.flight.departure_time.isoformat(),
+            "arrival_time": self.flight.arrival_time.isoformat(),
+            "route": self.flight.route_id,
+            "airplane": self.flight.airplane_id,
+            "crew_ids": [captain.id],
+        }
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(
+            "/api/flights/", replacement, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.post(self.cancel_url, {}, format="json")
+        response = self.client.post(
+            "/api/flights/", replacement, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
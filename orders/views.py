@@ -1,25 +1,35 @@
+from django.db.models import Prefetch
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 from orders.models import Order
-from orders.serializers import OrderSerializer
+from orders.cancellation import cancel_orders
+from orders.serializers import BulkCancelSerializer, OrderSerializer
 from orders.schemas import (
     list_orders_schema,
     create_order_schema,
     cancel_order_schema,
+    bulk_cancel_orders_schema,
 )
 from orders.permissions import IsOrderOwner
+from tickets.models import Ticket
+from skygate_airport_api.compound import CompoundDocumentMixin
+from skygate_airport_api.profiling import ProfiledViewMixin
+from skygate_airport_api.fieldsets import Fieldset
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(
+    ProfiledViewMixin, CompoundDocumentMixin, viewsets.ModelViewSet
+):
     """
     API endpoint for managing orders.
 
     Users can view and modify only their own orders.
-    Admins have access to all orders.
+    Admins have access to all orders. The list side-loads the flights its
+    tickets are on with ``?include=`` (see ``skygate_airport_api.compound``).
     """
 
     serializer_class = OrderSerializer
@@ -32,14 +42,44 @@ class OrderViewSet(viewsets.ModelViewSet):
         if getattr(self, "swagger_fake_view", False):
             return Order.objects.none()
 
+        # Prefetch only what the requested fields and expansions show.
+        fieldset = Fieldset.from_request(self.request)
+        queryset = Order.objects.select_related("user")
+        tickets = Ticket.objects.all()
+        if fieldset.expands("tickets_details.flight_details"):
+            tickets = tickets.select_related("flight")
+        if (
+            fieldset.wants("tickets")
+            or fieldset.expands("tickets_details")
+            or self.get_include()
+        ):
+            queryset = queryset.prefetch_related(
+                Prefetch("tickets", queryset=tickets)
+            )
+        if fieldset.expands("tickets_details.flight_details.crew"):
+            queryset = queryset.prefetch_related("tickets__flight__crew")
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
+            return queryset
         else:
-            return Order.objects.filter(user=user)
+            return queryset.filter(user=user)
+
+    def get_flight_ids(self, orders):
+        return {
+            ticket.flight_id
+            for order in orders
+            for ticket in order.tickets.all()
+        }
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        order = serializer.save(user=self.request.user)
+        # Reload with the list's prefetches so the response does not
+        # query each ticket's flight separately.
+        serializer.instance = self.get_queryset().get(pk=order.pk)
+
+    def perform_update(self, serializer):
+        order = serializer.save()
+        serializer.instance = self.get_queryset().get(pk=order.pk)
 
     @list_orders_schema
     def list(self, request, *args, **kwargs):
@@ -53,18 +93,25 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def cancel(self, request, pk=None):
         order = self.get_object()
-        if order.status != "pending":
+        canceled, _ = cancel_orders(Order.objects.filter(pk=order.pk))
+        if not canceled:
             return Response(
-                {"error": "Only pending orders can be cancelled"},
+                {"error": "Only pending orders can be canceled"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response({"status": "Order canceled successfully"})
 
-        order.status = "cancelled"
-        order.save()
-
-        # Cancel all tickets in the order
-        for ticket in order.tickets.all():
-            ticket.status = "cancelled"
-            ticket.save()
-
-        return Response({"status": "Order cancelled successfully"})
+    @bulk_cancel_orders_schema
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk-cancel",
+        permission_classes=[IsAdminUser],
+    )
+    def bulk_cancel(self, request):
+        serializer = BulkCancelSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids, ticket_count = cancel_orders(serializer.get_orders())
+        return Response(
+            {"canceled_orders": order_ids, "canceled_tickets": ticket_count}
+        )
@@ -0,0 +1,166 @@
+"""
+Compound documents: related objects side-loaded once per response.
+
+A list of orders or tickets names the same few flights over and over, and
+embedding each flight with ``?expand=`` repeats it for every ticket on it.
+``?include=flights,crew,airports,airplane_types`` instead keeps the listed
+objects referring to flights by id, as a ticket's ``flight`` does, and adds
+an ``included`` section to the response with every referenced object of
+the named types serialised once::
+
+    {
+        "next": ..., "previous": ..., "results": [...],
+        "included": {"flights": [...], "crew": [...], ...}
+    }
+
+Included objects refer to each other by id too: a flight to its ``route``,
+``airplane`` and ``crew``, a route to its ``source`` and ``destination``
+airports and an airplane to its ``airplane_type``. Types that are not
+named are still followed to reach the ones that are, but left out.
+Routes, airports, airplanes and airplane types come from the reference
+cache, so a warm process only queries the flights and their crew.
+"""
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from airplanes.models import Airplane, AirplaneType
+from airplanes.serializers import (
+    AirplaneReferenceSerializer,
+    AirplaneTypeSerializer,
+)
+from airports.models import Airport, Route
+from airports.serializers import AirportSerializer, RouteReferenceSerializer
+from flights.models import Flight
+from flights.serializers import CrewSerializer, FlightReferenceSerializer
+from skygate_airport_api import refcache
+from skygate_airport_api.profiling import profiled
+
+
+TYPES = (
+    "flights",
+    "crew",
+    "routes",
+    "airports",
+    "airplanes",
+    "airplane_types",
+)
+
+
+def parse_include(request):
+    """The types named by ``?include=``, or an empty set."""
+    value = getattr(request, "query_params", {}).get("include", "")
+    include = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = include.difference(TYPES)
+    if unknown:
+        raise serializers.ValidationError(
+            {
+                "include": [
+                    f"Unknown type {name!r}; choose from {', '.join(TYPES)}."
+                    for name in sorted(unknown)
+                ]
+            }
+        )
+    return include
+
+
+def included(flight_ids, include):
+    """
+    ``{type: [serialised object, ...]}`` for the flights ``flight_ids``
+    and the objects they lead to, limited to the types in ``include``.
+    """
+    flights = Flight.objects.filter(pk__in=set(flight_ids)).order_by("pk")
+    if include & {"flights", "crew"}:
+        flights = flights.prefetch_related("crew")
+    flights = list(flights)
+
+    routes = refcache.get_many(Route, {flight.route_id for flight in flights})
+    airplanes = refcache.get_many(
+        Airplane, {flight.airplane_id for flight in flights}
+    )
+    objects = {
+        "flights": flights,
+        "routes": routes.values(),
+        "airplanes": airplanes.values(),
+    }
+    if "crew" in include:
+        objects["crew"] = {
+            member.pk: member
+            for flight in flights
+            for member in flight.crew.all()
+        }.values()
+    if "airports" in include:
+        objects["airports"] = refcache.get_many(
+            Airport,
+            {
+                pk
+                for route in routes.values()
+                for pk in (route.source_id, route.destination_id)
+            },
+        ).values()
+    if "airplane_types" in include:
+        objects["airplane_types"] = refcache.get_many(
+            AirplaneType,
+            {airplane.airplane_type_id for airplane in airplanes.values()},
+        ).values()
+
+    serializer_classes = {
+        "flights": FlightReferenceSerializer,
+        "crew": CrewSerializer,
+        "routes": RouteReferenceSerializer,
+        "airports": AirportSerializer,
+        "airplanes": AirplaneReferenceSerializer,
+        "airplane_types": AirplaneTypeSerializer,
+    }
+    return {
+        name: profiled(
+            serializer_classes[name](
+                sorted(objects[name], key=lambda instance: instance.pk),
+                many=True,
+            )
+        ).data
+        for name in TYPES
+        if name in include
+    }
+
+
+class CompoundDocumentMixin:
+    """
+    Side-load the flights a viewset's list refers to, and what they lead
+    to, when ``?include=`` asks for it.
+
+    Views must say which flights a page refers to by defining
+    ``get_flight_ids(objects)``; a view class without it cannot be
+    created.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, "get_flight_ids", None)):
+            raise TypeError(
+                f"{cls.__name__} must define get_flight_ids(objects) to use "
+                "CompoundDocumentMixin."
+            )
+
+    def get_include(self):
+        if getattr(self, "swagger_fake_view", False):
+            return set()
+        return parse_include(self.request)
+
+    def list(self, request, *args, **kwargs):
+        include = self.get_include()
+        if not include:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = list(queryset) if page is None else page
+        data = self.get_serializer(objects, many=True).data
+        if page is None:
+            response = Response({"results": data})
+        else:
+            response = self.get_paginated_response(data)
+        response.data["included"] = included(
+            self.get_flight_ids(objects), include
+        )
+        return response
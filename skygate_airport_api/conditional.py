@@ -0,0 +1,25 @@
+"""
+Conditional GET helpers for resources that carry a version number.
+"""
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+def version_etag(*parts):
+    """Build an ETag such as ``"flight-12-7-json"`` from its parts."""
+    return quote_etag("-".join(str(part) for part in parts))
+
+
+def conditional_response(request, etag, build_response):
+    """
+    Answer ``If-None-Match`` with a 304 when ``etag`` still matches.
+
+    ``build_response`` is only called when the client's copy is stale, so
+    nothing is queried or serialised for a 304.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+    response["ETag"] = etag
+    return response
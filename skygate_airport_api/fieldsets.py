@@ -0,0 +1,140 @@
+"""
+Sparse fieldsets and expandable nesting, chosen by the client.
+
+``?fields=id,status`` limits a response to the listed fields, and
+``?expand=tickets_details`` embeds the nested objects that serializers
+leave out unless asked, named in their ``Meta.expandable_fields``. Both
+take comma-separated dotted paths into nested serializers, so
+``?expand=tickets_details.flight_details.crew`` embeds an order's tickets,
+their flights and the flights' crew, and
+``?fields=id,tickets_details.seat_code`` shows only the id of each order
+and the seat of each of its tickets. Naming an expandable field in
+``fields`` expands it too.
+
+Views read the same parameters with ``Fieldset.from_request`` to prefetch
+only the relations the response is going to use.
+"""
+
+import hashlib
+
+from rest_framework import serializers
+
+
+def parse_paths(value):
+    """``"a,b.c,b.d"`` -> ``{"a": {}, "b": {"c": {}, "d": {}}}``."""
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def etag_parts(request):
+    """
+    ETag parts telling apart the representations chosen by ``fields`` and
+    ``expand``; none when neither is given.
+    """
+    params = request.query_params
+    chosen = f"{params.get('fields', '')}|{params.get('expand', '')}"
+    if chosen == "|":
+        return []
+    return [hashlib.sha1(chosen.encode()).hexdigest()[:12]]
+
+
+class Fieldset:
+    """
+    The fields and expansions requested for one serializer.
+
+    ``only`` is a tree of the wanted fields, or ``None`` for all of them,
+    and ``expand`` a tree of the expanded ones. ``expand_all`` expands
+    every expandable field at every level.
+    """
+
+    def __init__(self, only=None, expand=None, expand_all=False):
+        self.only = only
+        self.expand = expand or {}
+        self.expand_all = expand_all
+
+    @classmethod
+    def from_request(cls, request):
+        params = getattr(request, "query_params", {})
+        only = params.get("fields")
+        expand = params.get("expand")
+        return cls(
+            parse_paths(only) if only else None,
+            parse_paths(expand) if expand else None,
+        )
+
+    def wants(self, name):
+        return self.only is None or name in self.only
+
+    def expands(self, path):
+        """Whether every field along the dotted ``path`` is expanded."""
+        fieldset = self
+        for name in path.split("."):
+            if not fieldset.wants(name) or not (
+                fieldset.expand_all
+                or name in fieldset.expand
+                or (fieldset.only is not None and name in fieldset.only)
+            ):
+                return False
+            fieldset = fieldset.nested(name)
+        return True
+
+    def nested(self, name):
+        """The fieldset of the serializer nested under ``name``."""
+        only = self.only.get(name) if self.only is not None else None
+        return Fieldset(only or None, self.expand.get(name), self.expand_all)
+
+
+class FieldsetMixin:
+    """
+    Apply ``fields`` and ``expand`` to a serializer and its nested ones.
+
+    The top-level serializer reads them from the request's query
+    parameters and hands each nested serializer its part. Without a
+    request, as when a serializer is used directly or to generate the API
+    schema, everything is expanded.
+
+    On writes only read-only fields are left out by ``fields``, so every
+    field can still be set.
+    """
+
+    def get_fieldset(self):
+        fieldset = getattr(self, "_fieldset", None)
+        if fieldset is None:
+            fieldset = self._fieldset = self.get_root_fieldset()
+        return fieldset
+
+    def get_root_fieldset(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            # Nested in a serializer without fieldsets.
+            return Fieldset()
+
+        request = self.context.get("request")
+        view = self.context.get("view")
+        if request is None or getattr(view, "swagger_fake_view", False):
+            return Fieldset(expand_all=True)
+        return Fieldset.from_request(request)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+
+        for name in getattr(self.Meta, "expandable_fields", ()):
+            if not fieldset.expands(name):
+                fields.pop(name, None)
+
+        reading = not hasattr(self, "initial_data")
+        for name, field in list(fields.items()):
+            if not fieldset.wants(name) and (reading or field.read_only):
+                del fields[name]
+            elif isinstance(field, serializers.BaseSerializer):
+                nested = getattr(field, "child", field)
+                nested._fieldset = fieldset.nested(name)
+        return fields
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from skygate_airport_api import openapi
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema and write it, with gzipped copies, to "
+        "OPENAPI_SCHEMA_DIR. Run on every deploy so workers serve the "
+        "current schema without generating it themselves."
+    )
+
+    def handle(self, *args, **options):
+        for path in openapi.write(openapi.generate()):
+            self.stdout.write(f"Wrote {path}")
+        self.stdout.write(self.style.SUCCESS("OpenAPI schema generated."))
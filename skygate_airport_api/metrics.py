@@ -0,0 +1,285 @@
+"""
+Prometheus metrics shared by every worker.
+
+Each process counts in memory and, at most every ``METRICS_FLUSH_INTERVAL``
+seconds, writes a snapshot of its counters to its own file in
+``METRICS_DIR``. ``/metrics`` flushes the serving process and adds up the
+files of every process, so the totals cover all gunicorn workers whichever
+one answers the scrape. Files of exited workers are kept so counters never
+go backwards; the Docker entrypoint clears the directory on start.
+
+Recorded are request counts and latency histograms per URL name (a
+viewset action such as ``ticket-available-seats``), SQL query counts and
+time per URL name, seat map, flight board and reference data cache hits
+and misses, and booking outcomes from ticket and order validation. The
+request, latency and SQL counters are fed by the profiling middleware
+(``skygate_airport_api.profiling``), which already times every request.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+from skygate_airport_api import refcache
+
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    "skygate_http_requests_total": (
+        "counter",
+        "HTTP requests by URL name, method and status code.",
+    ),
+    "skygate_http_request_duration_seconds": (
+        "histogram",
+        "HTTP request latency by URL name and method.",
+    ),
+    "skygate_db_queries_total": (
+        "counter",
+        "SQL queries run while serving requests, by URL name.",
+    ),
+    "skygate_db_query_duration_seconds_total": (
+        "counter",
+        "Time spent in SQL queries while serving requests, by URL name.",
+    ),
+    "skygate_cache_requests_total": (
+        "counter",
+        "Cache lookups by cache and result (hit or miss).",
+    ),
+    "skygate_cache_evictions_total": (
+        "counter",
+        "Entries evicted from the reference data caches.",
+    ),
+    "skygate_bookings_total": (
+        "counter",
+        "Ticket and order validation outcomes: success, invalid or "
+        "conflict.",
+    ),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsStore:
+    """The counters of one process and the file they are flushed to."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.flushed_at = 0
+
+    def start(self):
+        # A forked worker starts from zero with a file of its own.
+        self.pid = os.getpid()
+        self.filename = f"{self.pid}-{uuid.uuid4().hex[:8]}.json"
+        self.values = defaultdict(float)
+
+    def inc(self, name, labels=(), amount=1):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            self.values[name, labels] += amount
+        self.maybe_flush()
+
+    def observe_request(self, view, method, status, seconds, queries):
+        query_count, query_seconds = queries
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            values = self.values
+            values[
+                "skygate_http_requests_total",
+                (("view", view), ("method", method), ("status", str(status))),
+            ] += 1
+            labels = (("view", view), ("method", method))
+            for bound in LATENCY_BUCKETS:
+                if seconds <= bound:
+                    break
+            else:
+                bound = "+Inf"
+            values[
+                "skygate_http_request_duration_seconds_bucket",
+                labels + (("le", str(bound)),),
+            ] += 1
+            values[
+                "skygate_http_request_duration_seconds_sum", labels
+            ] += seconds
+            values["skygate_http_request_duration_seconds_count", labels] += 1
+            if query_count:
+                values[
+                    "skygate_db_queries_total", (("view", view),)
+                ] += query_count
+                values[
+                    "skygate_db_query_duration_seconds_total",
+                    (("view", view),),
+                ] += query_seconds
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if (
+            time.monotonic() - self.flushed_at
+            >= settings.METRICS_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.start()
+            samples = [
+                [name, list(labels), value]
+                for (name, labels), value in self.values.items()
+            ]
+        for model, stats in refcache.stats().items():
+            cache = (("cache", f"reference:{model}"),)
+            samples += [
+                [
+                    "skygate_cache_requests_total",
+                    list(cache + (("result", "hit"),)),
+                    stats["hits"],
+                ],
+                [
+                    "skygate_cache_requests_total",
+                    list(cache + (("result", "miss"),)),
+                    stats["misses"],
+                ],
+                [
+                    "skygate_cache_evictions_total",
+                    list(cache),
+                    stats["evictions"],
+                ],
+            ]
+        return samples
+
+    def flush(self):
+        """Write this process's counters to its file."""
+        self.flushed_at = time.monotonic()
+        samples = self.snapshot()
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as handle:
+            json.dump(samples, handle)
+        os.replace(temporary, directory / self.filename)
+
+
+store = MetricsStore()
+atexit.register(lambda: store.pid == os.getpid() and store.flush())
+
+
+def inc(name, amount=1, **labels):
+    """Add ``amount`` to a counter, e.g. ``inc("x_total", cache="seat_map")``."""
+    store.inc(name, tuple(labels.items()), amount)
+
+
+def count_booking(serializer, outcome):
+    inc("skygate_bookings_total", serializer=serializer, outcome=outcome)
+
+
+def count_cache(cache, hits, misses):
+    if hits:
+        inc("skygate_cache_requests_total", hits, cache=cache, result="hit")
+    if misses:
+        inc("skygate_cache_requests_total", misses, cache=cache, result="miss")
+
+
+def collect():
+    """Sum the counters of every process as ``{(name, labels): value}``."""
+    store.flush()
+    totals = defaultdict(float)
+    for path in Path(settings.METRICS_DIR).glob("*.json"):
+        try:
+            samples = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # Removed or replaced while we were reading it.
+            continue
+        for name, labels, value in samples:
+            totals[name, tuple(map(tuple, labels))] += value
+    return totals
+
+
+def render(totals):
+    """Format ``collect()`` output in the Prometheus text format."""
+    families = defaultdict(list)
+    for (name, labels), value in totals.items():
+        family = name
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[: -len(suffix)] in METRICS:
+                family = name[: -len(suffix)]
+        families[family].append((name, labels, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        samples = families[family]
+        if kind == "histogram":
+            samples = cumulative_buckets(samples)
+        for name, labels, value in sorted(samples, key=sample_order):
+            lines.append(
+                f"{name}{format_labels(labels)} {format_value(value)}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def cumulative_buckets(samples):
+    """Turn per-bucket counts into the cumulative ``le`` series."""
+    buckets = defaultdict(dict)
+    others = []
+    for name, labels, value in samples:
+        if name.endswith("_bucket"):
+            series = (name, tuple(pair for pair in labels if pair[0] != "le"))
+            buckets[series][dict(labels)["le"]] = value
+        else:
+            others.append((name, labels, value))
+
+    for (name, labels), counts in buckets.items():
+        running = 0
+        for bound in LATENCY_BUCKETS + ("+Inf",):
+            running += counts.get(str(bound), 0)
+            others.append((name, labels + (("le", str(bound)),), running))
+    return others
+
+
+def sample_order(sample):
+    name, labels, _ = sample
+    le = dict(labels).get("le")
+    bound = float(le) if le is not None else 0
+    return name, [pair for pair in labels if pair[0] != "le"], bound
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            key,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace('"', '\\"'),
+        )
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+@require_safe
+def metrics_view(request):
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,239 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema walks every view, serializer and ``*_schema``
+decorator, which takes longer than any request the API serves. It is done
+once, by ``manage.py generate_schema`` at deploy time, and written to
+``OPENAPI_SCHEMA_DIR`` as JSON and YAML, each with a gzipped copy. Workers
+read those files into memory on the first schema request and serve the
+bytes as they are. When the files are missing the first request generates
+and writes them.
+
+drf_yasg's generator, codecs and renderers are only imported while
+generating the schema or rendering the Swagger UI and ReDoc pages, never
+when a worker boots. Views are documented with ``lazy_auto_schema``
+rather than drf_yasg's ``swagger_auto_schema`` for the same reason. The UI
+pages fetch the schema from the precomputed JSON instead of embedding a
+freshly generated copy.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, HttpResponseNotFound
+from django.template.loader import render_to_string
+from django.urls import get_resolver
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from skygate_airport_api.conditional import conditional_response
+
+
+INFO = {
+    "title": "SkyGate Airport API",
+    "default_version": "v1",
+    "description": (
+        "API for SkyGate Airport management system. Any resource can be "
+        "trimmed with `?fields=id,status` and its nested objects, such as "
+        "an order's `tickets_details`, embedded with "
+        "`?expand=tickets_details.flight_details.crew`; nested objects are "
+        "left out unless expanded. Order and ticket lists can instead "
+        "side-load the objects they refer to once per page with "
+        "`?include=flights,crew,routes,airports,airplanes,airplane_types`, "
+        "in an `included` section next to `results`."
+    ),
+    "terms_of_service": "https://www.google.com/policies/terms/",
+    "contact": {"email": "contact@skygate.com"},
+    "license": {"name": "BSD License"},
+}
+
+FORMATS = {
+    ".json": "application/json",
+    ".yaml": "application/yaml",
+}
+
+_loaded = {}
+_lock = threading.Lock()
+_documented = []
+_documented_lock = threading.Lock()
+
+
+class SchemaFile:
+    """One encoded schema held in memory, plain and gzipped."""
+
+    def __init__(self, content, compressed):
+        self.content = content
+        self.compressed = compressed
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+def schema_path(extension):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"openapi{extension}"
+
+
+def lazy_auto_schema(build):
+    """
+    Turn ``build(openapi)``, which returns the keyword arguments of drf_yasg's
+    ``swagger_auto_schema`` given the ``drf_yasg.openapi`` module, into a
+    decorator documenting a view with them.
+
+    The decorator only notes the view. drf_yasg is imported, ``build``
+    called and ``swagger_auto_schema`` applied when the schema is
+    generated.
+    """
+
+    def decorator(view_method):
+        _documented.append((view_method, build))
+        return view_method
+
+    return decorator
+
+
+def apply_auto_schemas():
+    """Apply ``swagger_auto_schema`` to the views noted so far."""
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+
+    # Import every view module, so that all their views are noted.
+    get_resolver().url_patterns
+    with _documented_lock:
+        for view_method, build in _documented:
+            swagger_auto_schema(**build(openapi))(view_method)
+        _documented.clear()
+
+
+def generate():
+    """Return ``{extension: bytes}`` for a freshly generated schema."""
+    from drf_yasg import openapi
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    apply_auto_schemas()
+
+    info = openapi.Info(
+        title=INFO["title"],
+        default_version=INFO["default_version"],
+        description=INFO["description"],
+        terms_of_service=INFO["terms_of_service"],
+        contact=openapi.Contact(**INFO["contact"]),
+        license=openapi.License(**INFO["license"]),
+    )
+    # Serializer defaults such as CurrentUserDefault need a request, but
+    # the schema must not name the host it was generated on.
+    request = Request(APIRequestFactory().get("/"))
+    request.user = AnonymousUser()
+    schema = OpenAPISchemaGenerator(info, url="").get_schema(
+        request=request, public=True
+    )
+    return {
+        ".json": OpenAPICodecJson(validators=[]).encode(schema),
+        ".yaml": OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def write(documents):
+    """
+    Write each document and a gzipped copy next to it.
+
+    Files are written under a temporary name and renamed into place, so a
+    worker never reads a half-written schema even if several generate it
+    at once.
+    """
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for extension, content in documents.items():
+        path = schema_path(extension)
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        for target, data in (
+            (path, content),
+            (Path(f"{path}.gz"), compressed),
+        ):
+            descriptor, temporary = tempfile.mkstemp(dir=directory)
+            with os.fdopen(descriptor, "wb") as handle:
+                handle.write(data)
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, target)
+            written.append(target)
+    return written
+
+
+def load(extension):
+    """The schema in the given format, generating it on first use."""
+    if extension in _loaded:
+        return _loaded[extension]
+    with _lock:
+        if extension not in _loaded:
+            path = schema_path(extension)
+            if not path.exists():
+                write(generate())
+            content = path.read_bytes()
+            compressed_path = Path(f"{path}.gz")
+            compressed = (
+                compressed_path.read_bytes()
+                if compressed_path.exists()
+                else gzip.compress(content, mtime=0)
+            )
+            _loaded[extension] = SchemaFile(content, compressed)
+    return _loaded[extension]
+
+
+def reset():
+    """Forget the schemas loaded by this process."""
+    with _lock:
+        _loaded.clear()
+
+
+@require_safe
+def schema_view(request, format):
+    if format not in FORMATS:
+        return HttpResponseNotFound()
+    schema = load(format)
+
+    def build_response():
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = HttpResponse(
+                schema.compressed, content_type=FORMATS[format]
+            )
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(
+                schema.content, content_type=FORMATS[format]
+            )
+        return response
+
+    response = conditional_response(request, schema.etag, build_response)
+    response["Cache-Control"] = "public, max-age=300"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def ui_view(renderer_name):
+    """A view rendering one of drf_yasg's documentation pages."""
+
+    @require_safe
+    def view(request):
+        from drf_yasg import renderers
+
+        renderer = getattr(renderers, renderer_name)()
+        context = {"request": request}
+        renderer.set_context(context)
+        context["title"] = INFO["title"]
+        context["version"] = INFO["default_version"]
+        return HttpResponse(
+            render_to_string(renderer.template, context, request)
+        )
+
+    return view
+
+
+swagger_ui_view = ui_view("SwaggerUIRenderer")
+redoc_view = ui_view("ReDocRenderer")
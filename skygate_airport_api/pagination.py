@@ -0,0 +1,170 @@
+"""
+Keyset pagination for list endpoints.
+
+Pages are cut with a ``WHERE (ordering fields) > (last row seen)`` filter
+instead of an OFFSET, and no COUNT(*) is run, so fetching page 10,000 costs
+the same as fetching page one as long as an index covers the ordering.
+
+The ordering comes from the view's ``OrderingFilter`` when there is one,
+otherwise from the view's ``ordering`` attribute or the model's default
+ordering. The primary key is always appended as a tie-breaker, which makes
+every position unique even on timestamps shared by many rows.
+"""
+
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = ("pk",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+
+        if reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self.after_position(position, reverse)
+                )
+            except (DjangoValidationError, ValueError, TypeError):
+                # A position that does not fit the ordering fields.
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.first_position = self.last_position = position
+        if self.page:
+            self.first_position = self.get_position(self.page[0])
+            self.last_position = self.get_position(self.page[-1])
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if hasattr(backend, "get_ordering"):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = (
+            ordering
+            or getattr(view, "ordering", None)
+            or queryset.model._meta.ordering
+            or self.ordering
+        )
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        ordering = list(ordering)
+        if not {"pk", "id"} & {field.lstrip("-") for field in ordering}:
+            descending = ordering[-1].startswith("-")
+            ordering.append("-pk" if descending else "pk")
+        return tuple(ordering)
+
+    def after_position(self, position, reverse):
+        """
+        Rows that come after ``position`` in the (possibly reversed)
+        ordering, as ``a > x OR (a = x AND b > y) OR ...``.
+
+        The leading ``a >= x`` is implied by the rest but lets the database
+        start an index range scan right at the position.
+        """
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+
+        first = self.ordering[0]
+        name = first.lstrip("-")
+        lookup = "lte" if first.startswith("-") != reverse else "gte"
+        return Q(**{f"{name}__{lookup}": position[0]}) & condition
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = instance
+            for name in field.lstrip("-").split("__"):
+                if isinstance(value, dict):
+                    value = value[name]
+                else:
+                    value = getattr(value, name)
+            position.append(str(value))
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.last_position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.first_position)
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            reverse, position = json.loads(b64decode(encoded.encode("ascii")))
+            if not isinstance(position, list) or not all(
+                isinstance(value, str) for value in position
+            ):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=bool(reverse), position=position)
+
+    def encode_cursor(self, cursor):
+        encoded = b64encode(
+            json.dumps([int(cursor.reverse), cursor.position]).encode()
+        ).decode("ascii")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith("-") else f"-{field}"
+        for field in ordering
+    )
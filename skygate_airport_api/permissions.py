@@ -32,7 +32,8 @@ class IsAdminUserOrReadOnly(BasePermission):
 class IsTicketOwner(BasePermission):
     """
     Custom permission to only allow owners of a ticket to view or modify it.
-    A user is considered an owner if the ticket is in one of their orders.
+    A user is considered an owner if the ticket is in one of their orders
+    or they placed its seat hold.
     """
 
     def has_object_permission(self, request, view, obj):
@@ -42,6 +43,8 @@ class IsTicketOwner(BasePermission):
 
         if request.user.is_staff:
             return True
+        if obj.held_by_id == request.user.pk:
+            return True
         return obj.orders.filter(user=request.user).exists()
 
     def has_permission(self, request, view):
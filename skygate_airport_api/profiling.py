@@ -0,0 +1,297 @@
+"""
+Per-request profiling.
+
+``ProfilingMiddleware`` times every request and adds its duration to an
+in-process histogram per URL name, such as ``ticket-available-seats`` or
+``order-list``. A ``PROFILING_SAMPLE_RATE`` share of requests is also
+profiled in detail: SQL query count and time, and time spent in
+serializers, which go into ``Server-Timing`` headers and the histograms.
+The ``PROFILING_SLOW_REQUESTS`` slowest sampled requests are kept with
+their SQL so they can be dumped later.
+
+The middleware also feeds the Prometheus request, latency and SQL
+counters in ``skygate_airport_api.metrics`` when ``METRICS_ENABLED`` is
+on. Those need the query count of every request, so every request is then
+run with a query counter, and only sampled ones keep their SQL and
+serializer time. Unsampled requests otherwise only cost two clock reads
+and a histogram update, so the middleware can stay on in production.
+Serializer time is the time
+spent in the ``data`` and ``is_valid`` of serializers passed through
+``profiled``, minus the SQL run inside them. Views that mix in
+``ProfiledViewMixin`` pass every serializer from ``get_serializer``
+through it; other serializers, including those of third-party code, are
+left alone.
+"""
+
+import bisect
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from skygate_airport_api import metrics
+
+
+# Upper bounds of the histogram buckets, in milliseconds.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {}
+_slowest = []
+_sequence = itertools.count()
+_profiled_classes = {}
+
+
+class Profile:
+    """
+    What one request spent its time on. Only a ``detailed`` profile, that
+    of a sampled request, keeps the SQL and serializer time.
+    """
+
+    def __init__(self, detailed=True):
+        self.detailed = detailed
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.queries = []
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - start
+            self.query_count += 1
+            self.query_seconds += seconds
+            if (
+                self.detailed
+                and len(self.queries) < settings.PROFILING_MAX_QUERIES
+            ):
+                self.queries.append((sql, round(seconds * 1000, 3)))
+
+
+class Histogram:
+    """Request durations of one URL name."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.sampled = 0
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.serializer_ms = 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(BUCKETS_MS, self.buckets)
+            },
+            "sampled": self.sampled,
+            "query_count": self.query_count,
+            "query_ms": round(self.query_ms, 3),
+            "serializer_ms": round(self.serializer_ms, 3),
+        }
+
+
+class ProfilingMiddleware:
+    """Time requests and profile a sample of them in detail."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        if sampled or settings.METRICS_ENABLED:
+            profile = Profile(detailed=sampled)
+        else:
+            profile = None
+        start = time.perf_counter()
+        if profile is None:
+            response = self.get_response(request)
+        else:
+            _local.profile = profile
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(profile.execute)
+                        )
+                    response = self.get_response(request)
+            finally:
+                _local.profile = None
+        total_ms = (time.perf_counter() - start) * 1000
+
+        timings = [("total", total_ms, None)]
+        if sampled:
+            query_ms = profile.query_seconds * 1000
+            timings[:0] = [
+                ("db", query_ms, f"{profile.query_count} queries"),
+                ("serializer", profile.serializer_seconds * 1000, None),
+            ]
+        response["Server-Timing"] = ", ".join(
+            server_timing(*timing) for timing in timings
+        )
+
+        match = request.resolver_match
+        record(
+            match.view_name if match else "unresolved",
+            request,
+            response,
+            total_ms,
+            profile,
+        )
+        return response
+
+
+def server_timing(name, milliseconds, description):
+    value = f"{name};dur={milliseconds:.1f}"
+    if description:
+        value += f';desc="{description}"'
+    return value
+
+
+def record(view_name, request, response, total_ms, profile):
+    if settings.METRICS_ENABLED:
+        metrics.store.observe_request(
+            view_name,
+            request.method,
+            response.status_code,
+            total_ms / 1000,
+            (profile.query_count, profile.query_seconds),
+        )
+
+    with _lock:
+        histogram = _histograms.get(view_name)
+        if histogram is None:
+            histogram = _histograms[view_name] = Histogram()
+        histogram.count += 1
+        histogram.total_ms += total_ms
+        histogram.buckets[bisect.bisect_left(BUCKETS_MS, total_ms)] += 1
+        if profile is None or not profile.detailed:
+            return
+
+        histogram.sampled += 1
+        histogram.query_count += profile.query_count
+        histogram.query_ms += profile.query_seconds * 1000
+        histogram.serializer_ms += profile.serializer_seconds * 1000
+
+        entry = (
+            total_ms,
+            next(_sequence),
+            {
+                "view_name": view_name,
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "total_ms": round(total_ms, 3),
+                "query_count": profile.query_count,
+                "query_ms": round(profile.query_seconds * 1000, 3),
+                "serializer_ms": round(profile.serializer_seconds * 1000, 3),
+                "queries": [
+                    {"sql": sql, "ms": ms} for sql, ms in profile.queries
+                ],
+            },
+        )
+        if len(_slowest) < settings.PROFILING_SLOW_REQUESTS:
+            heapq.heappush(_slowest, entry)
+        elif entry > _slowest[0]:
+            heapq.heapreplace(_slowest, entry)
+
+
+def histograms():
+    """``{view name: histogram dict}`` for every URL name seen."""
+    with _lock:
+        return {
+            name: histogram.as_dict()
+            for name, histogram in sorted(_histograms.items())
+        }
+
+
+def slowest_requests():
+    """The slowest sampled requests with their SQL, slowest first."""
+    with _lock:
+        return [entry for _, _, entry in sorted(_slowest, reverse=True)]
+
+
+def reset():
+    """Drop every histogram and slow request recorded by this process."""
+    with _lock:
+        _histograms.clear()
+        _slowest.clear()
+
+
+def timed(method):
+    """Count the time spent in ``method`` as serializer time."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = getattr(_local, "profile", None)
+        if profile is None or not profile.detailed or profile.serializer_depth:
+            # Not sampled, or already inside a timed serializer call.
+            return method(self, *args, **kwargs)
+
+        profile.serializer_depth += 1
+        query_seconds = profile.query_seconds
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profile.serializer_depth -= 1
+            profile.serializer_seconds += (
+                time.perf_counter()
+                - start
+                - (profile.query_seconds - query_seconds)
+            )
+
+    return wrapper
+
+
+def profiled(serializer):
+    """
+    Count the time ``serializer`` spends in ``data`` and ``is_valid`` as
+    serializer time when the current request is sampled.
+
+    The serializer is moved to a subclass of its own class that times
+    those two, created once per class. Outside sampled requests it is
+    returned unchanged.
+    """
+    profile = getattr(_local, "profile", None)
+    if profile is None or not profile.detailed:
+        return serializer
+
+    serializer_class = type(serializer)
+    profiled_class = _profiled_classes.get(serializer_class)
+    if profiled_class is None:
+        profiled_class = type(
+            serializer_class.__name__,
+            (serializer_class,),
+            {
+                "__module__": serializer_class.__module__,
+                "__qualname__": serializer_class.__qualname__,
+                "is_valid": timed(serializer_class.is_valid),
+                "data": property(timed(serializer_class.data.fget)),
+            },
+        )
+        _profiled_classes[serializer_class] = profiled_class
+        # A serializer that is already timed stays as it is.
+        _profiled_classes[profiled_class] = profiled_class
+    serializer.__class__ = profiled_class
+    return serializer
+
+
+class ProfiledViewMixin:
+    """Time the serializers a view gets from ``get_serializer``."""
+
+    def get_serializer(self, *args, **kwargs):
+        return profiled(super().get_serializer(*args, **kwargs))
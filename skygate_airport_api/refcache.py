@@ -0,0 +1,293 @@
+"""
+Process-local cache for reference data.
+
+Airports, routes, airplane types, airplanes and crew change a few times a
+day but are read on almost every request. Each process keeps the field
+values of recently used rows in a size-bounded LRU per model and builds a
+fresh model instance on every lookup, so callers never share or mutate a
+cached object.
+
+Rows are only cached outside transactions, so an uncommitted row that is
+later rolled back never ends up in the cache.
+
+Saving or deleting one of these models drops its entry in this process
+and, once the transaction commits, publishes the change through a broker
+so the other gunicorn workers drop it as well. ``CacheBroker`` is a
+stand-in built on Django's cache: changes are numbered messages that each
+process polls at most every ``REFERENCE_CACHE_POLL_INTERVAL`` seconds. A
+process that falls too far behind, or finds a message already expired,
+clears everything instead.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework import serializers
+
+
+MODELS = (
+    "airports.Airport",
+    "airports.Route",
+    "airplanes.AirplaneType",
+    "airplanes.Airplane",
+    "flights.Crew",
+)
+
+SEQUENCE_KEY = "refcache:sequence"
+MESSAGE_KEY = "refcache:message:{number}"
+
+# More unread messages than this and a process just clears its caches.
+MAX_BACKLOG = 1000
+
+
+class LRUCache:
+    """A size-bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class ReferenceCache:
+    """Field values of one model's rows, keyed by primary key."""
+
+    def __init__(self, model, maxsize):
+        self.model = model
+        self.fields = [field.attname for field in model._meta.concrete_fields]
+        self.pk_index = self.fields.index(model._meta.pk.attname)
+        self.rows = LRUCache(maxsize)
+
+    def key(self, pk):
+        return self.model._meta.pk.to_python(pk)
+
+    def build(self, row):
+        return self.model.from_db(DEFAULT_DB_ALIAS, self.fields, row)
+
+    def get(self, pk):
+        return self.get_many([pk]).get(self.key(pk))
+
+    def get_many(self, pks):
+        """``{pk: instance}`` for the rows that exist, one query for misses."""
+        found = {}
+        missing = []
+        for pk in {self.key(pk) for pk in pks}:
+            row = self.rows.get(pk)
+            if row is None:
+                missing.append(pk)
+            else:
+                found[pk] = row
+
+        if missing:
+            cacheable = not transaction.get_connection().in_atomic_block
+            for row in self.model._default_manager.filter(
+                pk__in=missing
+            ).values_list(*self.fields):
+                pk = row[self.pk_index]
+                found[pk] = row
+                if cacheable:
+                    self.rows.set(pk, row)
+        return {pk: self.build(row) for pk, row in found.items()}
+
+
+class CacheBroker:
+    """Numbered invalidation messages kept in Django's cache."""
+
+    def position(self):
+        return cache.get(SEQUENCE_KEY, 0)
+
+    def publish(self, message):
+        try:
+            number = cache.incr(SEQUENCE_KEY)
+        except ValueError:
+            cache.add(SEQUENCE_KEY, 0, timeout=None)
+            number = cache.incr(SEQUENCE_KEY)
+        cache.set(
+            MESSAGE_KEY.format(number=number),
+            message,
+            settings.REFERENCE_CACHE_MESSAGE_TIMEOUT,
+        )
+
+    def read(self, after):
+        """
+        Return ``(position, messages)`` for the messages published after
+        ``after``, with ``messages`` set to ``None`` when some are lost.
+        """
+        position = self.position()
+        if position == after:
+            return position, []
+        if position < after or position - after > MAX_BACKLOG:
+            # The sequence was reset or we fell too far behind.
+            return position, None
+
+        keys = [
+            MESSAGE_KEY.format(number=number)
+            for number in range(after + 1, position + 1)
+        ]
+        found = cache.get_many(keys)
+        if len(found) < len(keys):
+            return position, None
+        return position, [found[key] for key in keys]
+
+
+class ReferenceData:
+    """The reference caches of one process."""
+
+    def __init__(self, broker=None):
+        self.broker = broker or CacheBroker()
+        self.caches = {}
+        self.lock = threading.Lock()
+        self.cursor = None
+        self.synced_at = 0
+
+    def cache_for(self, model):
+        label = model._meta.label
+        if label not in self.caches:
+            with self.lock:
+                self.caches.setdefault(
+                    label,
+                    ReferenceCache(
+                        apps.get_model(label),
+                        settings.REFERENCE_CACHE_MAX_SIZE,
+                    ),
+                )
+        return self.caches[label]
+
+    def sync(self):
+        """Apply the changes other processes published since the last sync."""
+        now = time.monotonic()
+        if now - self.synced_at < settings.REFERENCE_CACHE_POLL_INTERVAL:
+            return
+        with self.lock:
+            self.synced_at = now
+            if self.cursor is None:
+                # Nothing is cached yet, so earlier changes do not matter.
+                self.cursor = self.broker.position()
+                return
+            self.cursor, messages = self.broker.read(self.cursor)
+        if messages is None:
+            self.clear()
+            return
+        for label, pk in messages:
+            if label in self.caches:
+                self.caches[label].rows.discard(pk)
+
+    def get(self, model, pk):
+        """The instance with primary key ``pk``, or ``None``."""
+        self.sync()
+        return self.cache_for(model).get(pk)
+
+    def get_many(self, model, pks):
+        self.sync()
+        return self.cache_for(model).get_many(pks)
+
+    def discard(self, model, pk):
+        if model._meta.label in self.caches:
+            self.caches[model._meta.label].rows.discard(pk)
+
+    def publish(self, model, pk):
+        self.discard(model, pk)
+        self.broker.publish((model._meta.label, pk))
+
+    def clear(self):
+        for reference_cache in list(self.caches.values()):
+            reference_cache.rows.clear()
+
+    def stats(self):
+        return {
+            label: reference_cache.rows.stats()
+            for label, reference_cache in sorted(self.caches.items())
+        }
+
+
+reference_data = ReferenceData()
+
+
+def get(model, pk):
+    return reference_data.get(model, pk)
+
+
+def get_many(model, pks):
+    return reference_data.get_many(model, pks)
+
+
+def stats():
+    return reference_data.stats()
+
+
+def invalidate_reference_row(sender, instance, **kwargs):
+    pk = instance.pk
+    reference_data.discard(sender, pk)
+    transaction.on_commit(lambda: reference_data.publish(sender, pk))
+
+
+for label in MODELS:
+    post_save.connect(invalidate_reference_row, sender=label)
+    post_delete.connect(invalidate_reference_row, sender=label)
+
+
+class ReferencePrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """A ``PrimaryKeyRelatedField`` resolved through the reference cache."""
+
+    def __init__(self, model=None, **kwargs):
+        self.model = model
+        if not kwargs.get("read_only"):
+            kwargs.setdefault("queryset", model._default_manager.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            instance = get(self.model, data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
@@ -0,0 +1,24 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets views that stream Server-Sent Events accept ``text/event-stream``.
+
+    The views return a ``StreamingHttpResponse``, so this only renders the
+    error responses DRF builds before the stream starts, as one ``error``
+    event.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        payload = json.dumps(data, cls=DjangoJSONEncoder)
+        return f"event: error\ndata: {payload}\n\n".encode(self.charset)
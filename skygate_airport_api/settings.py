@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,9 +52,11 @@ INSTALLED_APPS = [
     "flights",
     "tickets",
     "orders",
+    "skygate_airport_api",
 ]
 
 MIDDLEWARE = [
+    "skygate_airport_api.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -100,6 +103,24 @@ if os.environ.get('DATABASE_URL'):
     DATABASES['default'] = dj_database_url.parse(os.environ.get('DATABASE_URL'))
 
 
+# Cache
+# Seat maps, flight boards, the itinerary graph generation and reference
+# data invalidations are shared between workers through the cache, so a
+# deployment running more than one process needs a shared backend. Set
+# REDIS_URL (as in Docker) to use Redis; without it every process keeps
+# its own in-memory cache, which only suits a single process.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+if os.environ.get("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -153,8 +174,59 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_PAGINATION_CLASS": (
+        "skygate_airport_api.pagination.KeysetPagination"
+    ),
+    "PAGE_SIZE": 50,
 }
 
+# Seat inventory settings
+SEAT_INVENTORY_CACHE_TIMEOUT = 60 * 60
+GROUP_BOOKING_MAX_PASSENGERS = 300
+AVAILABLE_SEATS_BATCH_MAX_FLIGHTS = 100
+SEAT_HOLD_TIMEOUT = 10 * 60
+SEAT_HOLD_SWEEP_BATCH_SIZE = 1000
+
+# Fare settings: a ticket costs FARE_BASE plus FARE_PER_KM of its route
+FARE_BASE = "25.00"
+FARE_PER_KM = "0.08"
+
+# Itinerary search settings
+ITINERARY_MIN_CONNECTION_MINUTES = 45
+ITINERARY_MAX_CONNECTION_HOURS = 24
+ITINERARY_MAX_RESULTS = 20
+ITINERARY_MAX_WINDOW_DAYS = 7
+ITINERARY_GRAPH_MAX_AGE = 15 * 60
+
+# Rebooking settings: passengers of a canceled flight are moved to
+# itineraries departing up to REBOOKING_WINDOW_HOURS around it
+REBOOKING_WINDOW_HOURS = 48
+REBOOKING_MAX_ITINERARIES = 50
+
+# Reference data cache settings
+REFERENCE_CACHE_MAX_SIZE = 10000
+REFERENCE_CACHE_POLL_INTERVAL = 1
+REFERENCE_CACHE_MESSAGE_TIMEOUT = 10 * 60
+
+# Flight board settings
+FLIGHT_BOARD_CACHE_TIMEOUT = 30
+FLIGHT_BOARD_MAX_ROWS = 50
+FLIGHT_BOARD_STREAM_INTERVAL = 2
+FLIGHT_BOARD_STREAM_MAX_SECONDS = 5 * 60
+
+# Request profiling settings
+PROFILING_SAMPLE_RATE = 0.05
+PROFILING_SLOW_REQUESTS = 20
+PROFILING_MAX_QUERIES = 100
+
+# Metrics settings
+METRICS_ENABLED = True
+# Every worker writes its counters here; clear it when the app starts.
+METRICS_DIR = os.environ.get(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "skygate-metrics")
+)
+METRICS_FLUSH_INTERVAL = 1
+
 # Swagger settings
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
@@ -167,7 +239,15 @@ SWAGGER_SETTINGS = {
     },
     "USE_SESSION_AUTH": False,
     "JSON_EDITOR": True,
+    # The UI pages load the precomputed schema instead of generating one.
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
 }
+REDOC_SETTINGS = {
+    "SPEC_URL": ("schema-json", {"format": ".json"}),
+}
+
+# Precomputed OpenAPI schema, written by `manage.py generate_schema`
+OPENAPI_SCHEMA_DIR = BASE_DIR / "openapi"
 
 # JWT settings
 SIMPLE_JWT = {
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Test case mixin for keeping endpoints free of N+1 queries.
+
+    ``assertQueryBudget`` fails when the block runs more queries than
+    allowed, listing every query so the culprit is easy to spot.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context)
+        if executed > budget:
+            queries = "\n".join(
+                f"{number}. {query['sql']}"
+                for number, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f"{executed} queries executed, the budget is {budget}:\n"
+                f"{queries}"
+            )
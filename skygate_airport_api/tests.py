@@ -0,0 +1,428 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework.viewsets import GenericViewSet
+
+from airplanes.models import Airplane, AirplaneType
+from airports.models import Airport, Route
+from flights.models import Crew, Flight
+from orders.models import Order
+from skygate_airport_api import metrics, openapi, profiling
+from skygate_airport_api.compound import CompoundDocumentMixin
+from skygate_airport_api.testing import QueryBudgetMixin
+from tickets.models import Ticket
+
+
+class PrecomputedSchemaTests(TestCase):
+    """Tests for serving the precomputed OpenAPI schema"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(
+            OPENAPI_SCHEMA_DIR=self.directory
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        openapi.reset()
+        self.addCleanup(openapi.reset)
+
+    def test_generate_schema_writes_plain_and_gzipped_files(self):
+        """Test that the command writes every format with a gzipped copy"""
+        call_command("generate_schema", stdout=StringIO())
+        for name in ("openapi.json", "openapi.yaml"):
+            content = (self.directory / name).read_bytes()
+            compressed = (self.directory / f"{name}.gz").read_bytes()
+            self.assertEqual(gzip.decompress(compressed), content)
+
+        schema = json.loads((self.directory / "openapi.json").read_bytes())
+        self.assertIn("/flights/board/{airport_id}/", schema["paths"])
+        self.assertNotIn("host", schema)
+
+    def test_schema_is_served_from_the_written_file(self):
+        """Test that the view serves the file's bytes, gzipped on request"""
+        (self.directory / "openapi.json").write_bytes(b'{"swagger": "2.0"}')
+
+        response = self.client.get(
+            "/swagger.json/", HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(response.content), b'{"swagger": "2.0"}'
+        )
+
+        response = self.client.get(
+            "/swagger.json/", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/swagger.json/")
+        self.assertEqual(response.content, b'{"swagger": "2.0"}')
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_first_request_generates_a_missing_schema(self):
+        """Test that a missing schema is generated once and persisted"""
+        response = self.client.get("/swagger.yaml/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/yaml")
+        self.assertTrue((self.directory / "openapi.json.gz").exists())
+        self.assertEqual(
+            response.content,
+            (self.directory / "openapi.yaml").read_bytes(),
+        )
+
+    def test_loading_the_views_does_not_import_drf_yasg(self):
+        """Test that a worker's views are documented without drf_yasg"""
+        script = (
+            "import sys, django\n"
+            "django.setup()\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns\n"
+            "print([name for name in sys.modules if 'drf_yasg.' in name])"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "skygate_airport_api.settings",
+            },
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_ui_pages_load_the_precomputed_schema(self):
+        """Test that Swagger UI and ReDoc point at the schema file"""
+        for path in ("/swagger/", "/redoc/"):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, "/swagger.json/")
+        self.assertFalse((self.directory / "openapi.json").exists())
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Tests for the request profiling middleware"""
+
+    def setUp(self):
+        profiling.reset()
+        self.addCleanup(profiling.reset)
+        Airport.objects.create(name="Heathrow", closest_big_city="London")
+        self.client = APIClient()
+        self.staff = get_user_model().objects.create_user(
+            username="staff", password="password", is_staff=True
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_requests_report_sql_and_serializer_time(self):
+        """Test that a sampled request gets detailed Server-Timing"""
+        response = self.client.get("/api/airports/")
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="1 queries"')
+        self.assertRegex(timing, r"serializer;dur=[\d.]+")
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+
+        histogram = profiling.histograms()["airport-list"]
+        self.assertEqual(histogram["count"], 1)
+        self.assertEqual(histogram["sampled"], 1)
+        self.assertEqual(histogram["query_count"], 1)
+        self.assertEqual(sum(histogram["buckets"].values()), 1)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_view_serializers_are_timed_without_patching_drf(self):
+        """Test that serializer time comes from the views' serializers"""
+        self.client.get("/api/airports/")
+        histogram = profiling.histograms()["airport-list"]
+        self.assertGreater(histogram["serializer_ms"], 0)
+        self.assertFalse(
+            hasattr(serializers.BaseSerializer.data.fget, "__wrapped__")
+        )
+        self.assertFalse(
+            hasattr(serializers.BaseSerializer.is_valid, "__wrapped__")
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_only_timed(self):
+        """Test that unsampled requests only record their total time"""
+        response = self.client.get("/api/airports/")
+        self.assertRegex(response["Server-Timing"], r"^total;dur=[\d.]+$")
+        histogram = profiling.histograms()["airport-list"]
+        self.assertEqual(histogram["count"], 1)
+        self.assertEqual(histogram["sampled"], 0)
+        self.assertEqual(profiling.slowest_requests(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_REQUESTS=2)
+    def test_slowest_requests_are_dumped_with_their_sql(self):
+        """Test that staff can read the slowest requests and their SQL"""
+        for _ in range(3):
+            self.client.get("/api/airports/")
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get("/api/profiling/")
+        self.assertEqual(response.status_code, 200)
+
+        slowest = response.data["slowest"]
+        self.assertEqual(len(slowest), 2)
+        self.assertGreaterEqual(slowest[0]["total_ms"], slowest[1]["total_ms"])
+        self.assertEqual(slowest[0]["view_name"], "airport-list")
+        self.assertIn("airports_airport", slowest[0]["queries"][0]["sql"])
+
+        response = self.client.delete("/api/profiling/")
+        self.assertEqual(response.status_code, 204)
+        # Only the DELETE itself was recorded after the reset.
+        self.assertEqual(
+            [entry["view_name"] for entry in profiling.slowest_requests()],
+            ["profiling"],
+        )
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get("/api/profiling/")
+        self.assertEqual(response.status_code, 401)
+
+
+class MetricsTests(TestCase):
+    """Tests for the Prometheus metrics endpoint"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        metrics.store.start()
+        Airport.objects.create(name="Heathrow", closest_big_city="London")
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_requests_are_exposed_per_url_name(self):
+        """Test that request counts, latency and SQL are exposed"""
+        profiling.reset()
+        self.client.get("/api/airports/")
+        self.client.get("/api/airports/")
+        # Unsampled requests are counted without being profiled in detail.
+        self.assertEqual(profiling.histograms()["airport-list"]["sampled"], 0)
+        body = self.client.get("/metrics").content.decode()
+
+        self.assertIn(
+            "# TYPE skygate_http_request_duration_seconds histogram", body
+        )
+        self.assertIn(
+            'skygate_http_requests_total{view="airport-list",method="GET",'
+            'status="200"} 2',
+            body,
+        )
+        self.assertIn(
+            'skygate_http_request_duration_seconds_bucket{view="airport-list",'
+            'method="GET",le="+Inf"} 2',
+            body,
+        )
+        self.assertIn('skygate_db_queries_total{view="airport-list"} 2', body)
+
+    def test_counters_are_summed_across_workers(self):
+        """Test that every worker's flushed counters are added up"""
+        other_worker = metrics.MetricsStore()
+        other_worker.inc(
+            "skygate_bookings_total",
+            (("serializer", "order"), ("outcome", "conflict")),
+            3,
+        )
+        other_worker.flush()
+        metrics.count_booking("order", "conflict")
+
+        totals = metrics.collect()
+        self.assertEqual(len(list(self.directory.glob("*.json"))), 2)
+        self.assertEqual(
+            totals[
+                "skygate_bookings_total",
+                (("serializer", "order"), ("outcome", "conflict")),
+            ],
+            4,
+        )
+
+
+def create_orders(user):
+    """Five single-ticket orders on one crewed flight."""
+    source = Airport.objects.create(name="OSL", closest_big_city="Oslo")
+    destination = Airport.objects.create(name="BGO", closest_big_city="Bergen")
+    airplane = Airplane.objects.create(
+        name="SG-1",
+        airplane_type=AirplaneType.objects.create(
+            name="ATR 72", rows=10, seats_in_row=4
+        ),
+    )
+    departure = timezone.now() + timedelta(days=1)
+    flight = Flight.objects.create(
+        flight_number="SG10",
+        departure_time=departure,
+        arrival_time=departure + timedelta(hours=1),
+        route=Route.objects.create(
+            source=source, destination=destination, distance=300
+        ),
+        airplane=airplane,
+    )
+    flight.crew.add(
+        Crew.objects.create(first_name="Ida", last_name="Berg", role="Pilot")
+    )
+    for number in range(5):
+        order = Order.objects.create(user=user, total_price=Decimal("49.00"))
+        order.tickets.add(
+            Ticket.objects.create(
+                flight=flight,
+                passenger_name=f"Passenger {number}",
+                row=number + 1,
+                seat="A",
+            )
+        )
+    return flight
+
+
+class FieldsetTests(QueryBudgetMixin, TestCase):
+    """Tests for ?fields= and ?expand="""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="fieldsets", password="secret"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        create_orders(self.user)
+
+    def test_nested_objects_are_left_out_unless_expanded(self):
+        """Test that orders list ticket ids only by default"""
+        with self.assertQueryBudget(2):
+            response = self.client.get("/api/orders/")
+        order = response.data["results"][0]
+        self.assertEqual(len(order["tickets"]), 1)
+        self.assertNotIn("tickets_details", order)
+
+        with self.assertQueryBudget(4):
+            response = self.client.get(
+                "/api/orders/", {"expand": "tickets_details.flight_details"}
+            )
+        flight = response.data["results"][0]["tickets_details"][0][
+            "flight_details"
+        ]
+        self.assertEqual(flight["flight_number"], "SG10")
+        self.assertNotIn("crew", flight)
+
+    def test_sparse_fieldsets_skip_unused_relations(self):
+        """Test that only the requested fields are serialised and loaded"""
+        with self.assertQueryBudget(1):
+            response = self.client.get(
+                "/api/orders/", {"fields": "id,status,total_price"}
+            )
+        self.assertEqual(
+            set(response.data["results"][0]), {"id", "status", "total_price"}
+        )
+
+        response = self.client.get(
+            "/api/orders/",
+            {
+                "fields": "id,tickets_details.seat_code,"
+                "tickets_details.flight_details.crew"
+            },
+        )
+        ticket = response.data["results"][0]["tickets_details"][0]
+        self.assertEqual(set(ticket), {"seat_code", "flight_details"})
+        self.assertEqual(
+            ticket["flight_details"]["crew"][0]["first_name"], "Ida"
+        )
+        self.assertEqual(set(ticket["flight_details"]), {"crew"})
+
+    def test_schema_documents_expandable_fields(self):
+        """Test that the API schema shows every expandable field"""
+        schema = json.loads(openapi.generate()[".json"])
+        definitions = schema["definitions"]
+        self.assertIn("tickets_details", definitions["Order"]["properties"])
+        self.assertIn("crew", definitions["Flight"]["properties"])
+
+
+class CompoundDocumentTests(QueryBudgetMixin, TestCase):
+    """Tests for ?include= side-loading"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="compound", password="secret"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.flight = create_orders(self.user)
+
+    def test_orders_side_load_each_flight_once(self):
+        """Test that a flight shared by many tickets is included once"""
+        # Orders, tickets, flights and crew, plus one query per reference
+        # type, as nothing is cached inside the test's transaction.
+        with self.assertQueryBudget(8):
+            response = self.client.get(
+                "/api/orders/",
+                {
+                    "expand": "tickets_details",
+                    "include": "flights,crew,routes,airports,airplanes,"
+                    "airplane_types",
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 5)
+        for order in response.data["results"]:
+            ticket = order["tickets_details"][0]
+            self.assertEqual(ticket["flight"], self.flight.id)
+            self.assertNotIn("flight_details", ticket)
+
+        included = response.data["included"]
+        self.assertEqual(
+            [flight["id"] for flight in included["flights"]],
+            [self.flight.id],
+        )
+        flight = included["flights"][0]
+        self.assertEqual(flight["crew"], [included["crew"][0]["id"]])
+        self.assertEqual(flight["route"], included["routes"][0]["id"])
+        self.assertEqual(flight["airplane"], included["airplanes"][0]["id"])
+        self.assertEqual(
+            {airport["name"] for airport in included["airports"]},
+            {"OSL", "BGO"},
+        )
+        self.assertEqual(included["airplane_types"][0]["name"], "ATR 72")
+
+    def test_tickets_include_only_the_named_types(self):
+        """Test that types reached on the way but not named are left out"""
+        response = self.client.get(
+            "/api/tickets/", {"include": "airports,airplane_types"}
+        )
+        self.assertEqual(
+            set(response.data["included"]), {"airports", "airplane_types"}
+        )
+        self.assertEqual(len(response.data["included"]["airports"]), 2)
+
+        response = self.client.get("/api/tickets/")
+        self.assertNotIn("included", response.data)
+
+    def test_unknown_type_is_rejected(self):
+        """Test that an unknown include type is a validation error"""
+        response = self.client.get("/api/orders/", {"include": "pilots"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("include", response.data)
+
+    def test_views_must_name_their_flights(self):
+        """Test that a view without get_flight_ids cannot be defined"""
+        with self.assertRaises(TypeError):
+
+            class View(CompoundDocumentMixin, GenericViewSet):
+                pass
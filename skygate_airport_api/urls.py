@@ -10,21 +10,20 @@ from django.urls import include, path, re_path
 from django.views.generic import RedirectView
 
 from rest_framework.routers import DefaultRouter
-from rest_framework import permissions
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
 )
 
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
 from .schemas import (
     token_obtain_pair_schema,
     token_refresh_schema,
     token_verify_schema,
 )
+from .metrics import metrics_view
+from .openapi import redoc_view, schema_view, swagger_ui_view
+from .views import ReferenceCacheStatsView, SlowRequestsView
 
 from airports.views import AirportViewSet, RouteViewSet
 from airplanes.views import AirplaneViewSet, AirplaneTypeViewSet
@@ -34,21 +33,6 @@ from tickets.views import TicketViewSet
 from orders.views import OrderViewSet
 
 
-# Swagger / ReDoc schema
-schema_view = get_schema_view(
-    openapi.Info(
-        title="SkyGate Airport API",
-        default_version="v1",
-        description="API for SkyGate Airport management system",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@skygate.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
-
 # Router registration
 api_router = DefaultRouter()
 api_router.register(
@@ -162,19 +146,34 @@ urlpatterns = [
         "api/orders/",
         include("orders.urls"),
     ),
+    path(
+        "api/reference-cache/",
+        ReferenceCacheStatsView.as_view(),
+        name="reference_cache_stats",
+    ),
+    path(
+        "api/profiling/",
+        SlowRequestsView.as_view(),
+        name="profiling",
+    ),
+    path(
+        "metrics",
+        metrics_view,
+        name="metrics",
+    ),
     path(
         "swagger<format>/",
-        schema_view.without_ui(cache_timeout=0),
+        schema_view,
         name="schema-json",
     ),
     path(
         "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        swagger_ui_view,
         name="schema-swagger-ui",
     ),
     path(
         "redoc/",
-        schema_view.with_ui("redoc", cache_timeout=0),
+        redoc_view,
         name="schema-redoc",
     ),
 ]
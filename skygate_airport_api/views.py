@@ -0,0 +1,36 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from skygate_airport_api import profiling, refcache
+
+
+class ReferenceCacheStatsView(APIView):
+    """Hit, miss and eviction counters of this process's reference cache."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(refcache.stats())
+
+
+class SlowRequestsView(APIView):
+    """
+    The slowest sampled requests of this process with their SQL, and the
+    request time histograms per URL name.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(
+            {
+                "slowest": profiling.slowest_requests(),
+                "histograms": profiling.histograms(),
+            }
+        )
+
+    def delete(self, request):
+        profiling.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
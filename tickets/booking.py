@@ -0,0 +1,117 @@
+"""
+Group booking: many passengers on one flight in a single transaction.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from tickets import counters, inventory
+from tickets.inventory import SeatMap
+from tickets.models import Ticket
+
+
+BULK_BOOKING_ATTEMPTS = 3
+
+
+class GroupBookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = (
+        "Seats on this flight kept changing while the group was being "
+        "booked. Please retry."
+    )
+    default_code = "group_booking_conflict"
+
+
+def check_passengers(flight, seat_map, passengers):
+    """
+    Validate every passenger's seat against one seat map snapshot.
+
+    Returns one result dict per passenger, in input order. Seats requested
+    twice within the group are rejected after their first occurrence.
+    """
+    airplane_type = flight.airplane.airplane_type
+    claimed = set()
+    results = []
+
+    for index, passenger in enumerate(passengers):
+        row, seat = passenger["row"], passenger["seat"].upper()
+        result = {
+            "index": index,
+            "passenger_name": passenger["passenger_name"],
+            "seat_code": f"{row}{seat}",
+        }
+        try:
+            Ticket.validate_seat_position(airplane_type, row, seat)
+        except ValidationError as error:
+            result.update(status="rejected", errors=error.message_dict)
+        else:
+            if seat_map.is_taken(row, seat) or (row, seat) in claimed:
+                result.update(
+                    status="rejected",
+                    errors={
+                        "seat": [
+                            f"Seat {row}{seat} is already booked on this "
+                            "flight."
+                        ]
+                    },
+                )
+            else:
+                claimed.add((row, seat))
+                result["status"] = "booked"
+        results.append(result)
+
+    return results
+
+
+def book_group(flight, passengers, partial=False):
+    """
+    Book ``passengers`` on ``flight`` with a single ``bulk_create``.
+
+    ``passengers`` is a list of dicts with ``passenger_name``, ``row`` and
+    ``seat``. Unless ``partial`` is set, nothing is booked when any seat is
+    rejected. ``flight`` should come with ``airplane__airplane_type``
+    selected.
+
+    Returns ``(results, tickets)``: a result dict per passenger and the
+    created tickets. A concurrent booking that takes one of the seats between
+    the snapshot and the insert causes a retry against a fresh snapshot.
+    """
+    for _ in range(BULK_BOOKING_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _book_group_once(flight, passengers, partial)
+        except IntegrityError:
+            continue
+
+    raise GroupBookingConflict()
+
+
+def _book_group_once(flight, passengers, partial):
+    seat_map = SeatMap.for_flight(flight)
+    results = check_passengers(flight, seat_map, passengers)
+    accepted = [result for result in results if result["status"] == "booked"]
+    if len(accepted) < len(results) and not partial:
+        for result in accepted:
+            result["status"] = "not_booked"
+        return results, []
+
+    tickets = Ticket.objects.bulk_create(
+        [
+            Ticket(
+                flight=flight,
+                passenger_name=passengers[result["index"]]["passenger_name"],
+                row=passengers[result["index"]]["row"],
+                seat=passengers[result["index"]]["seat"].upper(),
+            )
+            for result in accepted
+        ]
+    )
+
+    for result, ticket in zip(accepted, tickets):
+        result["ticket_id"] = ticket.id
+    changes = [(None, ticket.seat_state) for ticket in tickets]
+    counters.apply_counter_changes(changes)
+    transaction.on_commit(lambda: inventory.apply_ticket_changes(changes))
+    return results, tickets
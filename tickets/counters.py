@@ -0,0 +1,95 @@
+"""
+Seat counters denormalized onto Flight.
+
+Ticket changes are turned into per-flight deltas and applied with ``F()``
+updates in the caller's transaction, so the counters commit or roll back
+together with the tickets themselves.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, F, Q
+
+from flights.models import Flight
+from tickets.models import Ticket
+
+
+COUNTER_FIELDS = {
+    "booked": "booked_seats",
+    "checked_in": "checked_in_seats",
+    "held": "held_seats",
+}
+
+
+def changed_flights(changes):
+    """Ids of the flights whose seats are affected by ``(old, new)`` changes."""
+    flight_ids = set()
+    for old, new in changes:
+        if old != new:
+            flight_ids.update(
+                state[0] for state in (old, new) if state is not None
+            )
+    return flight_ids
+
+
+def apply_counter_changes(changes):
+    """
+    Update flight counters for ``(old, new)`` ticket state changes.
+
+    States are ``(flight_id, row, seat, status)`` tuples as produced by
+    ``Ticket.seat_state``, or ``None`` for a created or deleted ticket.
+    Every affected flight has its ``version`` bumped once. Flights whose
+    counters move by the same amounts share a single UPDATE, so releasing
+    one seat on each of a thousand flights is still one query.
+    """
+    deltas = {
+        flight_id: defaultdict(int) for flight_id in changed_flights(changes)
+    }
+    for old, new in changes:
+        if old == new:
+            continue
+        if old is not None and old[3] in COUNTER_FIELDS:
+            deltas[old[0]][COUNTER_FIELDS[old[3]]] -= 1
+        if new is not None and new[3] in COUNTER_FIELDS:
+            deltas[new[0]][COUNTER_FIELDS[new[3]]] += 1
+
+    groups = defaultdict(list)
+    for flight_id, fields in deltas.items():
+        key = tuple(sorted((f, delta) for f, delta in fields.items() if delta))
+        groups[key].append(flight_id)
+
+    for key, flight_ids in groups.items():
+        updates = {field: F(field) + delta for field, delta in key}
+        Flight.objects.filter(pk__in=flight_ids).update(
+            version=F("version") + 1, **updates
+        )
+
+
+def actual_counters(flights):
+    """
+    Annotate ``flights`` with counters computed from their tickets.
+
+    Adds ``actual_capacity``, ``actual_booked_seats`` and
+    ``actual_checked_in_seats`` in a single grouped query.
+    """
+    return flights.annotate(
+        actual_capacity=F("airplane__airplane_type__rows")
+        * F("airplane__airplane_type__seats_in_row"),
+        **{
+            f"actual_{field}": Count(
+                "tickets", filter=Q(tickets__status=status)
+            )
+            for status, field in COUNTER_FIELDS.items()
+        },
+    )
+
+
+def recount(flight_ids):
+    """Recompute the counters of the given flights from their tickets."""
+    flights = list(actual_counters(Flight.objects.filter(pk__in=flight_ids)))
+    for flight in flights:
+        flight.capacity = flight.actual_capacity
+        for field in COUNTER_FIELDS.values():
+            setattr(flight, field, getattr(flight, f"actual_{field}"))
+    Flight.objects.bulk_update(flights, ["capacity", *COUNTER_FIELDS.values()])
+    Flight.objects.filter(pk__in=flight_ids).update(version=F("version") + 1)
@@ -0,0 +1,23 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class SeatUnavailable(APIException):
+    """
+    Raised when a seat is claimed by another booking first.
+
+    The response carries up to a handful of free seats close to the one
+    that was requested, so the client can retry without a second round trip.
+    """
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The requested seat is no longer available."
+    default_code = "seat_unavailable"
+
+    def __init__(self, row, seat, alternatives=()):
+        super().__init__(
+            {
+                "seat": f"Seat {row}{seat} is already booked on this flight.",
+                "alternatives": [f"{r}{s}" for r, s in alternatives],
+            }
+        )
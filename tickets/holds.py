@@ -0,0 +1,101 @@
+"""
+Short-lived seat holds.
+
+A hold is a ticket in the ``held`` state with a ``hold_expires_at``
+timestamp. It takes its seat like a booking does, so the seat cannot be sold
+to anyone else during checkout. Confirming the hold turns it into a booking;
+otherwise the sweeper moves it to ``expired`` once its time is up, which
+frees the seat again.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from tickets import counters, inventory
+from tickets.models import Ticket
+
+
+class HoldExpired(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The seat hold has expired. Please hold the seat again."
+    default_code = "hold_expired"
+
+
+def hold_expiry(now=None):
+    """Expiry timestamp for a hold placed at ``now``."""
+    now = now or timezone.now()
+    return now + timedelta(seconds=settings.SEAT_HOLD_TIMEOUT)
+
+
+def confirm_hold(ticket):
+    """
+    Turn a held ticket into a booking.
+
+    The ticket row is locked so the sweeper cannot expire it at the same
+    time. Confirming a booked ticket again returns it unchanged. Raises
+    ``HoldExpired`` if the hold has run out, whether or not the sweeper has
+    released it yet, or the ticket is no longer held for any other reason.
+    """
+    with transaction.atomic():
+        ticket = Ticket.objects.select_for_update().get(pk=ticket.pk)
+        if ticket.status == "booked":
+            return ticket
+        if ticket.status != "held" or ticket.hold_expires_at <= timezone.now():
+            raise HoldExpired()
+        ticket.status = "booked"
+        ticket.hold_expires_at = None
+        ticket.save(update_fields=["status", "hold_expires_at"])
+    return ticket
+
+
+def release_expired_holds(now=None, batch_size=None, flight_ids=None):
+    """
+    Move holds that expired by ``now`` to the ``expired`` state.
+
+    Holds are picked in batches of ``batch_size`` through the partial index
+    on ``hold_expires_at``, and each batch is released with a single UPDATE
+    plus one counter UPDATE per affected flight. Pass ``flight_ids`` to
+    limit the sweep to some flights. Returns the number of released holds.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.SEAT_HOLD_SWEEP_BATCH_SIZE
+    expired = Ticket.objects.filter(status="held", hold_expires_at__lte=now)
+    if flight_ids is not None:
+        expired = expired.filter(flight_id__in=flight_ids)
+
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                expired.select_for_update(skip_locked=True)
+                .order_by("hold_expires_at")
+                .values_list("pk", "flight_id", "row", "seat")[:batch_size]
+            )
+            if not batch:
+                break
+
+            Ticket.objects.filter(pk__in=[hold[0] for hold in batch]).update(
+                status="expired", hold_expires_at=None
+            )
+            changes = [
+                (
+                    (flight_id, row, seat, "held"),
+                    (flight_id, row, seat, "expired"),
+                )
+                for _, flight_id, row, seat in batch
+            ]
+            counters.apply_counter_changes(changes)
+            transaction.on_commit(
+                lambda changes=changes: inventory.apply_ticket_changes(changes)
+            )
+
+        released += len(batch)
+        if len(batch) < batch_size:
+            break
+
+    return released
@@ -0,0 +1,385 @@
+"""
+Per-flight seat inventory kept as a compact bitmap.
+
+Each flight's seat map holds one bit per seat of its airplane type, set when
+the seat is taken by an active ticket. Maps are stored in the Django cache
+and patched in place whenever a ticket is created, changed or deleted, so
+reading seat availability does not need to scan the flight's tickets.
+
+Every map records the ``Flight.version`` it was built for. Ticket changes
+bump that version in the database and on the cached map alike, so a map
+that missed a change made by another process no longer matches its flight
+and is rebuilt on the next read.
+"""
+
+import string
+
+from django.conf import settings
+from django.core.cache import cache
+
+from tickets.counters import changed_flights
+from tickets.models import ACTIVE_TICKET_STATUSES, Ticket
+from skygate_airport_api import metrics
+
+
+SEAT_LETTERS = string.ascii_uppercase
+
+CACHE_KEY = "seat-inventory:{flight_id}"
+
+
+class SeatMap:
+    """
+    Bitmap of taken seats for a single flight.
+
+    Seats are numbered row by row, so seat ``B`` in row ``3`` of a six-abreast
+    airplane is bit ``(3 - 1) * 6 + 1``.
+
+    Alongside the bits the map keeps a free-run index: for every row, the
+    ``(first_column, length)`` of each stretch of adjacent free seats. Only
+    the touched row is rescanned when a seat is taken or released.
+    """
+
+    __slots__ = (
+        "flight_id",
+        "rows",
+        "seats_in_row",
+        "bits",
+        "runs",
+        "version",
+    )
+
+    def __init__(self, flight_id, rows, seats_in_row, bits=None, version=0):
+        self.flight_id = flight_id
+        self.version = version
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        size = (rows * seats_in_row + 7) // 8
+        self.bits = bytearray(bits) if bits is not None else bytearray(size)
+        self.runs = [self._scan_row(row) for row in range(1, rows + 1)]
+
+    @classmethod
+    def for_flight(cls, flight):
+        """Build the seat map of a flight from its active tickets."""
+        return cls.for_flights([flight])[flight.id]
+
+    @classmethod
+    def for_flights(cls, flights):
+        """
+        Build seat maps for many flights with a single ticket query.
+
+        Returns a dict keyed by flight id.
+        """
+        seat_maps = {}
+        for flight in flights:
+            airplane_type = flight.airplane.airplane_type
+            seat_maps[flight.id] = cls(
+                flight.id,
+                airplane_type.rows,
+                airplane_type.seats_in_row,
+                version=flight.version,
+            )
+
+        taken = Ticket.objects.filter(
+            flight_id__in=seat_maps, status__in=ACTIVE_TICKET_STATUSES
+        ).values_list("flight_id", "row", "seat")
+        for flight_id, row, seat in taken:
+            seat_map = seat_maps[flight_id]
+            position = seat_map.index(row, seat)
+            if position is not None:
+                seat_map.bits[position >> 3] |= 1 << (position & 7)
+
+        for seat_map in seat_maps.values():
+            seat_map.runs = [
+                seat_map._scan_row(row) for row in range(1, seat_map.rows + 1)
+            ]
+        return seat_maps
+
+    @property
+    def seat_letters(self):
+        return SEAT_LETTERS[: self.seats_in_row]
+
+    @property
+    def total_seats(self):
+        return self.rows * self.seats_in_row
+
+    @property
+    def taken_count(self):
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    @property
+    def free_count(self):
+        return self.total_seats - self.taken_count
+
+    def matches(self, flight):
+        """Whether the map is current for ``flight`` and its layout."""
+        airplane_type = flight.airplane.airplane_type
+        return (
+            self.version == flight.version
+            and self.rows == airplane_type.rows
+            and self.seats_in_row == airplane_type.seats_in_row
+        )
+
+    def index(self, row, seat):
+        """Bit position of a seat, or ``None`` if it is not on the airplane."""
+        column = self.seat_letters.find(str(seat).upper())
+        if column < 0 or not 1 <= row <= self.rows:
+            return None
+        return (row - 1) * self.seats_in_row + column
+
+    def is_taken(self, row, seat):
+        position = self.index(row, seat)
+        if position is None:
+            return False
+        return bool(self.bits[position >> 3] & (1 << (position & 7)))
+
+    def take(self, row, seat):
+        position = self.index(row, seat)
+        if position is not None:
+            self.bits[position >> 3] |= 1 << (position & 7)
+            self.runs[row - 1] = self._scan_row(row)
+
+    def release(self, row, seat):
+        position = self.index(row, seat)
+        if position is not None:
+            self.bits[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+            self.runs[row - 1] = self._scan_row(row)
+
+    def _scan_row(self, row):
+        runs = []
+        start = None
+        base = (row - 1) * self.seats_in_row
+        for column in range(self.seats_in_row):
+            position = base + column
+            if self.bits[position >> 3] & (1 << (position & 7)):
+                if start is not None:
+                    runs.append((start, column - start))
+                    start = None
+            elif start is None:
+                start = column
+        if start is not None:
+            runs.append((start, self.seats_in_row - start))
+        return tuple(runs)
+
+    def find_block(self, count):
+        """
+        Return ``count`` seats sitting together as ``(row, seat)`` pairs.
+
+        A single run in one row is preferred, using the shortest run that
+        fits so longer runs stay free for larger groups. Otherwise the seats
+        come from the smallest rectangle of adjacent rows and columns that
+        holds enough free seats. Returns ``None`` if the flight does not have
+        ``count`` free seats.
+        """
+        if count < 1 or count > self.free_count:
+            return None
+
+        best = None
+        for row, runs in enumerate(self.runs, start=1):
+            for start, length in runs:
+                if length >= count and (best is None or length < best[0]):
+                    best = (length, row, start)
+        if best is not None:
+            _, row, start = best
+            return [
+                (row, seat)
+                for seat in self.seat_letters[start : start + count]
+            ]
+
+        return self._find_rectangle(count)
+
+    def _find_rectangle(self, count):
+        seats_in_row = self.seats_in_row
+        free_columns = [[0] * seats_in_row for _ in range(self.rows)]
+        for row, runs in enumerate(self.runs):
+            for start, length in runs:
+                for column in range(start, start + length):
+                    free_columns[row][column] = 1
+
+        best = None
+        for span in range(1, self.rows + 1):
+            if best is not None and span >= best[0]:
+                # Even a single-column block this tall is no smaller.
+                break
+            totals = [0] * seats_in_row
+            for row in range(span):
+                for column, free in enumerate(free_columns[row]):
+                    totals[column] += free
+
+            for first_row in range(self.rows - span + 1):
+                if first_row:
+                    leaving = free_columns[first_row - 1]
+                    entering = free_columns[first_row + span - 1]
+                    for column in range(seats_in_row):
+                        totals[column] += entering[column] - leaving[column]
+
+                # Narrowest column window over these rows with enough seats.
+                first_column = 0
+                free = 0
+                for last_column in range(seats_in_row):
+                    free += totals[last_column]
+                    while free - totals[first_column] >= count:
+                        free -= totals[first_column]
+                        first_column += 1
+                    if free >= count:
+                        width = last_column - first_column + 1
+                        candidate = (
+                            span * width,
+                            span,
+                            first_row,
+                            first_column,
+                            width,
+                        )
+                        if best is None or candidate < best:
+                            best = candidate
+
+        _, span, first_row, first_column, width = best
+        letters = self.seat_letters
+        block = []
+        for row in range(first_row, first_row + span):
+            for column in range(first_column, first_column + width):
+                if free_columns[row][column] and len(block) < count:
+                    block.append((row + 1, letters[column]))
+        return block
+
+    def nearest_free(self, row, seat, limit=5):
+        """
+        Return up to ``limit`` free seats closest to ``(row, seat)``.
+
+        Distance favours staying in the same row: moving one row costs as
+        much as moving across the whole row.
+        """
+        column = max(self.seat_letters.find(str(seat).upper()), 0)
+        letters = self.seat_letters
+        candidates = sorted(
+            self.iter_free(),
+            key=lambda free: (
+                abs(free[0] - row) * self.seats_in_row
+                + abs(letters.index(free[1]) - column)
+            ),
+        )
+        return candidates[:limit]
+
+    def free_bitstrings(self):
+        """One string per row with ``1`` for a free seat and ``0`` if taken."""
+        strings = []
+        for runs in self.runs:
+            row = ["0"] * self.seats_in_row
+            for start, length in runs:
+                row[start : start + length] = "1" * length
+            strings.append("".join(row))
+        return strings
+
+    def free_ranges(self):
+        """
+        Free seats of each row as letter ranges, e.g. ``["A-C", "F"]``.
+        """
+        letters = self.seat_letters
+        return [
+            [
+                (
+                    letters[start]
+                    if length == 1
+                    else f"{letters[start]}-{letters[start + length - 1]}"
+                )
+                for start, length in runs
+            ]
+            for runs in self.runs
+        ]
+
+    def iter_free(self):
+        """Yield ``(row, seat)`` for every free seat in row-major order."""
+        letters = self.seat_letters
+        bits = self.bits
+        position = 0
+        for row in range(1, self.rows + 1):
+            for seat in letters:
+                if not bits[position >> 3] & (1 << (position & 7)):
+                    yield row, seat
+                position += 1
+
+
+def get_seat_map(flight):
+    """
+    Return the cached seat map of ``flight``, building it on a cache miss.
+
+    ``flight`` should come with ``airplane__airplane_type`` selected, since
+    its version and layout are checked against the cached map on every read.
+    """
+    return get_seat_maps([flight])[flight.id]
+
+
+def get_seat_maps(flights):
+    """
+    Return the seat maps of ``flights`` as a dict keyed by flight id.
+
+    Cached maps are read with one ``get_many``; all missing or stale maps
+    are rebuilt together with a single ticket query.
+    """
+    keys = {
+        CACHE_KEY.format(flight_id=flight.id): flight for flight in flights
+    }
+    cached = cache.get_many(keys)
+
+    seat_maps = {}
+    stale = []
+    for key, flight in keys.items():
+        seat_map = cached.get(key)
+        if seat_map is None or not seat_map.matches(flight):
+            stale.append(flight)
+        else:
+            seat_maps[flight.id] = seat_map
+    metrics.count_cache("seat_map", hits=len(seat_maps), misses=len(stale))
+
+    if stale:
+        built = SeatMap.for_flights(stale)
+        cache.set_many(
+            {
+                CACHE_KEY.format(flight_id=flight_id): seat_map
+                for flight_id, seat_map in built.items()
+            },
+            settings.SEAT_INVENTORY_CACHE_TIMEOUT,
+        )
+        seat_maps.update(built)
+    return seat_maps
+
+
+def invalidate(flight_id):
+    cache.delete(CACHE_KEY.format(flight_id=flight_id))
+
+
+def apply_ticket_change(old, new):
+    """
+    Patch cached seat maps for a ticket going from ``old`` to ``new``.
+
+    Both arguments are ``(flight_id, row, seat, status)`` tuples, or ``None``
+    for a ticket that is being created or deleted. Maps that are not cached
+    are left alone; they are rebuilt on the next read.
+    """
+    apply_ticket_changes([(old, new)])
+
+
+def apply_ticket_changes(changes):
+    """
+    Patch cached seat maps for many ``(old, new)`` ticket changes at once.
+
+    Each affected flight's map is read and written back only once, and its
+    version is bumped once to follow ``counters.apply_counter_changes``.
+    """
+    operations = {flight_id: [] for flight_id in changed_flights(changes)}
+    for old, new in changes:
+        if old == new:
+            continue
+        if old is not None and old[3] in ACTIVE_TICKET_STATUSES:
+            operations[old[0]].append((SeatMap.release, old[1], old[2]))
+        if new is not None and new[3] in ACTIVE_TICKET_STATUSES:
+            operations[new[0]].append((SeatMap.take, new[1], new[2]))
+
+    for flight_id, flight_operations in operations.items():
+        key = CACHE_KEY.format(flight_id=flight_id)
+        seat_map = cache.get(key)
+        if seat_map is None:
+            continue
+        for operation, row, seat in flight_operations:
+            operation(seat_map, row, seat)
+        seat_map.version += 1
+        cache.set(key, seat_map, settings.SEAT_INVENTORY_CACHE_TIMEOUT)
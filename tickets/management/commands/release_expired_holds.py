@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tickets.holds import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Release seat holds whose time has run out, so their seats can be "
+        "booked again. Meant to run every minute or so from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SEAT_HOLD_SWEEP_BATCH_SIZE,
+            help="Number of holds released per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired holds.")
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0001_initial"),
+        ("tickets", "0004_delete_price_remove_ticket_price_alter_ticket_seat"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="ticket",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="ticket",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["booked", "checked_in"])),
+                fields=("flight", "row", "seat"),
+                name="unique_active_seat_per_flight",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("flights", "0004_flight_held_seats"),
+        ("tickets", "0005_active_seat_unique_constraint"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="ticket",
+            name="unique_active_seat_per_flight",
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="hold_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="ticket",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("held", "Held"),
+                    ("booked", "Booked"),
+                    ("canceled", "Canceled"),
+                    ("checked_in", "Checked In"),
+                    ("expired", "Expired"),
+                ],
+                default="booked",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(
+                condition=models.Q(("status", "held")),
+                fields=["hold_expires_at"],
+                name="ticket_hold_expiry_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ticket",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("status__in", ["held", "booked", "checked_in"])
+                ),
+                fields=("flight", "row", "seat"),
+                name="unique_active_seat_per_flight",
+            ),
+        ),
+    ]
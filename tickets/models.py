@@ -1,9 +1,15 @@
+from django.conf import settings
 from django.db import models
+from airplanes.models import Airplane, AirplaneType
 from flights.models import Flight
+from skygate_airport_api import refcache
 from django.core.exceptions import ValidationError
 import string
 
 
+ACTIVE_TICKET_STATUSES = ["held", "booked", "checked_in"]
+
+
 class Ticket(models.Model):
     flight = models.ForeignKey(
         Flight, on_delete=models.CASCADE, related_name="tickets"
@@ -14,15 +20,57 @@ class Ticket(models.Model):
     status = models.CharField(
         max_length=20,
         choices=[
+            ("held", "Held"),
             ("booked", "Booked"),
             ("canceled", "Canceled"),
             ("checked_in", "Checked In"),
+            ("expired", "Expired"),
         ],
         default="booked",
     )
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
+    # Only the user who placed the hold can confirm or order the ticket.
+    held_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="held_tickets",
+    )
 
     class Meta:
-        unique_together = ("flight", "row", "seat")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["flight", "row", "seat"],
+                condition=models.Q(status__in=ACTIVE_TICKET_STATUSES),
+                name="unique_active_seat_per_flight",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["hold_expires_at"],
+                condition=models.Q(status="held"),
+                name="ticket_hold_expiry_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_seat = instance.seat_state
+        return instance
+
+    @property
+    def seat_state(self):
+        """``(flight_id, row, seat, status)`` as tracked by the seat inventory."""
+        values = self.__dict__
+        seat = values.get("seat")
+        return (
+            values.get("flight_id"),
+            values.get("row"),
+            seat.upper() if seat else seat,
+            values.get("status"),
+        )
 
     def clean(self):
         super().clean()
@@ -30,10 +78,23 @@ class Ticket(models.Model):
         if not self.flight:
             return
 
-        airplane = self.flight.airplane
-        airplane_type = airplane.airplane_type
+        if (
+            self.flight.status == "canceled"
+            and self.status in ACTIVE_TICKET_STATUSES
+        ):
+            raise ValidationError(
+                {"flight": f"Flight {self.flight.flight_number} is canceled."}
+            )
+
+        airplane = refcache.get(Airplane, self.flight.airplane_id)
+        airplane_type = refcache.get(AirplaneType, airplane.airplane_type_id)
+
+        self.validate_seat_position(airplane_type, self.row, self.seat)
 
-        if self.row <= 0 or self.row > airplane_type.rows:
+    @staticmethod
+    def validate_seat_position(airplane_type, row, seat):
+        """Raise ValidationError unless the seat exists on ``airplane_type``."""
+        if row <= 0 or row > airplane_type.rows:
             raise ValidationError(
                 {
                     "row": f"Row must be between 1 and {airplane_type.rows} for this airplane type."
@@ -41,7 +102,7 @@ class Ticket(models.Model):
             )
 
         valid_seats = string.ascii_uppercase[: airplane_type.seats_in_row]
-        if self.seat.upper() not in valid_seats:
+        if seat.upper() not in valid_seats:
             raise ValidationError(
                 {
                     "seat": f"Seat must be one of {', '.join(valid_seats)} for this airplane type."
@@ -0,0 +1,21 @@
+"""
+Ticket fares.
+
+Tickets carry no price of their own. A ticket's fare follows from the
+distance of its flight's route: ``FARE_BASE`` plus ``FARE_PER_KM`` for
+every kilometre, rounded to the cent.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+
+
+CENT = Decimal("0.01")
+
+
+def fare_for_distance(distance):
+    fare = Decimal(settings.FARE_BASE) + Decimal(settings.FARE_PER_KM) * (
+        distance
+    )
+    return fare.quantize(CENT, rounding=ROUND_HALF_UP)
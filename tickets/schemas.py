@@ -1,48 +1,270 @@
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from .serializers import TicketSerializer
-
-
-create_ticket_schema = swagger_auto_schema(
-    operation_description="Create a new ticket. Users can only create tickets for themselves.",
-    responses={
-        201: TicketSerializer,
-        400: "Bad request",
-        403: "Forbidden",
-    },
-)
-
-
-update_ticket_schema = swagger_auto_schema(
-    operation_description="Update a ticket. Users can only update their tickets.",
-    responses={
-        200: TicketSerializer,
-        400: "Bad request",
-        403: "Forbidden",
-        404: "Not found",
-    },
-)
-
-
-available_seats_schema = swagger_auto_schema(
-    operation_description="Get available seats for a flight",
-    responses={
-        200: openapi.Response(
-            description="Available seats info",
-            examples={
-                "application/json": {
-                    "flight_id": 1,
-                    "flight_number": "FL123",
-                    "total_seats": 100,
-                    "booked_seats": 50,
-                    "available_seats": 50,
-                    "seats": [
-                        {"row": 1, "seat": "A", "seat_code": "1A"},
-                        {"row": 1, "seat": "B", "seat_code": "1B"},
-                    ],
-                }
-            },
+from skygate_airport_api.openapi import lazy_auto_schema
+from .serializers import GroupBookingSerializer, TicketSerializer
+
+
+@lazy_auto_schema
+def create_ticket_schema(openapi):
+    return dict(
+        operation_description="Create a new ticket. Users can only create tickets for themselves.",
+        responses={
+            201: TicketSerializer,
+            400: "Bad request",
+            403: "Forbidden",
+            409: openapi.Response(
+                description="Seat taken by a concurrent booking",
+                examples={
+                    "application/json": {
+                        "seat": "Seat 12C is already booked on this flight.",
+                        "alternatives": ["12B", "12D", "12A", "12E", "11C"],
+                    }
+                },
+            ),
+        },
+    )
+
+
+@lazy_auto_schema
+def update_ticket_schema(openapi):
+    return dict(
+        operation_description="Update a ticket. Users can only update their tickets.",
+        responses={
+            200: TicketSerializer,
+            400: "Bad request",
+            403: "Forbidden",
+            404: "Not found",
+        },
+    )
+
+
+@lazy_auto_schema
+def available_seats_schema(openapi):
+    return dict(
+        operation_description=(
+            "Get available seats for a flight. By default every free seat is "
+            "listed. `seat_format=bitstring` returns one string per row with "
+            "`1` for a free seat, and `seat_format=ranges` returns the free "
+            "seats of each row as letter ranges. The format can also be chosen "
+            "with `Accept: application/json; seat_format=ranges`. Responses "
+            "carry an `ETag` that changes with every ticket change on the "
+            "flight; send it back in `If-None-Match` to get a 304 while the "
+            "seats are unchanged."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "If-None-Match",
+                openapi.IN_HEADER,
+                description="ETag of a previous available-seats response",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "seat_format",
+                openapi.IN_QUERY,
+                description="Seat list representation",
+                type=openapi.TYPE_STRING,
+                enum=["list", "bitstring", "ranges"],
+                default="list",
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Available seats info",
+                examples={
+                    "application/json": {
+                        "flight_id": 1,
+                        "flight_number": "FL123",
+                        "total_seats": 100,
+                        "booked_seats": 50,
+                        "available_seats": 50,
+                        "seats": [
+                            {"row": 1, "seat": "A", "seat_code": "1A"},
+                            {"row": 1, "seat": "B", "seat_code": "1B"},
+                        ],
+                    },
+                    "application/json; seat_format=ranges": {
+                        "flight_id": 1,
+                        "flight_number": "FL123",
+                        "total_seats": 100,
+                        "booked_seats": 50,
+                        "available_seats": 50,
+                        "seat_format": "ranges",
+                        "seat_letters": "ABCD",
+                        "rows": [["A-B"], ["A", "C-D"], []],
+                    },
+                },
+            ),
+            304: "Seats unchanged since the given ETag",
+            400: "Unknown seat format",
+            404: "Flight not found",
+        },
+    )
+
+
+@lazy_auto_schema
+def group_booking_schema(openapi):
+    return dict(
+        operation_description=(
+            "Book seats for a group of passengers on one flight in a single "
+            "transaction. Unless allow_partial is set, nothing is booked when "
+            "any seat is rejected."
+        ),
+        request_body=GroupBookingSerializer,
+        responses={
+            201: openapi.Response(
+                description="All passengers booked",
+                examples={
+                    "application/json": {
+                        "flight_id": 1,
+                        "booked": 2,
+                        "rejected": 0,
+                        "results": [
+                            {
+                                "index": 0,
+                                "passenger_name": "Ana Costa",
+                                "seat_code": "4A",
+                                "status": "booked",
+                                "ticket_id": 10,
+                            },
+                            {
+                                "index": 1,
+                                "passenger_name": "Rui Alves",
+                                "seat_code": "4B",
+                                "status": "booked",
+                                "ticket_id": 11,
+                            },
+                        ],
+                    }
+                },
+            ),
+            207: "Some passengers booked (allow_partial only)",
+            400: "No passengers booked; see per-passenger results",
+            409: "Seats kept changing concurrently; retry",
+        },
+    )
+
+
+@lazy_auto_schema
+def seat_block_schema(openapi):
+    return dict(
+        operation_description=(
+            "Find `count` free seats sitting together on a flight: a run of "
+            "adjacent seats in one row if there is one, otherwise the most "
+            "compact block across neighbouring rows. `seats` is empty when the "
+            "flight does not have enough free seats."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                description="Number of seats wanted",
+                type=openapi.TYPE_INTEGER,
+                required=True,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Seat block",
+                examples={
+                    "application/json": {
+                        "flight_id": 1,
+                        "count": 3,
+                        "available_seats": 42,
+                        "same_row": True,
+                        "seats": [
+                            {"row": 7, "seat": "D", "seat_code": "7D"},
+                            {"row": 7, "seat": "E", "seat_code": "7E"},
+                            {"row": 7, "seat": "F", "seat_code": "7F"},
+                        ],
+                    }
+                },
+            ),
+            400: "Invalid count",
+            404: "Flight not found",
+        },
+    )
+
+
+@lazy_auto_schema
+def hold_seat_schema(openapi):
+    return dict(
+        operation_description=(
+            "Hold a seat during checkout. The ticket is created in the `held` "
+            "state and keeps the seat until `hold_expires_at`. Confirm the hold "
+            "before then, or the seat is released again."
+        ),
+        request_body=TicketSerializer,
+        responses={
+            201: TicketSerializer,
+            400: "Bad request",
+            409: "Seat taken by another booking or hold",
+        },
+    )
+
+
+@lazy_auto_schema
+def confirm_hold_schema(openapi):
+    return dict(
+        operation_description="Turn a held seat into a booking.",
+        request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties={}),
+        responses={
+            200: TicketSerializer,
+            404: "Not found",
+            409: openapi.Response(
+                description="The hold has expired",
+                examples={
+                    "application/json": {
+                        "detail": "The seat hold has expired. Please hold the "
+                        "seat again."
+                    }
+                },
+            ),
+        },
+    )
+
+
+@lazy_auto_schema
+def available_seats_batch_schema(openapi):
+    return dict(
+        operation_description=(
+            "Get seat availability for many flights at once, e.g. for a search "
+            "results page. Counts are always returned; pass `seat_format` to "
+            "also get compact seat rows for every flight. The response has an "
+            "`ETag` covering all requested flights."
         ),
-        404: "Flight not found",
-    },
-)
+        manual_parameters=[
+            openapi.Parameter(
+                "flight_ids",
+                openapi.IN_QUERY,
+                description="Comma-separated flight IDs",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "seat_format",
+                openapi.IN_QUERY,
+                description="Include seat rows in this representation",
+                type=openapi.TYPE_STRING,
+                enum=["bitstring", "ranges"],
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Availability per flight",
+                examples={
+                    "application/json": {
+                        "flights": [
+                            {
+                                "flight_id": 1,
+                                "flight_number": "FL123",
+                                "total_seats": 100,
+                                "booked_seats": 50,
+                                "available_seats": 50,
+                            }
+                        ],
+                        "not_found": [7],
+                    }
+                },
+            ),
+            304: "No flight changed since the given ETag",
+            400: "Missing or invalid flight IDs",
+        },
+    )
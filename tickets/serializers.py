@@ -1,12 +1,21 @@
 from rest_framework import serializers
+from tickets.exceptions import SeatUnavailable
+from tickets.holds import release_expired_holds
+from tickets.inventory import get_seat_map
 from tickets.models import Ticket
 import string
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from flights.models import Flight
 from flights.serializers import FlightSerializer
+from skygate_airport_api import metrics
+from skygate_airport_api.fieldsets import FieldsetMixin
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(FieldsetMixin, serializers.ModelSerializer):
     flight_details = FlightSerializer(source="flight", read_only=True)
+    seat_code = serializers.SerializerMethodField()
 
     class Meta:
         model = Ticket
@@ -18,36 +27,77 @@ class TicketSerializer(serializers.ModelSerializer):
             "row",
             "seat",
             "status",
+            "hold_expires_at",
+            "seat_code",
         ]
-        read_only_fields = ["id"]
+        expandable_fields = ["flight_details"]
+        read_only_fields = ["id", "hold_expires_at"]
+        # Seat uniqueness is enforced by the partial unique constraint on
+        # Ticket and reported by create/update, so skip DRF's extra query.
+        validators = []
 
     def validate(self, data):
         ticket = Ticket(**data)
         try:
             ticket.clean()
         except ValidationError as e:
+            metrics.count_booking("ticket", "invalid")
             raise serializers.ValidationError(e.message_dict)
+        return data
 
-        flight = data.get("flight")
-        row = data.get("row")
-        seat = data.get("seat")
-
-        if flight and row and seat:
-            existing_ticket = Ticket.objects.filter(
-                flight=flight,
-                row=row,
-                seat=seat.upper(),
-                status__in=["booked", "checked_in"],
-            ).first()
-
-            if existing_ticket:
-                raise serializers.ValidationError(
-                    {
-                        "seat": f"Seat {row}{seat.upper()} is already booked on this flight."
-                    }
-                )
+    def create(self, validated_data):
+        """
+        Insert the ticket, letting the database's seat uniqueness decide
+        between concurrent buyers of the same seat.
 
-        return data
+        A seat taken by a hold that has run out but was not swept yet is
+        released and the insert is retried once. Only a ticket that was
+        saved counts as a successful booking.
+        """
+        try:
+            with transaction.atomic():
+                ticket = super().create(validated_data)
+        except IntegrityError:
+            flight_ids = [validated_data["flight"].id]
+            if not release_expired_holds(flight_ids=flight_ids):
+                raise self.seat_conflict(validated_data)
+            try:
+                with transaction.atomic():
+                    ticket = super().create(validated_data)
+            except IntegrityError:
+                raise self.seat_conflict(validated_data)
+
+        metrics.count_booking("ticket", "success")
+        return ticket
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                ticket = super().update(instance, validated_data)
+        except IntegrityError:
+            raise self.seat_conflict(validated_data, instance)
+
+        metrics.count_booking("ticket", "success")
+        return ticket
+
+    def seat_conflict(self, validated_data, instance=None):
+        flight = validated_data.get("flight") or instance.flight
+        row = validated_data.get("row") or instance.row
+        seat = (validated_data.get("seat") or instance.seat).upper()
+        metrics.count_booking("ticket", "conflict")
+
+        seat_map = get_seat_map(flight)
+        seat_map.take(row, seat)
+        return SeatUnavailable(row, seat, seat_map.nearest_free(row, seat))
+
+    def validate_status(self, value):
+        current = getattr(self.instance, "status", None)
+        if value in ("held", "expired") and value != current:
+            raise serializers.ValidationError(
+                "Seat holds are placed with the hold endpoint and expire "
+                "on their own."
+            )
+        return value
 
     def validate_seat(self, value):
         if not value or len(value) != 1:
@@ -58,8 +108,55 @@ class TicketSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Seat must be a letter.")
         return value.upper()
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        representation["seat_code"] = f"{instance.row}{instance.seat}"
+    def get_seat_code(self, instance):
+        return f"{instance.row}{instance.seat}"
+
+
+class GroupPassengerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ticket
+        fields = ["passenger_name", "row", "seat"]
+
+    validate_seat = TicketSerializer.validate_seat
+
+
+class GroupBookingSerializer(serializers.Serializer):
+    flight = serializers.PrimaryKeyRelatedField(
+        queryset=Flight.objects.select_related("airplane__airplane_type")
+    )
+    passengers = GroupPassengerSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.GROUP_BOOKING_MAX_PASSENGERS,
+    )
+    allow_partial = serializers.BooleanField(default=False)
+
+    def validate_flight(self, flight):
+        if flight.status == "canceled":
+            raise serializers.ValidationError(
+                f"Flight {flight.flight_number} is canceled."
+            )
+        return flight
+
+
+class SeatBlockQuerySerializer(serializers.Serializer):
+    count = serializers.IntegerField(
+        min_value=1, max_value=settings.GROUP_BOOKING_MAX_PASSENGERS
+    )
+
+
+class AvailableSeatsBatchQuerySerializer(serializers.Serializer):
+    flight_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.AVAILABLE_SEATS_BATCH_MAX_FLIGHTS,
+    )
+    seat_format = serializers.ChoiceField(
+        choices=["bitstring", "ranges"], required=False
+    )
+
 
-        return representation
+class AvailableSeatsQuerySerializer(serializers.Serializer):
+    seat_format = serializers.ChoiceField(
+        choices=["list", "bitstring", "ranges"], default="list"
+    )
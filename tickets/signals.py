@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tickets import counters, inventory
+from tickets.models import Ticket
+
+
+@receiver(post_save, sender=Ticket)
+def track_seat_on_save(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, "_loaded_seat", None)
+    new = instance.seat_state
+    instance._loaded_seat = new
+    if old is None and not created:
+        # The ticket was not loaded from the database, so the seat it held
+        # before this save is unknown.
+        counters.recount([new[0]])
+        transaction.on_commit(lambda: inventory.invalidate(new[0]))
+        return
+    if old != new:
+        counters.apply_counter_changes([(old, new)])
+        transaction.on_commit(lambda: inventory.apply_ticket_change(old, new))
+
+
+@receiver(post_delete, sender=Ticket)
+def track_seat_on_delete(sender, instance, **kwargs):
+    old = getattr(instance, "_loaded_seat", instance.seat_state)
+    counters.apply_counter_changes([(old, None)])
+    transaction.on_commit(lambda: inventory.apply_ticket_change(old, None))
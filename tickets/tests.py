@@ -1,13 +1,22 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from decimal import Decimal
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.utils import timezone
 from datetime import timedelta
+from io import StringIO
 
+from .exceptions import SeatUnavailable
+from .holds import release_expired_holds
+from .inventory import SeatMap, get_seat_map
 from .models import Ticket
+from .serializers import TicketSerializer
+from skygate_airport_api import metrics
+from skygate_airport_api.testing import QueryBudgetMixin
 from flights.models import Flight, Crew
 from airports.models import Airport, Route
 from airplanes.models import Airplane, AirplaneType
@@ -83,7 +92,7 @@ class TicketModelTest(TestCase):
             invalid_ticket.full_clean()
 
 
-class TicketAPITest(APITestCase):
+class TicketAPITest(QueryBudgetMixin, APITestCase):
     """Tests for the Ticket API endpoints"""
 
     def setUp(self):
@@ -138,6 +147,41 @@ class TicketAPITest(APITestCase):
         self.tickets_url = "/api/tickets/"
         self.ticket_detail_url = f"{self.tickets_url}{self.ticket.id}/"
 
+    def test_booking_outcomes_are_counted(self):
+        """Test that ticket bookings feed the booking counters"""
+
+        def count(outcome):
+            metrics.inc(
+                "skygate_bookings_total",
+                0,
+                serializer="ticket",
+                outcome=outcome,
+            )
+            return metrics.store.values[
+                "skygate_bookings_total",
+                (("serializer", "ticket"), ("outcome", outcome)),
+            ]
+
+        invalid, success = count("invalid"), count("success")
+        conflict = count("conflict")
+        data = {"flight": self.flight.id, "passenger_name": "Ann Lee"}
+        self.assertFalse(
+            TicketSerializer(data={**data, "row": 99, "seat": "A"}).is_valid()
+        )
+        serializer = TicketSerializer(data={**data, "row": 1, "seat": "A"})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(count("success"), success)
+        serializer.save()
+
+        # A valid booking that loses the seat is only a conflict.
+        serializer = TicketSerializer(data={**data, "row": 1, "seat": "A"})
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(SeatUnavailable):
+            serializer.save()
+        self.assertEqual(count("invalid"), invalid + 1)
+        self.assertEqual(count("success"), success + 1)
+        self.assertEqual(count("conflict"), conflict + 1)
+
     def test_get_tickets_requires_authentication(self):
         """Test that authentication is required to access tickets"""
         response = self.client.get(self.tickets_url)
@@ -148,15 +192,46 @@ class TicketAPITest(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(self.tickets_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.ticket.id)
-        self.assertEqual(response.data[0]["passenger_name"], "James Wilson")
-        self.assertEqual(response.data[0]["seat_code"], "20E")
+        results = response.data["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["id"], self.ticket.id)
+        self.assertEqual(results[0]["passenger_name"], "James Wilson")
+        self.assertEqual(results[0]["seat_code"], "20E")
+
+    def test_list_query_budget(self):
+        """Test that listing tickets does not query per flight or crew"""
+        crew = Crew.objects.create(
+            first_name="Omar", last_name="Haddad", role="Captain"
+        )
+        self.flight.crew.add(crew)
+        self.order.tickets.add(
+            *Ticket.objects.bulk_create(
+                Ticket(
+                    flight=self.flight,
+                    passenger_name=f"Passenger {number}",
+                    row=number // 10 + 1,
+                    seat="ABCDEFGHIJ"[number % 10],
+                )
+                for number in range(99)
+            )
+        )
+
+        self.client.force_authenticate(user=self.user)
+        with self.assertQueryBudget(2):
+            response = self.client.get(
+                self.tickets_url,
+                {"page_size": 100, "expand": "flight_details.crew"},
+            )
+        results = response.data["results"]
+        self.assertEqual(len(results), 100)
+        self.assertEqual(len(results[0]["flight_details"]["crew"]), 1)
 
     def test_user_can_view_ticket_details(self):
         """Test that a user can view details of their ticket"""
         self.client.force_authenticate(user=self.user)
-        response = self.client.get(self.ticket_detail_url)
+        response = self.client.get(
+            self.ticket_detail_url, {"expand": "flight_details"}
+        )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["id"], self.ticket.id)
@@ -168,7 +243,7 @@ class TicketAPITest(APITestCase):
         )
 
     def test_duplicate_seat_validation(self):
-        """Test validation against booking already occupied seats"""
+        """Test that booking an already occupied seat is a conflict"""
         self.client.force_authenticate(user=self.user)
 
         duplicate_seat_data = {
@@ -181,9 +256,696 @@ class TicketAPITest(APITestCase):
         response = self.client.post(
             self.tickets_url, duplicate_seat_data, format="json"
         )
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
 
         self.assertTrue(
-            "non_field_errors" in response.data or "seat" in response.data,
-            "Expected validation error for duplicate seat",
+            "seat" in response.data,
+            "Expected conflict error for duplicate seat",
+        )
+        self.assertIn("alternatives", response.data)
+
+    def test_canceled_seat_can_be_resold(self):
+        """Test that a seat held only by a canceled ticket can be rebooked"""
+        self.client.force_authenticate(user=self.user)
+        self.ticket.status = "canceled"
+        self.ticket.save()
+
+        response = self.client.post(
+            self.tickets_url,
+            {
+                "flight": self.flight.id,
+                "passenger_name": "Second Passenger",
+                "row": 20,
+                "seat": "E",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        resold = Ticket.objects.filter(flight=self.flight, row=20, seat="E")
+        self.assertEqual(resold.count(), 2)
+
+
+class SeatInventoryTest(APITestCase):
+    """Tests for the cached seat inventory behind available-seats"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(
+            username="traveller",
+            email="traveller@example.com",
+            password="password123",
+        )
+
+        self.source_airport = Airport.objects.create(
+            name="OSL Airport", closest_big_city="Oslo"
+        )
+        self.destination_airport = Airport.objects.create(
+            name="ARN Airport", closest_big_city="Stockholm"
+        )
+        self.route = Route.objects.create(
+            source=self.source_airport,
+            destination=self.destination_airport,
+            distance=420,
+        )
+        self.airplane_type = AirplaneType.objects.create(
+            name="ATR 72", rows=3, seats_in_row=4
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-5001", airplane_type=self.airplane_type
+        )
+
+        now = timezone.now()
+        self.flight = Flight.objects.create(
+            flight_number="SG555",
+            departure_time=now + timedelta(days=3),
+            arrival_time=now + timedelta(days=3, hours=1),
+            route=self.route,
+            airplane=self.airplane,
+        )
+        self.ticket = Ticket.objects.create(
+            flight=self.flight,
+            passenger_name="Ingrid Berg",
+            row=1,
+            seat="B",
+            status="booked",
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = f"/api/tickets/available-seats/{self.flight.id}/"
+
+    def test_available_seats_response(self):
+        """Test the available-seats payload built from the seat map"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["flight_id"], self.flight.id)
+        self.assertEqual(response.data["flight_number"], "SG555")
+        self.assertEqual(response.data["total_seats"], 12)
+        self.assertEqual(response.data["booked_seats"], 1)
+        self.assertEqual(response.data["available_seats"], 11)
+        self.assertEqual(
+            response.data["seats"][:2],
+            [
+                {"row": 1, "seat": "A", "seat_code": "1A"},
+                {"row": 1, "seat": "C", "seat_code": "1C"},
+            ],
+        )
+
+    def test_compact_seat_formats(self):
+        """Test the bitstring and ranges representations"""
+        response = self.client.get(self.url, {"seat_format": "bitstring"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("seats", response.data)
+        self.assertEqual(response.data["available_seats"], 11)
+        self.assertEqual(response.data["seat_letters"], "ABCD")
+        self.assertEqual(response.data["rows"], ["1011", "1111", "1111"])
+
+        response = self.client.get(
+            self.url, HTTP_ACCEPT="application/json; seat_format=ranges"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["seat_format"], "ranges")
+        self.assertEqual(
+            response.data["rows"], [["A", "C-D"], ["A-D"], ["A-D"]]
+        )
+        self.assertIn("Accept", response["Vary"])
+
+        response = self.client.get(self.url, {"seat_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seat_map_is_served_from_cache(self):
+        """Test that a cached seat map skips the booked-seats query"""
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["available_seats"], 11)
+
+    def test_available_seats_conditional_get(self):
+        """Test ETags driven by the flight's seat version"""
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn("Accept", response["Vary"])
+
+        response = self.client.get(
+            self.url, {"seat_format": "ranges"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Ticket.objects.create(
+            flight=self.flight, passenger_name="Lars Dahl", row=2, seat="C"
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["available_seats"], 10)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_stale_seat_map_is_rebuilt(self):
+        """Test that a map which missed a ticket change is not served"""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=False):
+            Ticket.objects.create(
+                flight=self.flight, passenger_name="Lars Dahl", row=2, seat="C"
+            )
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["available_seats"], 10)
+
+    def test_batch_available_seats(self):
+        """Test seat availability for many flights in one request"""
+        other = Flight.objects.create(
+            flight_number="SG556",
+            departure_time=self.flight.departure_time + timedelta(hours=4),
+            arrival_time=self.flight.arrival_time + timedelta(hours=4),
+            route=self.route,
+            airplane=self.airplane,
+        )
+        Ticket.objects.create(
+            flight=other, passenger_name="Lars Dahl", row=3, seat="D"
+        )
+        url = "/api/tickets/available-seats/"
+        flight_ids = f"{other.id},{self.flight.id},999"
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"flight_ids": flight_ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (flight["flight_number"], flight["available_seats"])
+                for flight in response.data["flights"]
+            ],
+            [("SG556", 11), ("SG555", 11)],
+        )
+        self.assertEqual(response.data["not_found"], [999])
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, {"flight_ids": flight_ids, "seat_format": "bitstring"}
+            )
+        self.assertEqual(
+            [flight["rows"] for flight in response.data["flights"]],
+            [["1111", "1111", "1110"], ["1011", "1111", "1111"]],
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url,
+                {"flight_ids": flight_ids, "seat_format": "bitstring"},
+                HTTP_IF_NONE_MATCH=response["ETag"],
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seat_blocks_endpoint(self):
+        """Test the adjacent seat block finder endpoint"""
+        url = f"/api/tickets/seat-blocks/{self.flight.id}/"
+        response = self.client.get(url, {"count": 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["same_row"])
+        self.assertEqual(
+            [seat["seat_code"] for seat in response.data["seats"]],
+            ["2A", "2B", "2C"],
+        )
+
+        response = self.client.get(url, {"count": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seat_map_follows_ticket_changes(self):
+        """Test that bookings, check-ins and cancellations patch the map"""
+        flight = Flight.objects.select_related("airplane__airplane_type").get(
+            pk=self.flight.pk
+        )
+        seat_map = get_seat_map(flight)
+        self.assertTrue(seat_map.is_taken(1, "B"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_ticket = Ticket.objects.create(
+                flight=self.flight,
+                passenger_name="Lars Dahl",
+                row=2,
+                seat="C",
+            )
+        flight.refresh_from_db(fields=["version"])
+        with self.assertNumQueries(0):
+            self.assertTrue(get_seat_map(flight).is_taken(2, "C"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_ticket.status = "checked_in"
+            new_ticket.save()
+        flight.refresh_from_db(fields=["version"])
+        self.assertTrue(get_seat_map(flight).is_taken(2, "C"))
+
+        ticket = Ticket.objects.get(pk=self.ticket.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.status = "canceled"
+            ticket.save()
+
+        flight.refresh_from_db(fields=["version"])
+        with self.assertNumQueries(0):
+            seat_map = get_seat_map(flight)
+        self.assertFalse(seat_map.is_taken(1, "B"))
+        self.assertEqual(seat_map.taken_count, 1)
+
+
+class SeatBookingRaceTest(TestCase):
+    """Tests for the atomic booking path in TicketSerializer"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.source_airport = Airport.objects.create(
+            name="LIS Airport", closest_big_city="Lisbon"
+        )
+        self.destination_airport = Airport.objects.create(
+            name="MAD Airport", closest_big_city="Madrid"
+        )
+        self.route = Route.objects.create(
+            source=self.source_airport,
+            destination=self.destination_airport,
+            distance=500,
+        )
+        self.airplane_type = AirplaneType.objects.create(
+            name="Embraer 190", rows=10, seats_in_row=4
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-6001", airplane_type=self.airplane_type
+        )
+
+        now = timezone.now()
+        self.flight = Flight.objects.create(
+            flight_number="SG600",
+            departure_time=now + timedelta(days=5),
+            arrival_time=now + timedelta(days=5, hours=1),
+            route=self.route,
+            airplane=self.airplane,
+        )
+        self.booking_data = {
+            "flight": self.flight.id,
+            "passenger_name": "Ana Costa",
+            "row": 4,
+            "seat": "B",
+        }
+
+    def test_losing_buyer_gets_seat_conflict(self):
+        """Test that a seat taken after validation raises a 409 conflict"""
+        serializer = TicketSerializer(data=self.booking_data)
+        self.assertTrue(serializer.is_valid())
+
+        Ticket.objects.create(
+            flight=self.flight, passenger_name="Rui Alves", row=4, seat="B"
+        )
+
+        with self.assertRaises(SeatUnavailable) as conflict:
+            serializer.save()
+
+        self.assertEqual(
+            conflict.exception.status_code, status.HTTP_409_CONFLICT
+        )
+        self.assertEqual(
+            conflict.exception.detail["alternatives"][:2], ["4A", "4C"]
+        )
+        self.assertEqual(Ticket.objects.filter(row=4, seat="B").count(), 1)
+
+    def test_winning_buyer_gets_ticket(self):
+        """Test that an uncontended booking is saved"""
+        serializer = TicketSerializer(data=self.booking_data)
+        self.assertTrue(serializer.is_valid())
+        ticket = serializer.save()
+        self.assertEqual(ticket.seat, "B")
+        self.assertEqual(ticket.status, "booked")
+
+
+class GroupBookingAPITest(APITestCase):
+    """Tests for the bulk group booking endpoint"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(
+            username="organiser",
+            email="organiser@example.com",
+            password="password123",
+        )
+
+        self.source_airport = Airport.objects.create(
+            name="BER Airport", closest_big_city="Berlin"
+        )
+        self.destination_airport = Airport.objects.create(
+            name="VIE Airport", closest_big_city="Vienna"
+        )
+        self.route = Route.objects.create(
+            source=self.source_airport,
+            destination=self.destination_airport,
+            distance=520,
+        )
+        self.airplane_type = AirplaneType.objects.create(
+            name="Airbus A319", rows=20, seats_in_row=6
         )
+        self.airplane = Airplane.objects.create(
+            name="SG-7001", airplane_type=self.airplane_type
+        )
+
+        now = timezone.now()
+        self.flight = Flight.objects.create(
+            flight_number="SG700",
+            departure_time=now + timedelta(days=10),
+            arrival_time=now + timedelta(days=10, hours=1),
+            route=self.route,
+            airplane=self.airplane,
+        )
+        Ticket.objects.create(
+            flight=self.flight, passenger_name="Taken", row=1, seat="A"
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = "/api/tickets/bulk/"
+
+    def passengers(self, *seat_codes):
+        return [
+            {
+                "passenger_name": f"Guest {code}",
+                "row": int(code[:-1]),
+                "seat": code[-1].lower(),
+            }
+            for code in seat_codes
+        ]
+
+    def test_group_is_booked_in_one_insert(self):
+        """Test that a valid group is booked with a constant query count"""
+        payload = {
+            "flight": self.flight.id,
+            "passengers": self.passengers(*[f"{r}B" for r in range(1, 21)]),
+        }
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["booked"], 20)
+        self.assertEqual(response.data["results"][0]["seat_code"], "1B")
+        self.assertEqual(
+            Ticket.objects.filter(flight=self.flight, seat="B").count(), 20
+        )
+
+    def test_rejected_seat_books_nothing(self):
+        """Test that one bad seat fails the whole group by default"""
+        payload = {
+            "flight": self.flight.id,
+            "passengers": self.passengers("1A", "2A", "2A", "30A"),
+        }
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["rejected", "not_booked", "rejected", "rejected"],
+        )
+        self.assertIn("row", response.data["results"][3]["errors"])
+        self.assertEqual(Ticket.objects.filter(flight=self.flight).count(), 1)
+
+    def test_partial_group_booking(self):
+        """Test that allow_partial books the seats that are free"""
+        payload = {
+            "flight": self.flight.id,
+            "passengers": self.passengers("1A", "2A", "2B"),
+            "allow_partial": True,
+        }
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["booked"], 2)
+        self.assertEqual(response.data["rejected"], 1)
+        self.assertEqual(Ticket.objects.filter(flight=self.flight).count(), 3)
+
+
+class SeatHoldTest(APITestCase):
+    """Tests for temporary seat holds and the expiry sweeper"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(
+            username="agent",
+            email="agent@example.com",
+            password="password123",
+            is_staff=True,
+        )
+
+        self.source_airport = Airport.objects.create(
+            name="LIS Airport", closest_big_city="Lisbon"
+        )
+        self.destination_airport = Airport.objects.create(
+            name="MAD Airport", closest_big_city="Madrid"
+        )
+        self.route = Route.objects.create(
+            source=self.source_airport,
+            destination=self.destination_airport,
+            distance=500,
+        )
+        self.airplane_type = AirplaneType.objects.create(
+            name="Embraer 190", rows=4, seats_in_row=4
+        )
+        self.airplane = Airplane.objects.create(
+            name="SG-9001", airplane_type=self.airplane_type
+        )
+
+        now = timezone.now()
+        self.flight = Flight.objects.create(
+            flight_number="SG900",
+            departure_time=now + timedelta(days=5),
+            arrival_time=now + timedelta(days=5, hours=1),
+            route=self.route,
+            airplane=self.airplane,
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.tickets_url = "/api/tickets/"
+        self.hold_url = "/api/tickets/hold/"
+
+    def hold(self, row, seat, expires_in=timedelta(minutes=10)):
+        return Ticket.objects.create(
+            flight=self.flight,
+            passenger_name=f"Passenger {row}{seat}",
+            row=row,
+            seat=seat,
+            status="held",
+            hold_expires_at=timezone.now() + expires_in,
+        )
+
+    def test_hold_takes_seat(self):
+        """Test that a held seat counts as taken until it expires"""
+        data = {
+            "flight": self.flight.id,
+            "passenger_name": "Ana Costa",
+            "row": 2,
+            "seat": "B",
+        }
+        response = self.client.post(self.hold_url, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], "held")
+        self.assertIsNotNone(response.data["hold_expires_at"])
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.held_seats, 1)
+        self.assertEqual(self.flight.available_seats, 15)
+
+        response = self.client.get(
+            f"/api/tickets/available-seats/{self.flight.id}/"
+        )
+        self.assertNotIn(
+            "2B", [seat["seat_code"] for seat in response.data["seats"]]
+        )
+
+        response = self.client.post(self.tickets_url, data)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client.post(
+            self.tickets_url, {**data, "seat": "C", "status": "held"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_hold(self):
+        """Test turning a hold into a booking"""
+        ticket = self.hold(1, "A")
+        response = self.client.post(f"/api/tickets/{ticket.id}/confirm/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "booked")
+        self.assertIsNone(response.data["hold_expires_at"])
+
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.held_seats, 0)
+        self.assertEqual(self.flight.booked_seats, 1)
+
+        expired = self.hold(1, "B", expires_in=timedelta(minutes=-1))
+        response = self.client.post(f"/api/tickets/{expired.id}/confirm/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_confirm_released_hold(self):
+        """Test that a hold released by the sweeper cannot be confirmed"""
+        ticket = self.hold(1, "A", expires_in=timedelta(minutes=-1))
+        release_expired_holds()
+        response = self.client.post(f"/api/tickets/{ticket.id}/confirm/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, "expired")
+
+        booked = self.hold(2, "A")
+        for _ in range(2):
+            response = self.client.post(f"/api/tickets/{booked.id}/confirm/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["status"], "booked")
+
+        booked = Ticket.objects.get(pk=booked.pk)
+        booked.status = "canceled"
+        booked.save(update_fields=["status"])
+        response = self.client.post(f"/api/tickets/{booked.id}/confirm/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_hold_belongs_to_holder(self):
+        """Test that only the user who holds a seat can confirm or order it"""
+        holder, other = (
+            User.objects.create_user(username=name, password="password123")
+            for name in ("holder", "other")
+        )
+        self.client.force_authenticate(user=holder)
+        response = self.client.post(
+            self.hold_url,
+            {
+                "flight": self.flight.id,
+                "passenger_name": "Ana Costa",
+                "row": 2,
+                "seat": "B",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ticket_id = response.data["id"]
+        confirm_url = f"/api/tickets/{ticket_id}/confirm/"
+        order = {"tickets": [ticket_id]}
+
+        self.client.force_authenticate(user=other)
+        response = self.client.post(confirm_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post("/api/orders/", order, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["tickets"],
+            [f"Ticket {ticket_id} is held by someone else."],
+        )
+
+        self.client.force_authenticate(user=holder)
+        response = self.client.get(f"/api/tickets/{ticket_id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(confirm_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "booked")
+
+        self.client.force_authenticate(user=other)
+        response = self.client.post("/api/orders/", order, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=holder)
+        response = self.client.post("/api/orders/", order, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_sweeper_releases_expired_holds(self):
+        """Test the batched release of expired holds"""
+        for seat in "ABC":
+            self.hold(1, seat, expires_in=timedelta(minutes=-1))
+        live = self.hold(2, "A")
+        self.flight.refresh_from_db()
+        seat_map = get_seat_map(self.flight)
+        self.assertTrue(seat_map.is_taken(1, "A"))
+
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "release_expired_holds", "--batch-size", "2", stdout=output
+            )
+        self.assertIn("Released 3 expired holds.", output.getvalue())
+
+        self.assertEqual(Ticket.objects.filter(status="expired").count(), 3)
+        live.refresh_from_db()
+        self.assertEqual(live.status, "held")
+
+        self.flight.refresh_from_db(fields=["held_seats", "version"])
+        self.assertEqual(self.flight.held_seats, 1)
+        with self.assertNumQueries(0):
+            seat_map = get_seat_map(self.flight)
+        self.assertFalse(seat_map.is_taken(1, "A"))
+        self.assertTrue(seat_map.is_taken(2, "A"))
+
+    def test_booking_releases_unswept_expired_hold(self):
+        """Test that an expired hold does not block a booking"""
+        self.hold(3, "D", expires_in=timedelta(minutes=-1))
+        response = self.client.post(
+            self.tickets_url,
+            {
+                "flight": self.flight.id,
+                "passenger_name": "Rui Lopes",
+                "row": 3,
+                "seat": "D",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class SeatBlockFinderTest(SimpleTestCase):
+    """Tests for SeatMap.find_block"""
+
+    def setUp(self):
+        self.seat_map = SeatMap(flight_id=1, rows=4, seats_in_row=6)
+
+    def take(self, *seat_codes):
+        for code in seat_codes:
+            self.seat_map.take(int(code[:-1]), code[-1])
+
+    def test_free_run_index(self):
+        """Test that the free-run index follows takes and releases"""
+        self.take("1B", "1E")
+        self.assertEqual(self.seat_map.runs[0], ((0, 1), (2, 2), (5, 1)))
+        self.seat_map.release(1, "E")
+        self.assertEqual(self.seat_map.runs[0], ((0, 1), (2, 4)))
+
+    def test_prefers_shortest_run_in_one_row(self):
+        """Test that the tightest fitting run is used"""
+        self.take("1D", "2A", "2B", "2F", "3C")
+        self.assertEqual(
+            self.seat_map.find_block(3), [(1, "A"), (1, "B"), (1, "C")]
+        )
+        self.assertEqual(
+            self.seat_map.find_block(4),
+            [(4, "A"), (4, "B"), (4, "C"), (4, "D")],
+        )
+
+    def test_compact_block_across_rows(self):
+        """Test the fallback to a block spanning adjacent rows"""
+        self.take(
+            *[f"{row}{seat}" for row in (1, 2) for seat in "ACE"],
+            *[f"{row}{seat}" for row in (3, 4) for seat in "ABCDEF"],
+        )
+        self.assertEqual(
+            self.seat_map.find_block(4),
+            [(1, "B"), (1, "D"), (2, "B"), (2, "D")],
+        )
+
+    def test_single_row_airplane(self):
+        """Test a block of scattered seats on a one-row airplane"""
+        seat_map = SeatMap(flight_id=2, rows=1, seats_in_row=6)
+        for seat in "BE":
+            seat_map.take(1, seat)
+        self.assertEqual(
+            seat_map.find_block(3), [(1, "A"), (1, "C"), (1, "D")]
+        )
+        self.assertIsNone(seat_map.find_block(5))
+
+    def test_not_enough_free_seats(self):
+        """Test that no block is returned for an oversized group"""
+        self.take(*[f"{row}{seat}" for row in (1, 2, 3) for seat in "ABCDEF"])
+        self.assertIsNone(self.seat_map.find_block(7))
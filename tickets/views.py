@@ -1,25 +1,59 @@
+import hashlib
+
+from django.db.models import Q
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_header_parameters
 from rest_framework import viewsets, status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .booking import book_group
+from .holds import confirm_hold, hold_expiry
+from .inventory import get_seat_map, get_seat_maps
 from .models import Ticket
-from .serializers import TicketSerializer
+from .serializers import (
+    AvailableSeatsBatchQuerySerializer,
+    AvailableSeatsQuerySerializer,
+    GroupBookingSerializer,
+    SeatBlockQuerySerializer,
+    TicketSerializer,
+)
 from flights.models import Flight
+from skygate_airport_api.compound import CompoundDocumentMixin
+from skygate_airport_api.profiling import ProfiledViewMixin
+from skygate_airport_api.fieldsets import Fieldset
+from skygate_airport_api.conditional import (
+    conditional_response,
+    version_etag,
+)
 from skygate_airport_api.permissions import (
     IsTicketOwner,
 )
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
-from .schemas import create_ticket_schema, update_ticket_schema, available_seats_schema
+from .schemas import (
+    create_ticket_schema,
+    update_ticket_schema,
+    available_seats_schema,
+    available_seats_batch_schema,
+    group_booking_schema,
+    seat_block_schema,
+    hold_seat_schema,
+    confirm_hold_schema,
+)
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(
+    ProfiledViewMixin, CompoundDocumentMixin, viewsets.ModelViewSet
+):
     """
     API endpoint for managing tickets.
 
-    Users can view and modify only their own tickets.
-    Admins have access to all tickets.
+    Users can view and modify only their own tickets: those in their
+    orders and those they hold.
+    Admins have access to all tickets. The list side-loads the flights its
+    tickets are on with ``?include=`` (see ``skygate_airport_api.compound``).
     """
 
     serializer_class = TicketSerializer
@@ -32,41 +66,98 @@ class TicketViewSet(viewsets.ModelViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return Ticket.objects.none()
             
+        fieldset = Fieldset.from_request(self.request)
+        queryset = Ticket.objects.all()
+        if fieldset.expands("flight_details"):
+            queryset = queryset.select_related("flight")
+        if fieldset.expands("flight_details.crew"):
+            queryset = queryset.prefetch_related("flight__crew")
         user = self.request.user
         if user.is_staff:
-            return Ticket.objects.all()
+            return queryset
         else:
-            return Ticket.objects.filter(orders__user=user).distinct()
+            return queryset.filter(
+                Q(orders__user=user) | Q(held_by=user)
+            ).distinct()
+
+    def get_flight_ids(self, tickets):
+        return {ticket.flight_id for ticket in tickets}
 
     def get_flight_or_404(self, flight_id):
-        return get_object_or_404(Flight, pk=flight_id)
+        return get_object_or_404(
+            Flight.objects.select_related("airplane__airplane_type"),
+            pk=flight_id,
+        )
 
-    def get_available_seats(self, flight):
-        airplane_type = flight.airplane.airplane_type
-        total_rows = airplane_type.rows
-        seats_per_row = airplane_type.seats_in_row
+    def get_available_seats(self, flight, seat_format="list"):
+        seat_map = get_seat_map(flight)
+        data = {
+            "flight_id": flight.id,
+            "flight_number": flight.flight_number,
+            "total_seats": seat_map.total_seats,
+            "booked_seats": seat_map.taken_count,
+        }
 
-        booked = Ticket.objects.filter(
-            flight=flight, status__in=["booked", "checked_in"]
-        ).values_list("row", "seat")
+        if seat_format == "list":
+            seats = [
+                {"row": row, "seat": seat, "seat_code": f"{row}{seat}"}
+                for row, seat in seat_map.iter_free()
+            ]
+            data["available_seats"] = len(seats)
+            data["seats"] = seats
+            return data
 
-        booked_set = {f"{row}{seat}" for row, seat in booked}
+        data["available_seats"] = seat_map.free_count
+        data["seat_format"] = seat_format
+        data["seat_letters"] = seat_map.seat_letters
+        data["rows"] = self.get_seat_rows(seat_map, seat_format)
+        return data
 
-        seats = [
-            {"row": row, "seat": seat, "seat_code": f"{row}{seat}"}
-            for row in range(1, total_rows + 1)
-            for seat in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:seats_per_row]
-            if f"{row}{seat}" not in booked_set
-        ]
+    def get_seat_rows(self, seat_map, seat_format):
+        if seat_format == "bitstring":
+            return seat_map.free_bitstrings()
+        return seat_map.free_ranges()
 
-        return {
-            "flight_id": flight.id,
-            "flight_number": flight.flight_number,
-            "total_seats": total_rows * seats_per_row,
-            "booked_seats": len(booked_set),
-            "available_seats": len(seats),
-            "seats": seats,
-        }
+    def get_flights_availability(self, flights, seat_format=None):
+        """
+        Seat counts of many flights, read from the counters kept on Flight,
+        plus compact seat rows when ``seat_format`` is given.
+        """
+        seat_maps = get_seat_maps(flights) if seat_format else {}
+        results = []
+        for flight in flights:
+            data = {
+                "flight_id": flight.id,
+                "flight_number": flight.flight_number,
+                "total_seats": flight.capacity,
+                "booked_seats": flight.capacity - flight.available_seats,
+                "available_seats": flight.available_seats,
+            }
+            if seat_format:
+                seat_map = seat_maps[flight.id]
+                data["seat_letters"] = seat_map.seat_letters
+                data["rows"] = self.get_seat_rows(seat_map, seat_format)
+            results.append(data)
+        return results
+
+    def get_seat_format(self, request):
+        """
+        Read the seat format from ``?seat_format=`` or, failing that, from
+        a ``seat_format`` parameter on the accepted media type, as in
+        ``Accept: application/json; seat_format=ranges``.
+        """
+        seat_format = request.query_params.get("seat_format")
+        if seat_format is None:
+            _, params = parse_header_parameters(
+                getattr(request, "accepted_media_type", None) or ""
+            )
+            seat_format = params.get("seat_format")
+
+        query = AvailableSeatsQuerySerializer(
+            data={} if seat_format is None else {"seat_format": seat_format}
+        )
+        query.is_valid(raise_exception=True)
+        return query.validated_data["seat_format"]
 
     @create_ticket_schema
     def create(self, request, *args, **kwargs):
@@ -84,6 +175,148 @@ class TicketViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def available_seats(self, request, flight_id=None):
+        seat_format = self.get_seat_format(request)
         flight = self.get_flight_or_404(flight_id)
-        data = self.get_available_seats(flight)
-        return Response(data)
+        etag = version_etag("seats", flight.id, flight.version, seat_format)
+        response = conditional_response(
+            request,
+            etag,
+            lambda: Response(self.get_available_seats(flight, seat_format)),
+        )
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    @available_seats_batch_schema
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="available-seats",
+        permission_classes=[IsAuthenticated],
+    )
+    def available_seats_batch(self, request):
+        flight_ids = [
+            flight_id
+            for value in request.query_params.getlist("flight_ids")
+            for flight_id in value.split(",")
+            if flight_id
+        ]
+        data = {"flight_ids": flight_ids}
+        if "seat_format" in request.query_params:
+            data["seat_format"] = request.query_params["seat_format"]
+        query = AvailableSeatsBatchQuerySerializer(data=data)
+        query.is_valid(raise_exception=True)
+        flight_ids = list(dict.fromkeys(query.validated_data["flight_ids"]))
+        seat_format = query.validated_data.get("seat_format")
+
+        found = Flight.objects.select_related(
+            "airplane__airplane_type"
+        ).in_bulk(flight_ids)
+        flights = [found[pk] for pk in flight_ids if pk in found]
+        versions = ",".join(
+            f"{flight.id}:{flight.version}" for flight in flights
+        )
+        etag = version_etag(
+            "seats",
+            hashlib.sha1(versions.encode()).hexdigest()[:16],
+            seat_format or "counts",
+        )
+
+        return conditional_response(
+            request,
+            etag,
+            lambda: Response(
+                {
+                    "flights": self.get_flights_availability(
+                        flights, seat_format
+                    ),
+                    "not_found": [pk for pk in flight_ids if pk not in found],
+                }
+            ),
+        )
+
+    @seat_block_schema
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="seat-blocks/(?P<flight_id>[^/.]+)",
+        permission_classes=[IsAuthenticated],
+    )
+    def seat_blocks(self, request, flight_id=None):
+        query = SeatBlockQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        count = query.validated_data["count"]
+
+        flight = self.get_flight_or_404(flight_id)
+        seat_map = get_seat_map(flight)
+        block = seat_map.find_block(count) or []
+
+        return Response(
+            {
+                "flight_id": flight.id,
+                "count": count,
+                "available_seats": seat_map.free_count,
+                "same_row": len({row for row, _ in block}) == 1,
+                "seats": [
+                    {"row": row, "seat": seat, "seat_code": f"{row}{seat}"}
+                    for row, seat in block
+                ],
+            }
+        )
+
+    @group_booking_schema
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk(self, request):
+        serializer = GroupBookingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        flight = serializer.validated_data["flight"]
+
+        results, tickets = book_group(
+            flight,
+            serializer.validated_data["passengers"],
+            partial=serializer.validated_data["allow_partial"],
+        )
+
+        if not tickets:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(tickets) < len(results):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response(
+            {
+                "flight_id": flight.id,
+                "booked": len(tickets),
+                "rejected": len(results) - len(tickets),
+                "results": results,
+            },
+            status=response_status,
+        )
+
+    @hold_seat_schema
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="hold",
+        permission_classes=[IsAuthenticated],
+    )
+    def hold(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(
+            status="held",
+            hold_expires_at=hold_expiry(),
+            held_by=request.user,
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @confirm_hold_schema
+    @action(detail=True, methods=["post"])
+    def confirm(self, request, pk=None):
+        ticket = confirm_hold(self.get_object())
+        return Response(self.get_serializer(ticket).data)